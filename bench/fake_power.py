@@ -0,0 +1,211 @@
+"""
+Local stand-in for the NASA POWER daily point API.
+
+`serve` answers `GET <any path>?parameters=...&latitude=...&longitude=...
+&start=YYYYMMDD&end=YYYYMMDD` with a POWER-shaped JSON payload after a
+configurable delay. Values are replayed from recorded responses in
+`--payloads` (the recording nearest to the requested point; dates outside the
+recorded span are taken from the same calendar day of the closest recorded
+year). Without recordings, values are synthesized deterministically from the
+point and date, so runs are reproducible. The last `--lag-days` days are
+reported as -999, as POWER does for days it has not published yet.
+
+`record` saves real POWER responses for later replay.
+
+Point the service at it with POWER_API_URL=http://127.0.0.1:<port>/api/temporal/daily/point.
+
+Usage:
+    python bench/fake_power.py serve --port 8765 --latency-ms 80 --jitter-ms 40
+    python bench/fake_power.py record --point 24.7136 46.6753 --start 2015-01-01 --end 2024-12-31
+"""
+import argparse
+import datetime as dt
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PAYLOADS = Path(__file__).resolve().parent / "payloads"
+REAL_POWER_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+MISSING = -999.0
+
+
+def _synthetic(lat: float, lon: float, day: dt.date) -> Dict[str, float]:
+    """Seasonal cycle plus reproducible day-to-day noise for one point and day."""
+    seed = hashlib.blake2b(f"{lat:.2f},{lon:.2f},{day:%Y%m%d}".encode(), digest_size=8).digest()
+    rng = random.Random(int.from_bytes(seed, "little"))
+    doy = day.timetuple().tm_yday
+    season = math.sin(2 * math.pi * (doy - 105) / 365.25) * (1 if lat >= 0 else -1)
+    t2m = 27 - 0.45 * abs(lat - 15) + 9 * season + rng.gauss(0, 2)
+    rain = max(0.0, rng.gauss(-1.0, 3.0))
+    return {
+        "T2M": t2m,
+        "T2M_MAX": t2m + 5 + rng.random() * 3,
+        "T2M_MIN": t2m - 5 - rng.random() * 3,
+        "RH2M": min(100.0, max(3.0, 45 - 15 * season + rng.gauss(0, 8) + 4 * rain)),
+        "WS2M": 2 + 3 * rng.random(),
+        "PRECTOTCORR": rain,
+        "ALLSKY_SFC_UV_INDEX": max(0.0, 7 + 3 * season + rng.gauss(0, 1)),
+    }
+
+
+class Recordings:
+    """Recorded POWER payloads keyed by point; `values` replays them for any date."""
+
+    def __init__(self, root: Path):
+        self.points: List[Tuple[float, float]] = []
+        self.series: List[Dict[str, Dict[str, float]]] = []
+        for path in sorted(Path(root).glob("*.json")) if Path(root).exists() else []:
+            data = json.loads(path.read_text())
+            lon, lat = data["geometry"]["coordinates"][:2]
+            self.points.append((float(lat), float(lon)))
+            self.series.append(data["properties"]["parameter"])
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def values(self, lat: float, lon: float, day: dt.date, params: List[str]) -> Dict[str, float]:
+        if not self.points:
+            synth = _synthetic(lat, lon, day)
+            return {p: synth.get(p, 1.0) for p in params}
+        i = min(range(len(self.points)), key=lambda k: (self.points[k][0] - lat) ** 2 + (self.points[k][1] - lon) ** 2)
+        series = self.series[i]
+        key = self._recorded_key(series, day)
+        return {p: series.get(p, {}).get(key, MISSING) if key else MISSING for p in params}
+
+    @staticmethod
+    def _recorded_key(series: Dict[str, Dict[str, float]], day: dt.date) -> Optional[str]:
+        dates = next(iter(series.values()), {})
+        key = f"{day:%Y%m%d}"
+        if key in dates and dates[key] != MISSING:
+            return key
+        years = sorted({int(k[:4]) for k in dates})
+        for year in sorted(years, key=lambda y: abs(y - day.year)):
+            try:
+                candidate = f"{day.replace(year=year):%Y%m%d}"
+            except ValueError:  # Feb 29 in a non-leap year
+                candidate = f"{dt.date(year, 2, 28):%Y%m%d}"
+            if dates.get(candidate, MISSING) != MISSING:
+                return candidate
+        return None
+
+
+def payload(recordings: Recordings, query: Dict[str, List[str]], lag_days: int) -> dict:
+    params = query["parameters"][0].split(",")
+    lat, lon = float(query["latitude"][0]), float(query["longitude"][0])
+    start = dt.datetime.strptime(query["start"][0], "%Y%m%d").date()
+    end = dt.datetime.strptime(query["end"][0], "%Y%m%d").date()
+    published = dt.date.today() - dt.timedelta(days=lag_days)
+    out: Dict[str, Dict[str, float]] = {p: {} for p in params}
+    day = start
+    while day <= end:
+        key = f"{day:%Y%m%d}"
+        values = recordings.values(lat, lon, day, params) if day < published else {}
+        for p in params:
+            out[p][key] = round(float(values.get(p, MISSING)), 2)
+        day += dt.timedelta(days=1)
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat, 0.0]},
+        "properties": {"parameter": out},
+    }
+
+
+class FakePower(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, recordings: Recordings, latency_ms: float, jitter_ms: float, error_rate: float, lag_days: int):
+        super().__init__(address, _Handler)
+        self.recordings = recordings
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.lag_days = lag_days
+        self.requests = 0
+        self._lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakePower
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            return self._send(200, {"requests": self.server.requests})
+        with self.server._lock:
+            self.server.requests += 1
+        time.sleep((self.server.latency_ms + random.uniform(0, self.server.jitter_ms)) / 1000.0)
+        if random.random() < self.server.error_rate:
+            return self._send(503, {"message": "Service Unavailable"})
+        try:
+            body = payload(self.server.recordings, parse_qs(url.query), self.server.lag_days)
+        except (KeyError, ValueError) as e:
+            return self._send(422, {"message": f"Bad request: {e}"})
+        self._send(200, body)
+
+    def _send(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int, payloads: Path, latency_ms: float, jitter_ms: float, error_rate: float, lag_days: int) -> None:
+    recordings = Recordings(payloads)
+    server = FakePower(("127.0.0.1", port), recordings, latency_ms, jitter_ms, error_rate, lag_days)
+    source = f"{len(recordings)} recordings" if len(recordings) else "synthetic data"
+    print(f"Fake POWER on http://127.0.0.1:{server.server_address[1]} ({source}, {latency_ms}+{jitter_ms} ms)", flush=True)
+    server.serve_forever()
+
+
+def record(points: List[Tuple[float, float]], start: dt.date, end: dt.date, payloads: Path) -> None:
+    import requests
+
+    payloads.mkdir(parents=True, exist_ok=True)
+    params = "T2M,T2M_MAX,T2M_MIN,RH2M,WS2M,PRECTOTCORR,ALLSKY_SFC_UV_INDEX"
+    for lat, lon in points:
+        resp = requests.get(
+            REAL_POWER_URL,
+            params={"parameters": params, "community": "RE", "longitude": lon, "latitude": lat,
+                    "start": f"{start:%Y%m%d}", "end": f"{end:%Y%m%d}", "format": "JSON"},
+            timeout=120,
+        )
+        resp.raise_for_status()
+        path = payloads / f"{lat:.4f}_{lon:.4f}.json"
+        path.write_text(json.dumps(resp.json()))
+        print(f"Recorded ({lat}, {lon}) to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local NASA POWER stand-in")
+    sub = parser.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--payloads", type=Path, default=DEFAULT_PAYLOADS)
+    s.add_argument("--latency-ms", type=float, default=80.0, help="fixed delay per request")
+    s.add_argument("--jitter-ms", type=float, default=40.0, help="extra uniform random delay")
+    s.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    s.add_argument("--lag-days", type=int, default=2, help="most recent days reported as missing")
+    r = sub.add_parser("record")
+    r.add_argument("--point", nargs=2, type=float, action="append", metavar=("LAT", "LON"), required=True)
+    r.add_argument("--start", type=dt.date.fromisoformat, required=True)
+    r.add_argument("--end", type=dt.date.fromisoformat, required=True)
+    r.add_argument("--payloads", type=Path, default=DEFAULT_PAYLOADS)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.port, args.payloads, args.latency_ms, args.jitter_ms, args.error_rate, args.lag_days)
+    else:
+        record([tuple(p) for p in args.point], args.start, args.end, args.payloads)
@@ -0,0 +1,113 @@
+"""
+Micro-benchmark of NASA POWER payload parsing.
+
+Builds one multi-decade daily payload (from a recording in bench/payloads when
+available, synthetic data otherwise), then times turning its raw body into a
+DataFrame with:
+
+- legacy_frame: the previous `fetch_power_daily_remote` (json + per-date
+  lists + replace/astype through object dtype);
+- legacy_rows: the previous `WeatherPredictor.fetch_nasa_data` loop;
+- columnar_json / columnar_orjson: `power_parse.parse_daily` with each decoder.
+
+Reports the best and median time per parse and the resulting frame's size.
+
+Usage:
+    python bench/parse_power.py --years 40 --repeat 7
+"""
+import argparse
+import datetime as dt
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH))
+sys.path.insert(0, str(BENCH.parent / "ml-model"))
+
+import power_parse  # noqa: E402
+from fake_power import DEFAULT_PAYLOADS, Recordings, payload  # noqa: E402
+
+PARAMS = ["T2M", "T2M_MAX", "T2M_MIN", "RH2M", "WS2M", "PRECTOTCORR", "ALLSKY_SFC_UV_INDEX"]
+
+
+def legacy_frame(raw: bytes) -> pd.DataFrame:
+    data = json.loads(raw)
+    props = data.get("properties", {}).get("parameter", {})
+    dates = sorted(next(iter(props.values())).keys())
+    df = pd.DataFrame({p: [props.get(p, {}).get(d) for d in dates] for p in PARAMS})
+    df.index = pd.to_datetime(dates, format="%Y%m%d")
+    return df.replace(-999, pd.NA).dropna(subset=["T2M"]).astype(float)
+
+
+def legacy_rows(raw: bytes) -> pd.DataFrame:
+    props = json.loads(raw)["properties"]["parameter"]
+    cols: Dict[str, List] = {k: [] for k in ["date", "temperature", "temp_max", "temp_min", "humidity", "wind_speed", "precipitation", "uv_index"]}
+    for d, temp in props["T2M"].items():
+        if temp == -999 or temp is None:
+            continue
+        cols["date"].append(pd.to_datetime(d, format="%Y%m%d"))
+        cols["temperature"].append(temp)
+        cols["temp_max"].append(props["T2M_MAX"].get(d, temp))
+        cols["temp_min"].append(props["T2M_MIN"].get(d, temp))
+        cols["humidity"].append(props["RH2M"].get(d, 50))
+        cols["wind_speed"].append(props["WS2M"].get(d, 5))
+        cols["precipitation"].append(props["PRECTOTCORR"].get(d, 0))
+        cols["uv_index"].append(props["ALLSKY_SFC_UV_INDEX"].get(d, 5))
+    return pd.DataFrame(cols)
+
+
+def _columnar(decoder) -> Callable[[bytes], pd.DataFrame]:
+    def parse(raw: bytes) -> pd.DataFrame:
+        saved, power_parse.orjson = power_parse.orjson, decoder
+        try:
+            return power_parse.parse_daily(raw, PARAMS)
+        finally:
+            power_parse.orjson = saved
+
+    return parse
+
+
+def _time(fn: Callable[[bytes], pd.DataFrame], raw: bytes, repeat: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        df = fn(raw)
+        times.append(time.perf_counter() - t0)
+    return {"best_ms": min(times) * 1000, "median_ms": statistics.median(times) * 1000,
+            "rows": len(df), "frame_kb": df.memory_usage(deep=True).sum() / 1024}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="NASA POWER payload parsing micro-benchmark")
+    parser.add_argument("--years", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--payloads", type=Path, default=DEFAULT_PAYLOADS)
+    args = parser.parse_args()
+
+    end = dt.date.today()
+    start = end.replace(year=end.year - args.years)
+    query = {"parameters": [",".join(PARAMS)], "latitude": ["24.7"], "longitude": ["46.7"],
+             "start": [f"{start:%Y%m%d}"], "end": [f"{end:%Y%m%d}"]}
+    raw = json.dumps(payload(Recordings(args.payloads), query, lag_days=2)).encode()
+    print(f"Payload: {args.years} years, {(end - start).days + 1} days, {len(raw) / 1e6:.1f} MB")
+
+    parsers = {"legacy_frame": legacy_frame, "legacy_rows": legacy_rows, "columnar_json": _columnar(None)}
+    if power_parse.orjson is not None:
+        parsers["columnar_orjson"] = _columnar(power_parse.orjson)
+    else:
+        print("orjson not installed; skipping columnar_orjson")
+    results = {name: _time(fn, raw, args.repeat) for name, fn in parsers.items()}
+    base = results["legacy_frame"]["best_ms"]
+    print(f"{'parser':<18}{'best_ms':>10}{'median_ms':>11}{'speedup':>9}{'rows':>8}{'frame_kb':>10}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['best_ms']:>10.1f}{r['median_ms']:>11.1f}{base / r['best_ms']:>8.1f}x{r['rows']:>8}{r['frame_kb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
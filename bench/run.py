@@ -0,0 +1,415 @@
+"""
+Scenario benchmarks for the prediction service against a local POWER stand-in.
+
+Starts bench/fake_power.py, trains a regional model from it once (kept in
+bench/.work/model), then runs every scenario against a fresh `server/main.py`
+process with empty caches, so scenarios do not warm each other up:
+
+- cold_start: process start to /health (live) and to /ready (warmed up), then
+  the first /predict-weather request with every cache empty;
+- warm_cache: one /predict-weather request repeated (response cache hits);
+- mixed_locations: /predict-weather over many cells, inside and outside the
+  region, with repeats (a mix of misses, upstream fetches and hits);
+- seasonal_month: /predict-seasonal in month mode over a few locations;
+- batch: /predict/batch with 50 items over 10 locations.
+
+Each scenario reports requests, errors, RPS, p50/p95/p99 latency, upstream
+(fake POWER) requests and the server's RSS / peak RSS. Scenarios whose route
+the running app does not serve are reported as skipped.
+
+`--save-baseline` writes the results to bench/baselines.json; `--check`
+compares against it and exits with status 1 when a latency percentile or the
+peak RSS grows, or RPS drops, by more than `--tolerance` (or errors appear).
+Baselines are machine-specific: record them on the CI runner that checks them.
+
+Usage:
+    python bench/run.py
+    python bench/run.py --scenarios warm_cache,batch --requests 400 --concurrency 16
+    python bench/run.py --check
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+BENCH = Path(__file__).resolve().parent
+ROOT = BENCH.parent
+WORK = BENCH / ".work"
+BASELINES = BENCH / "baselines.json"
+REGION = (24.0, 46.0, 25.5, 47.5)  # min_lat, min_lon, max_lat, max_lon
+REGION_STEP = 0.5
+LATENCY_KEYS = ["p50_ms", "p95_ms", "p99_ms"]
+
+Request = Tuple[str, str, Optional[dict]]  # method, path, json body
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_http(url: str, timeout: float, proc: subprocess.Popen) -> float:
+    """Seconds until `url` answers 200; raises if the process dies or time runs out."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{proc.args} exited with {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def _memory_mb(pid: int) -> Dict[str, Optional[float]]:
+    """Current and peak resident set size of a process (Linux /proc; None elsewhere)."""
+    out: Dict[str, Optional[float]] = {"rss_mb": None, "peak_rss_mb": None}
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                out["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+            elif line.startswith("VmHWM:"):
+                out["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return out
+
+
+class FakePowerProcess:
+    def __init__(self, latency_ms: float, jitter_ms: float, payloads: Optional[Path]):
+        self.port = _free_port()
+        cmd = [sys.executable, str(BENCH / "fake_power.py"), "serve", "--port", str(self.port),
+               "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms)]
+        if payloads:
+            cmd += ["--payloads", str(payloads)]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+        _wait_http(f"{self.base}/stats", 15, self.proc)
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def url(self) -> str:
+        return f"{self.base}/api/temporal/daily/point"
+
+    def requests(self) -> int:
+        return int(httpx.get(f"{self.base}/stats").json()["requests"])
+
+    def stop(self) -> None:
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def prepare_model(power_url: str, days: int, backend: str, retrain: bool) -> Path:
+    """Regional model over REGION trained from the fake POWER (reused across runs)."""
+    model_dir = WORK / "model"
+    if (model_dir / "weather_predictor.forest" / "meta.json").exists() and not retrain:
+        return model_dir
+    shutil.rmtree(model_dir, ignore_errors=True)
+    model_dir.mkdir(parents=True)
+    print("Training benchmark model from the fake POWER server...")
+    env = dict(
+        os.environ,
+        POWER_API_URL=power_url,
+        POWER_CACHE_DIR=str(WORK / "train_cache"),
+        REGION_BBOX=",".join(str(v) for v in REGION),
+        REGION_STEP=str(REGION_STEP),
+        DAYS=str(days),
+        BACKEND=backend,
+        POWER_RATE_LIMIT=os.getenv("POWER_RATE_LIMIT", "0"),
+    )
+    subprocess.run([sys.executable, str(ROOT / "ml-model" / "train.py")], cwd=model_dir, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    return model_dir
+
+
+class ServerProcess:
+    """server/main.py under uvicorn with private, empty caches."""
+
+    def __init__(self, power_url: str, model_dir: Path):
+        self.port = _free_port()
+        self.state = Path(tempfile.mkdtemp(prefix="bench-state-", dir=WORK))
+        env = dict(
+            os.environ,
+            POWER_API_URL=power_url,
+            POWER_CACHE_DIR=str(self.state / "power_cache"),
+            CLIMATOLOGY_DIR=str(self.state / "climatology"),
+            MODELS_DIR=str(self.state / "models"),
+            MODEL_PATH=str(model_dir / "weather_predictor.pkl"),
+            FLAT_MODEL_DIR=str(model_dir / "weather_predictor.forest"),
+            AUTO_TRAIN="0",
+            # The stand-in does not throttle; the client-side limit is for the real API
+            POWER_RATE_LIMIT=os.getenv("POWER_RATE_LIMIT", "0"),
+        )
+        self.log = open(self.state / "server.log", "wb")
+        self.started = time.perf_counter()
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"],
+            cwd=ROOT / "server",
+            env=env,
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+        )
+        # Listening (liveness) first, then warmed up (readiness)
+        self.live_seconds = _wait_http(f"{self.base}/health", 120, self.proc)
+        self.ready_seconds = self.live_seconds + _wait_http(f"{self.base}/ready", 120, self.proc)
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def routes(self) -> set:
+        spec = httpx.get(f"{self.base}/openapi.json").json()
+        return {(m.upper(), p) for p, ops in spec.get("paths", {}).items() for m in ops}
+
+    def memory(self) -> Dict[str, Optional[float]]:
+        return _memory_mb(self.proc.pid)
+
+    def stop(self) -> None:
+        self.proc.terminate()
+        try:
+            self.proc.wait(10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.log.close()
+        shutil.rmtree(self.state, ignore_errors=True)
+
+
+def _point(rng: random.Random, inside: bool) -> Tuple[float, float]:
+    min_lat, min_lon, max_lat, max_lon = REGION
+    if inside:
+        return round(rng.uniform(min_lat, max_lat), 3), round(rng.uniform(min_lon, max_lon), 3)
+    return round(rng.uniform(10, 40), 3), round(rng.uniform(30, 60), 3)
+
+
+def _weather_request(lat: float, lon: float) -> Request:
+    return "POST", "/predict-weather", {"lat": lat, "lon": lon, "current_weather": {"temperature": 31.0, "humidity": 35.0}}
+
+
+def _warm_cache(rng: random.Random, n: int) -> List[Request]:
+    return [_weather_request(24.71, 46.67)] * n
+
+
+def _mixed_locations(rng: random.Random, n: int) -> List[Request]:
+    cells = [_point(rng, inside=i % 4 != 0) for i in range(max(4, n // 5))]
+    return [_weather_request(*rng.choice(cells)) for _ in range(n)]
+
+
+def _seasonal_month(rng: random.Random, n: int) -> List[Request]:
+    cells = [_point(rng, inside=True) for _ in range(5)]
+    today = dt.date.today()
+    dates = [(today + dt.timedelta(days=30 * k)).isoformat() for k in range(1, 7)]
+    return [("POST", "/predict-seasonal", {"lat": lat, "lon": lon, "date": rng.choice(dates), "range": "month"})
+            for lat, lon in (rng.choice(cells) for _ in range(n))]
+
+
+def _batch(rng: random.Random, n: int) -> List[Request]:
+    cells = [_point(rng, inside=True) for _ in range(10)]
+    today = dt.date.today().isoformat()
+    body = {"items": [{"lat": lat, "lon": lon, "date": today} for lat, lon in cells for _ in range(5)]}
+    return [("POST", "/predict/batch", body)] * max(1, n // 10)
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[[random.Random, int], List[Request]]
+    warmup: int = 0  # leading requests sent (sequentially) before timing starts
+
+
+SCENARIOS = {
+    s.name: s
+    for s in [
+        Scenario("warm_cache", _warm_cache, warmup=1),
+        Scenario("mixed_locations", _mixed_locations),
+        Scenario("seasonal_month", _seasonal_month),
+        Scenario("batch", _batch),
+    ]
+}
+ALL_SCENARIOS = ["cold_start"] + list(SCENARIOS)
+
+
+async def _drive(base: str, requests: List[Request], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, timeout=120.0, limits=limits) as client:
+
+        async def one(method: str, path: str, body: Optional[dict]):
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, json=body)
+                    await resp.aread()
+                    ok = resp.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - t0)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(*r) for r in requests))
+        wall = time.perf_counter() - started
+    ms = np.asarray(latencies) * 1000.0
+    return {
+        "requests": len(requests),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "rps": round(len(requests) / wall, 2) if wall > 0 else None,
+        **{f"p{q}_ms": round(float(np.percentile(ms, q)), 2) for q in (50, 95, 99)},
+    }
+
+
+def run_cold_start(power: FakePowerProcess, model_dir: Path) -> Dict[str, Any]:
+    server = ServerProcess(power.url, model_dir)
+    try:
+        method, path, body = _weather_request(24.71, 46.67)
+        t0 = time.perf_counter()
+        resp = httpx.request(method, server.base + path, json=body, timeout=120.0)
+        first = time.perf_counter() - t0
+        return {
+            "live_seconds": round(server.live_seconds, 3),
+            "startup_seconds": round(server.ready_seconds, 3),
+            "first_request_ms": round(first * 1000.0, 2),
+            "errors": int(resp.status_code >= 400),
+            **server.memory(),
+        }
+    finally:
+        server.stop()
+
+
+def run_scenario(scenario: Scenario, power: FakePowerProcess, model_dir: Path, n: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    requests = scenario.build(random.Random(seed), n)
+    server = ServerProcess(power.url, model_dir)
+    try:
+        routes = server.routes()
+        missing = sorted({(m, p) for m, p, _ in requests if (m, p) not in routes})
+        if missing:
+            return {"skipped": f"route not served: {', '.join(f'{m} {p}' for m, p in missing)}"}
+        for method, path, body in requests[: scenario.warmup]:
+            httpx.request(method, server.base + path, json=body, timeout=120.0)
+        upstream = power.requests()
+        result = asyncio.run(_drive(server.base, requests[scenario.warmup:], concurrency))
+        result["upstream_requests"] = power.requests() - upstream
+        result.update(server.memory())
+        return result
+    finally:
+        server.stop()
+
+
+def check(results: Dict[str, Any], baselines: Dict[str, Any], tolerance: float, slack_ms: float = 5.0) -> List[str]:
+    """Regressions of `results` against `baselines` (empty when everything is within tolerance)."""
+    failures = []
+    for name, base in baselines.get("scenarios", {}).items():
+        cur = results["scenarios"].get(name)
+        if cur is None or "skipped" in cur or "skipped" in base:
+            continue
+        if cur.get("errors", 0) > base.get("errors", 0):
+            failures.append(f"{name}: {cur['errors']} errors (baseline {base.get('errors', 0)})")
+        for key in LATENCY_KEYS + ["first_request_ms"]:
+            if key in base and key in cur and cur[key] > base[key] * (1 + tolerance) + slack_ms:
+                failures.append(f"{name}: {key} {cur[key]} > {base[key]} (+{tolerance:.0%})")
+        if "startup_seconds" in base and cur["startup_seconds"] > base["startup_seconds"] * (1 + tolerance) + slack_ms / 1000:
+            failures.append(f"{name}: startup_seconds {cur['startup_seconds']} > {base['startup_seconds']} (+{tolerance:.0%})")
+        if base.get("rps") and cur.get("rps") is not None and cur["rps"] < base["rps"] * (1 - tolerance):
+            failures.append(f"{name}: rps {cur['rps']} < {base['rps']} (-{tolerance:.0%})")
+        if base.get("peak_rss_mb") and cur.get("peak_rss_mb") and cur["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            failures.append(f"{name}: peak_rss_mb {cur['peak_rss_mb']} > {base['peak_rss_mb']} (+{tolerance:.0%})")
+    return failures
+
+
+def _print_table(results: Dict[str, Any]) -> None:
+    cols = ["rps", "p50_ms", "p95_ms", "p99_ms", "errors", "upstream_requests", "peak_rss_mb"]
+    print(f"{'scenario':<18}" + "".join(f"{c:>18}" for c in cols))
+    for name, r in results["scenarios"].items():
+        if "skipped" in r:
+            print(f"{name:<18}  skipped ({r['skipped']})")
+        elif name == "cold_start":
+            print(f"{name:<18}  live {r.get('live_seconds')}s, ready {r['startup_seconds']}s, first request {r['first_request_ms']} ms, peak RSS {r['peak_rss_mb']} MB")
+        else:
+            print(f"{name:<18}" + "".join(f"{str(r.get(c)):>18}" for c in cols))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prediction service benchmarks against a fake NASA POWER")
+    parser.add_argument("--scenarios", default=",".join(ALL_SCENARIOS), help=f"comma-separated subset of {ALL_SCENARIOS}")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="fake POWER delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--payloads", type=Path, default=None, help="recorded POWER payloads to replay")
+    parser.add_argument("--days", type=int, default=800, help="training days for the benchmark model")
+    parser.add_argument("--backend", default="forest", help="estimator backend of the benchmark model")
+    parser.add_argument("--retrain", action="store_true", help="retrain the benchmark model")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=Path, default=WORK / "latest.json")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINES.name}")
+    parser.add_argument("--check", action="store_true", help=f"exit 1 on regressions against {BASELINES.name}")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(names) - set(ALL_SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {sorted(unknown)}")
+
+    WORK.mkdir(exist_ok=True)
+    power = FakePowerProcess(args.latency_ms, args.jitter_ms, args.payloads)
+    try:
+        model_dir = prepare_model(power.url, args.days, args.backend, args.retrain)
+        results: Dict[str, Any] = {
+            "created_at": dt.datetime.now().isoformat(timespec="seconds"),
+            "settings": {k: getattr(args, k) for k in ("requests", "concurrency", "latency_ms", "jitter_ms", "days", "backend", "seed")},
+            "cpus": os.cpu_count(),
+            "scenarios": {},
+        }
+        for name in names:
+            print(f"Running {name}...")
+            if name == "cold_start":
+                results["scenarios"][name] = run_cold_start(power, model_dir)
+            else:
+                results["scenarios"][name] = run_scenario(SCENARIOS[name], power, model_dir, args.requests, args.concurrency, args.seed)
+    finally:
+        power.stop()
+
+    _print_table(results)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        BASELINES.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {BASELINES}")
+    if args.check:
+        if not BASELINES.exists():
+            print(f"No baseline at {BASELINES}; run with --save-baseline first")
+            return 1
+        failures = check(results, json.loads(BASELINES.read_text()), args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,270 @@
+"""
+Chunked, resumable historical backfill of NASA POWER daily data.
+
+Each location (grid cell) owns a directory holding append-only chunk files
+and a `manifest.json` checkpoint. Missing date ranges are fetched in chunks
+aligned to a fixed grid of `chunk_days` days starting at 1981-01-01 (the
+first POWER daily date), so any request stays small and reruns with other
+start/end dates reuse the same chunks. Every chunk is written as its own
+columnar `.npz` (one int32 day-number array plus one float32 array per
+parameter) and recorded in the manifest right after it lands; an interrupted
+backfill resumes from the last recorded chunk.
+
+`build_dataset` streams the chunks of many locations through the shared
+feature pipeline and appends rows to flat `X.f32` (float32 features) and
+`y.f64` (float64 targets, as the in-memory path fits on) files, which
+train.py then memory-maps, so a multi-decade, multi-location training
+set never has to exist as one request or one DataFrame.
+
+Usage:
+    python backfill.py --point 24.7136 46.6753 --start 1991-01-01 --end 2024-12-31
+    python backfill.py --point 24.7136 46.6753 --start 1991-01-01 --end 2024-12-31 --dataset training_set
+"""
+import argparse
+import datetime as dt
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from nasa import POWER_PARAMS, fetch_power_daily_upstream
+from power_cache import missing_ranges
+
+DEFAULT_ROOT = Path(__file__).resolve().parent / "backfill_data"
+GRID_EPOCH = dt.date(1981, 1, 1)
+DEFAULT_CHUNK_DAYS = 366
+_EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+RemoteFetch = Callable[[float, float, dt.date, dt.date, List[str]], pd.DataFrame]
+
+
+def cell_dir(root: os.PathLike | str, lat: float, lon: float) -> Path:
+    return Path(root) / f"{lat:+.4f}_{lon:+.4f}"
+
+
+def _write_json(path: Path, payload: dict) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2))
+    os.replace(tmp, path)
+
+
+def _grid_chunks(start: dt.date, end: dt.date, chunk_days: int) -> List[Tuple[dt.date, dt.date]]:
+    """Split [start, end] at multiples of `chunk_days` days from GRID_EPOCH."""
+    out = []
+    cur = start
+    while cur <= end:
+        k = (cur - GRID_EPOCH).days // chunk_days
+        boundary = GRID_EPOCH + dt.timedelta(days=(k + 1) * chunk_days - 1)
+        stop = min(boundary, end)
+        out.append((cur, stop))
+        cur = stop + dt.timedelta(days=1)
+    return out
+
+
+class LocationStore:
+    """Append-only chunk files plus manifest for one location."""
+
+    def __init__(self, root: os.PathLike | str, lat: float, lon: float, params: Optional[Sequence[str]] = None):
+        self.lat = lat
+        self.lon = lon
+        self.dir = cell_dir(root, lat, lon)
+        self.manifest_path = self.dir / "manifest.json"
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text())
+            if params is not None and list(params) != self.manifest["params"]:
+                raise ValueError(f"{self.dir} holds parameters {self.manifest['params']}, not {list(params)}")
+        else:
+            self.manifest = {"lat": lat, "lon": lon, "params": list(params or POWER_PARAMS), "chunks": []}
+
+    @property
+    def params(self) -> List[str]:
+        return self.manifest["params"]
+
+    def chunks(self) -> List[dict]:
+        return sorted(self.manifest["chunks"], key=lambda c: c["start"])
+
+    def missing(self, start: dt.date, end: dt.date) -> List[Tuple[dt.date, dt.date]]:
+        dates = [start + dt.timedelta(days=i) for i in range((end - start).days + 1)]
+        missing = np.ones(len(dates), dtype=bool)
+        for chunk in self.manifest["chunks"]:
+            lo = (dt.date.fromisoformat(chunk["start"]) - start).days
+            hi = (dt.date.fromisoformat(chunk["end"]) - start).days
+            missing[max(lo, 0):max(hi + 1, 0)] = False
+        return missing_ranges(dates, missing)
+
+    def append(self, start: dt.date, end: dt.date, df: pd.DataFrame) -> Optional[dict]:
+        """
+        Persist one fetched chunk and checkpoint it. Trailing days POWER has not
+        published yet (no T2M) are left out so a later run fetches them again.
+        """
+        if not df.empty and "T2M" in df.columns and df["T2M"].notna().any():
+            end = min(end, df.index[df["T2M"].notna()].max().date())
+        elif end >= dt.date.today() - dt.timedelta(days=7):
+            return None
+        else:
+            df = pd.DataFrame(index=pd.DatetimeIndex([]))  # nothing published: record an empty chunk
+        df = df.loc[(df.index >= pd.Timestamp(start)) & (df.index <= pd.Timestamp(end))]
+        self.dir.mkdir(parents=True, exist_ok=True)
+        name = f"{start:%Y%m%d}_{end:%Y%m%d}.npz"
+        columns = {"day": (np.array([d.toordinal() for d in df.index.date], dtype=np.int32) - _EPOCH_ORDINAL)}
+        for p in self.params:
+            columns[p] = (df[p] if p in df.columns else pd.Series(np.nan, index=df.index)).to_numpy(dtype=np.float32)
+        tmp = self.dir / (name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **columns)
+        os.replace(tmp, self.dir / name)
+        chunk = {"start": start.isoformat(), "end": end.isoformat(), "file": name, "rows": int(len(df))}
+        self.manifest["chunks"].append(chunk)
+        _write_json(self.manifest_path, self.manifest)
+        return chunk
+
+    def read_chunk(self, chunk: dict) -> pd.DataFrame:
+        with np.load(self.dir / chunk["file"]) as data:
+            index = pd.to_datetime(data["day"].astype("int64"), unit="D")
+            df = pd.DataFrame({p: data[p].astype(np.float64) for p in self.params}, index=index)
+        df.index.name = "date"
+        return df
+
+    def iter_frames(self, start: Optional[dt.date] = None, end: Optional[dt.date] = None) -> Iterator[pd.DataFrame]:
+        """Stored chunks overlapping [start, end], one date-indexed frame at a time in date order."""
+        for chunk in self.chunks():
+            if end is not None and dt.date.fromisoformat(chunk["start"]) > end:
+                continue
+            if start is not None and dt.date.fromisoformat(chunk["end"]) < start:
+                continue
+            df = self.read_chunk(chunk)
+            if start is not None:
+                df = df.loc[df.index >= pd.Timestamp(start)]
+            if end is not None:
+                df = df.loc[df.index <= pd.Timestamp(end)]
+            if not df.empty:
+                yield df
+
+
+def backfill(
+    lat: float,
+    lon: float,
+    start: dt.date,
+    end: dt.date,
+    root: os.PathLike | str = DEFAULT_ROOT,
+    params: Optional[Sequence[str]] = None,
+    chunk_days: int = DEFAULT_CHUNK_DAYS,
+    fetch: RemoteFetch = fetch_power_daily_upstream,
+) -> LocationStore:
+    """Fetch every day of [start, end] not yet stored, one grid chunk per request."""
+    store = LocationStore(root, lat, lon, params)
+    todo = [piece for lo, hi in store.missing(start, end) for piece in _grid_chunks(lo, hi, chunk_days)]
+    for i, (lo, hi) in enumerate(todo, start=1):
+        print(f"Backfilling ({lat}, {lon}) {lo} to {hi} [{i}/{len(todo)}]...")
+        chunk = store.append(lo, hi, fetch(lat, lon, lo, hi, store.params))
+        if chunk is None:
+            print(f"No published data for {lo} to {hi} yet")
+    return store
+
+
+@dataclass
+class Dataset:
+    """Flat training matrices produced by build_dataset (float32 X, float64 y)."""
+
+    X: np.ndarray
+    y: np.ndarray
+    feature_columns: List[str]
+    target_columns: List[str]
+    meta: dict
+
+
+def _location_rows(store: LocationStore, start: dt.date, end: dt.date) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    (X, y) blocks for one location, streamed chunk by chunk. The last rows of
+    the previous block are carried over so lag/rolling features and next-day
+    targets across chunk boundaries equal the in-memory train.build_features.
+    """
+    from train import build_features
+
+    carry = None
+    emit_from = None
+    history = 8  # 7-day window plus the previous block's last (target-less) row
+    for frame in store.iter_frames(start, end):
+        frame = frame.dropna(subset=["T2M"])  # as fetch_power_daily does
+        if frame.empty:
+            continue
+        block = frame if carry is None else pd.concat([carry, frame])
+        X, y = build_features(block)
+        if emit_from is not None:
+            keep = X.index >= emit_from
+            X, y = X.loc[keep], y.loc[keep]
+        if len(X):
+            yield X, y
+        carry = block.iloc[-history:]
+        emit_from = block.index[-1]
+
+
+def build_dataset(
+    points: Sequence[Tuple[float, float]],
+    start: dt.date,
+    end: dt.date,
+    out_dir: os.PathLike | str,
+    root: os.PathLike | str = DEFAULT_ROOT,
+) -> Dataset:
+    """Stream the stored history of `points` into X.f32 / y.f64 under `out_dir` (replacing them)."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    x_path, y_path = out / "X.f32", out / "y.f64"
+    rows = 0
+    feature_columns: Optional[List[str]] = None
+    target_columns: Optional[List[str]] = None
+    locations = []
+    with open(x_path, "wb") as fx, open(y_path, "wb") as fy:
+        for lat, lon in points:
+            store = LocationStore(root, lat, lon)
+            first = rows
+            for X, y in _location_rows(store, start, end):
+                feature_columns = feature_columns or X.columns.tolist()
+                target_columns = target_columns or y.columns.tolist()
+                fx.write(X.to_numpy(dtype=np.float32).tobytes())
+                fy.write(y.to_numpy(dtype=np.float64).tobytes())
+                rows += len(X)
+            locations.append({"lat": lat, "lon": lon, "rows": [first, rows]})
+    if rows == 0:
+        raise RuntimeError("No stored history for the requested points and dates; run the backfill first")
+    meta = {
+        "rows": rows,
+        "feature_columns": feature_columns,
+        "target_columns": target_columns,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "locations": locations,
+    }
+    _write_json(out / "dataset.json", meta)
+    return open_dataset(out)
+
+
+def open_dataset(out_dir: os.PathLike | str) -> Dataset:
+    out = Path(out_dir)
+    meta = json.loads((out / "dataset.json").read_text())
+    n, f, t = meta["rows"], len(meta["feature_columns"]), len(meta["target_columns"])
+    # Copy-on-write: still backed by the files, but writable as sklearn's validation expects
+    X = np.memmap(out / "X.f32", dtype=np.float32, mode="c", shape=(n, f))
+    y = np.memmap(out / "y.f64", dtype=np.float64, mode="c", shape=(n, t))
+    return Dataset(X, y, meta["feature_columns"], meta["target_columns"], meta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunked, resumable NASA POWER backfill")
+    parser.add_argument("--point", nargs=2, type=float, action="append", metavar=("LAT", "LON"), required=True)
+    parser.add_argument("--start", type=dt.date.fromisoformat, default=GRID_EPOCH)
+    parser.add_argument("--end", type=dt.date.fromisoformat, default=dt.date.today() - dt.timedelta(days=1))
+    parser.add_argument("--chunk-days", type=int, default=DEFAULT_CHUNK_DAYS)
+    parser.add_argument("--root", default=os.getenv("BACKFILL_DIR", str(DEFAULT_ROOT)))
+    parser.add_argument("--dataset", help="also stream the stored history into a training set in this directory")
+    args = parser.parse_args()
+
+    for lat, lon in args.point:
+        backfill(lat, lon, args.start, args.end, root=args.root, chunk_days=args.chunk_days)
+    if args.dataset:
+        ds = build_dataset([tuple(p) for p in args.point], args.start, args.end, args.dataset, root=args.root)
+        print(f"Wrote {ds.meta['rows']} rows x {len(ds.feature_columns)} features to {args.dataset}")
@@ -0,0 +1,220 @@
+"""
+Precomputed day-of-year climatology per grid cell.
+
+An offline job fetches multi-year NASA POWER history for each cell and stores,
+for every calendar day (leap-year calendar, 366 slots) and each of T2M, RH2M
+and PRECTOTCORR, the mean, variance and 10/50/90th percentiles across years.
+The table is one float32 array of shape (cells, 366, variables, stats) that
+is memory-mapped at serving time, with `index.json` naming the table file and
+mapping cells to rows, so a seasonal lookup is an O(1) row access plus
+slicing. Every write goes to a new table file; replacing `index.json` is the
+only commit point, so readers always see a table with its own row map.
+
+Usage:
+    python climatology.py --point 24.7136 46.6753
+    python climatology.py --locations locations.csv --years 10
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+VARIABLES = ["T2M", "RH2M", "PRECTOTCORR"]
+STATS = ["mean", "var", "q10", "q50", "q90"]
+DAYS = 366
+DEFAULT_DIR = Path(__file__).resolve().parent / "climatology"
+
+
+def calendar_index(d: dt.date) -> int:
+    """Slot of a date in a 366-day leap-year calendar (Feb 29 has its own slot)."""
+    return dt.date(2000, d.month, d.day).timetuple().tm_yday - 1
+
+
+def calendar_indices(dates) -> np.ndarray:
+    """Vectorized `calendar_index` for an array of dates."""
+    days = np.asarray(dates, dtype="datetime64[D]")
+    doy = (days - days.astype("datetime64[Y]")).astype(np.int64)
+    years = days.astype("datetime64[Y]").astype(np.int64) + 1970
+    leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    # Non-leap years skip the Feb 29 slot (59) from March 1st on
+    return np.where(~leap & (doy >= 59), doy + 1, doy)
+
+
+def cell_key(lat: float, lon: float, resolution: float) -> str:
+    qlat = round(round(lat / resolution) * resolution, 4)
+    qlon = round(round(lon / resolution) * resolution, 4)
+    return f"{qlat:+.4f}_{qlon:+.4f}"
+
+
+def compute_cell(history: pd.DataFrame) -> np.ndarray:
+    """(366, variables, stats) climatology from a daily history frame indexed by date."""
+    slots = calendar_indices(history.index.to_numpy())
+    years = history.index.year.to_numpy()
+    uniq_years, year_pos = np.unique(years, return_inverse=True)
+    # (years, 366, variables) with NaN for days a year does not have
+    cube = np.full((len(uniq_years), DAYS, len(VARIABLES)), np.nan)
+    cube[year_pos, slots] = history[VARIABLES].to_numpy(dtype=np.float64)
+
+    out = np.full((DAYS, len(VARIABLES), len(STATS)), np.nan, dtype=np.float32)
+    has_data = np.isfinite(cube).any(axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN slots (e.g. Feb 29)
+        out[..., 0] = np.nanmean(cube, axis=0)
+        out[..., 1] = np.nanvar(cube, axis=0)
+        q = np.nanpercentile(cube, [10, 50, 90], axis=0)
+        out[..., 2:] = np.moveaxis(q, 0, -1)
+    out[~has_data] = np.nan
+    return out
+
+
+# (index.json mtime_ns, meta, table); swapped as one value so readers never mix versions
+_Snapshot = Tuple[int, dict, Optional[np.ndarray]]
+
+
+class ClimatologyIndex:
+    def __init__(self, root: os.PathLike | str = DEFAULT_DIR):
+        self.root = Path(root)
+        self._snapshot: Optional[_Snapshot] = None
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "index.json"
+
+    def _refresh(self) -> Optional[_Snapshot]:
+        """(Re)open the table when index.json changed. Returns None if there is no index."""
+        try:
+            mtime = self.index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._snapshot = None
+            return None
+        snapshot = self._snapshot
+        if snapshot is None or snapshot[0] != mtime:
+            meta = json.loads(self.index_path.read_text())
+            n = len(meta["cells"])
+            # Indexes written before tables were versioned use a fixed file name
+            path = self.root / meta.get("table", "climatology.f32")
+            table = np.memmap(path, dtype=np.float32, mode="r", shape=(n, DAYS, len(VARIABLES), len(STATS))) if n else None
+            snapshot = (mtime, meta, table)
+            self._snapshot = snapshot
+        return snapshot
+
+    @property
+    def version(self) -> Optional[int]:
+        snapshot = self._refresh()
+        return snapshot[0] if snapshot is not None else None
+
+    def lookup(self, lat: float, lon: float) -> Optional[np.ndarray]:
+        """Read-only (366, variables, stats) view for the cell containing the point, or None."""
+        snapshot = self._refresh()
+        if snapshot is None or snapshot[2] is None:
+            return None
+        _, meta, table = snapshot
+        row = meta["cells"].get(cell_key(lat, lon, meta["resolution"]))
+        return table[row] if row is not None else None
+
+    def years(self) -> Optional[int]:
+        snapshot = self._refresh()
+        return snapshot[1]["years"] if snapshot is not None else None
+
+    def write(self, cells: Dict[str, np.ndarray], resolution: float, years: int) -> None:
+        """Merge `cells` (key -> (366, variables, stats)) into the index and rewrite it atomically."""
+        existing: Dict[str, np.ndarray] = {}
+        snapshot = self._refresh()
+        if snapshot is not None and snapshot[2] is not None:
+            _, old_meta, old_table = snapshot
+            if old_meta["resolution"] != resolution:
+                raise ValueError("Index resolution differs; write to a new directory")
+            existing = {k: np.array(old_table[r]) for k, r in old_meta["cells"].items()}
+        existing.update(cells)
+        keys = sorted(existing)
+        self.root.mkdir(parents=True, exist_ok=True)
+        table_name = f"climatology.{time.time_ns()}.f32"
+        table = np.memmap(self.root / table_name, dtype=np.float32, mode="w+", shape=(len(keys), DAYS, len(VARIABLES), len(STATS)))
+        for i, k in enumerate(keys):
+            table[i] = existing[k]
+        table.flush()
+        del table
+        meta = {
+            "resolution": resolution,
+            "years": years,
+            "variables": VARIABLES,
+            "stats": STATS,
+            "built_at": dt.datetime.now().isoformat(),
+            "table": table_name,
+            "cells": {k: i for i, k in enumerate(keys)},
+        }
+        tmp_index = self.index_path.with_suffix(".json.tmp")
+        tmp_index.write_text(json.dumps(meta))
+        os.replace(tmp_index, self.index_path)
+        # Keep the previous table for readers that read the old index.json just before
+        keep = {table_name, snapshot[1].get("table", "climatology.f32")} if snapshot is not None else {table_name}
+        for path in self.root.glob("climatology*.f32"):
+            if path.name not in keep:
+                path.unlink(missing_ok=True)
+
+
+_index: Optional[ClimatologyIndex] = None
+
+
+def get_index() -> ClimatologyIndex:
+    global _index
+    if _index is None:
+        _index = ClimatologyIndex(os.getenv("CLIMATOLOGY_DIR", str(DEFAULT_DIR)))
+    return _index
+
+
+def build(points: List[Tuple[float, float]], years: int = 10, resolution: float = 0.1, root: os.PathLike | str = DEFAULT_DIR) -> None:
+    from nasa import fetch_power_daily
+
+    end = dt.date(dt.date.today().year - 1, 12, 31)
+    start = dt.date(end.year - years + 1, 1, 1)
+    cells: Dict[str, np.ndarray] = {}
+    for lat, lon in points:
+        key = cell_key(lat, lon, resolution)
+        if key in cells:
+            continue
+        print(f"Building climatology for {key} from {start} to {end}...")
+        history = fetch_power_daily(lat, lon, start, end, params=VARIABLES)
+        if history.empty:
+            print(f"No data for {key}, skipped")
+            continue
+        cells[key] = compute_cell(history)
+    ClimatologyIndex(root).write(cells, resolution, years)
+    print(f"Wrote {len(cells)} cells to {root}")
+
+
+def read_locations(path: str) -> List[Tuple[float, float]]:
+    """(lat, lon) pairs from a CSV file with lat,lon per line (header and blank lines skipped)."""
+    points = []
+    with open(path) as f:
+        for line in f:
+            parts = [p.strip() for p in line.split(",")]
+            try:
+                points.append((float(parts[0]), float(parts[1])))
+            except (ValueError, IndexError):
+                continue  # header or blank line
+    return points
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute day-of-year climatology per grid cell")
+    parser.add_argument("--point", nargs=2, type=float, action="append", metavar=("LAT", "LON"), default=[])
+    parser.add_argument("--locations", help="CSV file with lat,lon per line")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--resolution", type=float, default=0.1)
+    parser.add_argument("--out", default=os.getenv("CLIMATOLOGY_DIR", str(DEFAULT_DIR)))
+    args = parser.parse_args()
+
+    pts = [tuple(p) for p in args.point]
+    if args.locations:
+        pts += read_locations(args.locations)
+    if not pts:
+        parser.error("give --point or --locations")
+    build(pts, years=args.years, resolution=args.resolution, root=args.out)
@@ -0,0 +1,195 @@
+"""
+Estimator backends for the trainer and a latency/accuracy comparison.
+
+- `forest`: MultiOutputRegressor of 300-tree, depth-12 random forests (the
+  original model: 900 deep trees per prediction).
+- `small_forest`: the same shape with 30 depth-10 trees per target.
+- `hgb`: one HistGradientBoostingRegressor per target. Boosted trees are
+  shallow (31 leaves) and NaN-aware. It has no `n_jobs` and uses OpenMP on
+  every core, so `fit` caps its (and BLAS's) threads to `n_jobs`.
+- `distilled`: a small forest fitted to the predictions of the full forest
+  (on the training rows plus jittered copies of them), so it keeps most of
+  the big model's smoothing at small-forest cost. Only the student is kept.
+
+All backends flatten into the same node arrays (forest_export), so the API
+serves any of them through FlatForest. `compare_backends` fits every backend
+on one split and reports fit time, model size, single-row and batch p50/p99
+latency (sklearn and flat) and R²/MAE, with deltas against `forest`.
+"""
+import pickle
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.multioutput import MultiOutputRegressor
+from threadpoolctl import threadpool_limits
+
+BACKENDS = ["forest", "small_forest", "hgb", "distilled"]
+DEFAULT_BACKEND = "forest"
+
+
+def _forest(n_estimators: int, max_depth: int, min_samples_leaf: int, random_state: int, n_jobs: int) -> MultiOutputRegressor:
+    return MultiOutputRegressor(
+        RandomForestRegressor(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            min_samples_leaf=min_samples_leaf,
+            random_state=random_state,
+            n_jobs=n_jobs,
+        )
+    )
+
+
+class DistilledForest(RegressorMixin, BaseEstimator):
+    """Small forest trained to mimic a full forest (teacher is discarded after fit)."""
+
+    def __init__(
+        self,
+        n_estimators: int = 20,
+        max_depth: int = 10,
+        teacher_estimators: int = 300,
+        augment: int = 2,
+        noise: float = 0.05,
+        random_state: Optional[int] = None,
+        n_jobs: Optional[int] = None,
+    ):
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.teacher_estimators = teacher_estimators
+        self.augment = augment
+        self.noise = noise
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.float64)
+        teacher = _forest(self.teacher_estimators, 12, 2, self.random_state, self.n_jobs).fit(X, y)
+        # Jittered copies give the student targets between the observed rows
+        rng = np.random.default_rng(self.random_state)
+        spread = np.nanstd(X, axis=0) * self.noise
+        copies = [X] + [(X + rng.normal(0.0, 1.0, X.shape) * spread).astype(np.float32) for _ in range(self.augment)]
+        X_student = np.vstack(copies)
+        y_student = np.vstack([y] + [teacher.predict(c) for c in copies[1:]])
+        del teacher
+        self.student_ = _forest(self.n_estimators, self.max_depth, 1, self.random_state, self.n_jobs).fit(X_student, y_student)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def predict(self, X):
+        return self.student_.predict(X)
+
+
+def make_estimator(
+    backend: str = DEFAULT_BACKEND,
+    random_state: int = 42,
+    n_jobs: int = -1,
+    n_estimators: Optional[int] = None,
+):
+    """Unfitted multi-output regressor for `backend`; `n_estimators` overrides trees/iterations per target."""
+    if backend == "forest":
+        return _forest(n_estimators or 300, 12, 2, random_state, n_jobs)
+    if backend == "small_forest":
+        return _forest(n_estimators or 30, 10, 4, random_state, n_jobs)
+    if backend == "hgb":
+        return MultiOutputRegressor(
+            HistGradientBoostingRegressor(
+                max_iter=n_estimators or 200,
+                learning_rate=0.06,
+                max_leaf_nodes=31,
+                min_samples_leaf=20,
+                early_stopping=False,
+                random_state=random_state,
+            )
+        )
+    if backend == "distilled":
+        return DistilledForest(n_estimators=n_estimators or 20, random_state=random_state, n_jobs=n_jobs)
+    raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+
+
+def fit(model, X, y, n_jobs: int = -1):
+    """`model.fit(X, y)` with native (OpenMP/BLAS) threads capped to `n_jobs` when it is positive."""
+    if n_jobs is None or n_jobs < 1:
+        return model.fit(X, y)
+    with threadpool_limits(limits=n_jobs):
+        return model.fit(X, y)
+
+
+def _percentiles_ms(seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000.0
+    return {"p50": round(float(np.percentile(ms, 50)), 4), "p99": round(float(np.percentile(ms, 99)), 4)}
+
+
+def _latency(predict, X: np.ndarray, repeats: int, batch: int) -> Dict[str, Dict[str, float]]:
+    """Single-row and `batch`-row predict latency over `repeats` calls (after one warm-up call)."""
+    predict(X[:1])
+    single = []
+    for i in range(repeats):
+        row = X[i % len(X)][None, :]
+        t0 = time.perf_counter()
+        predict(row)
+        single.append(time.perf_counter() - t0)
+    rows = X[: min(batch, len(X))]
+    batched = []
+    for _ in range(max(10, repeats // 10)):
+        t0 = time.perf_counter()
+        predict(rows)
+        batched.append(time.perf_counter() - t0)
+    return {"single": _percentiles_ms(single), f"batch_{len(rows)}": _percentiles_ms(batched)}
+
+
+def compare_backends(
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    X_val: np.ndarray,
+    y_val: np.ndarray,
+    target_columns: Sequence[str],
+    backends: Sequence[str] = BACKENDS,
+    random_state: int = 42,
+    n_jobs: int = -1,
+    repeats: int = 200,
+    batch: int = 256,
+) -> Dict[str, Any]:
+    """Fit each backend on the same split and report cost and accuracy side by side."""
+    from forest_export import FlatForest, flatten
+
+    X_val = np.asarray(X_val, dtype=np.float32)
+    report: Dict[str, Any] = {"rows": {"train": int(len(X_train)), "val": int(len(X_val))}, "backends": {}}
+    for backend in backends:
+        print(f"Fitting {backend}...")
+        model = make_estimator(backend, random_state, n_jobs)
+        t0 = time.perf_counter()
+        fit(model, X_train, y_train, n_jobs)
+        fit_seconds = time.perf_counter() - t0
+        flat = FlatForest(flatten(model), X_val.shape[1])
+        pred = model.predict(X_val)
+        report["backends"][backend] = {
+            "fit_seconds": round(fit_seconds, 3),
+            "trees": int(len(flat.roots)),
+            "nodes": int(len(flat.feature)),
+            "pickle_bytes": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+            "flat_bytes": int(flat.nbytes),
+            "latency_ms": {
+                "sklearn": _latency(model.predict, X_val, repeats, batch),
+                "flat": _latency(flat.predict, X_val, repeats, batch),
+            },
+            "r2": {c: round(float(r2_score(y_val[:, i], pred[:, i])), 4) for i, c in enumerate(target_columns)},
+            "mae": {c: round(float(mean_absolute_error(y_val[:, i], pred[:, i])), 4) for i, c in enumerate(target_columns)},
+        }
+
+    baseline = report["backends"].get(DEFAULT_BACKEND)
+    if baseline:
+        for backend, entry in report["backends"].items():
+            if backend == DEFAULT_BACKEND:
+                continue
+            entry["vs_forest"] = {
+                "mae_delta": {c: round(entry["mae"][c] - baseline["mae"][c], 4) for c in target_columns},
+                "single_flat_speedup": round(
+                    baseline["latency_ms"]["flat"]["single"]["p50"] / max(entry["latency_ms"]["flat"]["single"]["p50"], 1e-9), 2
+                ),
+                "size_ratio": round(entry["flat_bytes"] / baseline["flat_bytes"], 4),
+            }
+    return report
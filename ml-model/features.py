@@ -0,0 +1,152 @@
+"""
+Feature pipeline shared by training (train.py) and serving (server/main.py).
+
+For each base column the transformer produces `{col}_lag0` (the day's value),
+`{col}_lag1` (previous day), `{col}_lag3` and `{col}_lag7` (trailing 3/7-day
+means ignoring NaN, like pandas `rolling(w, min_periods=1).mean()`), followed
+by `dayofyear`, `sin_doy` and `cos_doy`. Everything is computed in one NumPy
+pass over a contiguous (days x columns) array and returned as a float32
+matrix. The transformer is pickled inside the model bundle so serving always
+uses the feature definition the model was trained with.
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from telemetry import span, timed
+
+FEATURE_VERSION = 1
+BASE_COLUMNS = ["T2M", "T2M_MAX", "T2M_MIN", "RH2M", "WS2M", "PRECTOTCORR"]
+CALENDAR_COLUMNS = ["dayofyear", "sin_doy", "cos_doy"]
+
+
+def _trailing_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """NaN-aware trailing mean over `window` rows (min_periods=1) for every row."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    if len(values) > window:
+        sums[window:] = sums[window:] - sums[:-window]
+        counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+class FeatureTransformer:
+    def __init__(self, base_columns: Sequence[str] = BASE_COLUMNS, windows: Sequence[int] = (3, 7)):
+        self.version = FEATURE_VERSION
+        self.base_columns = list(base_columns)
+        self.windows = tuple(windows)
+        self.lags = ["lag0", "lag1"] + [f"lag{w}" for w in self.windows]
+        self.feature_columns: List[str] = [
+            f"{col}_{lag}" for col in self.base_columns for lag in self.lags
+        ] + CALENDAR_COLUMNS
+
+    @property
+    def history_days(self) -> int:
+        """Days of history needed to compute the last row exactly."""
+        return max(self.windows + (2,))
+
+    def _column_index(self, columns: Optional[Sequence[str]]) -> Optional[np.ndarray]:
+        if columns is None or list(columns) == self.feature_columns:
+            return None
+        pos = {c: i for i, c in enumerate(self.feature_columns)}
+        return np.array([pos.get(c, -1) for c in columns])
+
+    def reorder(self, X: np.ndarray, columns: Optional[Sequence[str]]) -> np.ndarray:
+        """Reorder to `columns`; columns unknown to the transformer are filled with 0."""
+        idx = self._column_index(columns)
+        if idx is None:
+            return X
+        out = X[:, np.maximum(idx, 0)]
+        out[:, idx < 0] = 0.0
+        return np.ascontiguousarray(out)
+
+    def _calendar(self, out: np.ndarray, dayofyear: np.ndarray) -> None:
+        n_lag = len(self.base_columns) * len(self.lags)
+        angle = 2 * np.pi * dayofyear / 365.25
+        out[:, n_lag] = dayofyear
+        out[:, n_lag + 1] = np.sin(angle)
+        out[:, n_lag + 2] = np.cos(angle)
+
+    @timed("features.build")
+    def transform_arrays(
+        self, values: np.ndarray, dayofyear: np.ndarray, columns: Optional[Sequence[str]] = None
+    ) -> np.ndarray:
+        """
+        values: (days, len(base_columns)) observations in date order, NaN for missing.
+        dayofyear: (days,) day of year of each row.
+        Returns a float32 (days, features) matrix in `columns` order (default feature_columns).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n, n_base = values.shape
+        out = np.empty((n, len(self.feature_columns)), dtype=np.float32)
+        lag_block = np.empty((n, n_base, len(self.lags)), dtype=np.float32)
+        lag_block[:, :, 0] = values
+        lag_block[0, :, 1] = np.nan
+        lag_block[1:, :, 1] = values[:-1]
+        for k, w in enumerate(self.windows, start=2):
+            lag_block[:, :, k] = _trailing_mean(values, w)
+        out[:, : n_base * len(self.lags)] = lag_block.reshape(n, -1)
+        self._calendar(out, np.asarray(dayofyear, dtype=np.float64))
+        return self.reorder(out, columns)
+
+    @timed("features.build")
+    def transform_last(
+        self, values: np.ndarray, dayofyear: float, columns: Optional[Sequence[str]] = None
+    ) -> np.ndarray:
+        """Single-row fast path: features of the last row only, as a float32 (1, features) matrix."""
+        values = np.asarray(values, dtype=np.float64)[-self.history_days:]
+        return self._last_rows(values[None], np.array([float(dayofyear)]), columns)
+
+    @timed("features.build")
+    def transform_last_many(
+        self, values: np.ndarray, dayofyear: np.ndarray, columns: Optional[Sequence[str]] = None
+    ) -> np.ndarray:
+        """
+        values: (locations, days, len(base_columns)) aligned histories, NaN for missing.
+        dayofyear: (locations,) day of year of each location's last row.
+        Returns the features of every location's last row as a float32 (locations, features) matrix.
+        """
+        values = np.asarray(values, dtype=np.float64)[:, -self.history_days:]
+        return self._last_rows(values, np.asarray(dayofyear, dtype=np.float64), columns)
+
+    def _last_rows(self, values: np.ndarray, dayofyear: np.ndarray, columns: Optional[Sequence[str]]) -> np.ndarray:
+        k, days, n_base = values.shape
+        out = np.empty((k, len(self.feature_columns)), dtype=np.float32)
+        lag_block = np.empty((k, n_base, len(self.lags)), dtype=np.float32)
+        lag_block[:, :, 0] = values[:, -1]
+        lag_block[:, :, 1] = values[:, -2] if days > 1 else np.nan
+        for j, w in enumerate(self.windows, start=2):
+            tail = values[:, -w:]
+            valid = ~np.isnan(tail)
+            counts = valid.sum(axis=1)
+            sums = np.where(valid, tail, 0.0).sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                lag_block[:, :, j] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        out[:, : n_base * len(self.lags)] = lag_block.reshape(k, -1)
+        self._calendar(out, dayofyear)
+        return self.reorder(out, columns)
+
+    def transform(self, df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Features for every row of a date-indexed frame holding the base columns."""
+        return self.transform_arrays(df[self.base_columns].to_numpy(dtype=np.float64), df.index.dayofyear.to_numpy(), columns)
+
+    def transform_frame_last(self, df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Features for the last row of a date-indexed frame."""
+        tail = df.iloc[-self.history_days:]
+        return self.transform_last(tail[self.base_columns].to_numpy(dtype=np.float64), tail.index[-1].dayofyear, columns)
+
+
+def transformer_for(bundle: dict) -> FeatureTransformer:
+    """The transformer stored with a model bundle (bundles from before it existed get the default one)."""
+    return bundle.get("transformer") or FeatureTransformer()
+
+
+def predict(model, X: np.ndarray, feature_columns: Sequence[str]) -> np.ndarray:
+    """model.predict on a feature matrix; models fitted on DataFrames get named columns back."""
+    with span("model.predict"):
+        if hasattr(model, "feature_names_in_"):
+            return model.predict(pd.DataFrame(X, columns=list(feature_columns)))
+        return model.predict(X)
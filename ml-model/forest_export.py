@@ -0,0 +1,285 @@
+"""
+Flat, memory-mappable export of tree ensembles.
+
+Every tree of a RandomForestRegressor (native multi-output, or one forest per
+output inside a MultiOutputRegressor), of a HistGradientBoostingRegressor per
+output, or of a distilled student (see estimators.py) is flattened into
+shared contiguous node arrays: `feature`, `threshold`, `left`, `right`,
+`missing_left` and `value`, plus `roots` (first node of each tree) and
+`offset`. Forest leaf values are pre-divided by the number of trees
+predicting each output, boosting baselines go into `offset`, and an optional
+target scale is folded into both, so a prediction is just the sum of the
+reached leaves plus `offset`.
+
+Each array is a plain `.npy` file opened with `np.load(mmap_mode='r')`, so
+several worker processes serving the same export share its pages through the
+OS page cache. Thresholds are stored as float32 rounded down, which keeps
+`x <= threshold` exact for float32 inputs; leaf values can be float64, float32
+or float16 (quantized).
+
+A model bundle export (`save_bundle` / `load_bundle`) adds `meta.json` with
+the feature columns and the FeatureTransformer parameters (plus `spatial.npz`
+for regional models), and loads into the same dict shape as the pickled
+bundles.
+"""
+import glob
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from features import FeatureTransformer
+from regional import SpatialFeatures
+
+FORMAT_VERSION = 1
+ARRAYS = ["feature", "threshold", "left", "right", "missing_left", "value", "roots", "offset"]
+VALUE_DTYPES = {"float64": np.float64, "float32": np.float32, "float16": np.float16}
+
+
+def _sklearn_tree(tree) -> Dict[str, np.ndarray]:
+    missing = getattr(tree, "missing_go_to_left", None)
+    return {
+        "is_leaf": tree.children_left == -1,
+        "feature": tree.feature,
+        "threshold": tree.threshold,
+        "left": tree.children_left,
+        "right": tree.children_right,
+        "missing_left": np.zeros(tree.node_count, dtype=bool) if missing is None else np.asarray(missing, dtype=bool),
+        "value": tree.value[:, :, 0],
+    }
+
+
+def _hgb_tree(predictor) -> Dict[str, np.ndarray]:
+    nodes = predictor.nodes
+    if nodes["is_categorical"].any():
+        raise ValueError("Categorical splits cannot be flattened")
+    return {
+        "is_leaf": nodes["is_leaf"].astype(bool),
+        "feature": nodes["feature_idx"],
+        "threshold": nodes["num_threshold"],
+        "left": nodes["left"],
+        "right": nodes["right"],
+        "missing_left": nodes["missing_go_to_left"].astype(bool),
+        "value": nodes["value"][:, None],
+    }
+
+
+def _trees(model) -> Tuple[List[Tuple[Dict[str, np.ndarray], List[int], float]], np.ndarray]:
+    """
+    (node table, output columns, leaf weight) for every tree of `model`, and
+    the per-output constant its predictions start from.
+    """
+    model = getattr(model, "student_", model)  # distilled models serve only the student
+    first = model.estimators_[0]
+    if hasattr(first, "estimators_") or hasattr(first, "_predictors"):
+        groups = [(est, [i]) for i, est in enumerate(model.estimators_)]  # MultiOutputRegressor
+    else:
+        groups = [(model, list(range(model.n_outputs_)))]
+    baseline = np.zeros(sum(len(cols) for _, cols in groups))
+    trees = []
+    for est, cols in groups:
+        if hasattr(est, "_predictors"):
+            baseline[cols] += np.ravel(est._baseline_prediction)
+            trees += [(_hgb_tree(p), cols, 1.0) for iteration in est._predictors for p in iteration]
+        else:
+            trees += [(_sklearn_tree(t.tree_), cols, 1.0 / len(est.estimators_)) for t in est.estimators_]
+    return trees, baseline
+
+
+def _floor_float32(values: np.ndarray) -> np.ndarray:
+    """Largest float32 <= each value, so float32 x <= t32 exactly when x <= t."""
+    out = values.astype(np.float32)
+    up = out.astype(np.float64) > values
+    out[up] = np.nextafter(out[up], np.float32(-np.inf))
+    return out
+
+
+def flatten(
+    model,
+    values_dtype: str = "float32",
+    scale: Optional[Sequence[float]] = None,
+    offset: Optional[Sequence[float]] = None,
+) -> Dict[str, np.ndarray]:
+    """Node arrays for `model`; predictions become sum(value[leaves]) * 1 + offset, with `scale` folded in."""
+    trees, baseline = _trees(model)
+    n_outputs = len(baseline)
+    scale_arr = np.ones(n_outputs) if scale is None else np.asarray(scale, dtype=np.float64)
+    parts: Dict[str, list] = {k: [] for k in ["feature", "threshold", "left", "right", "missing_left", "value"]}
+    roots = []
+    base = 0
+    for tree, cols, weight in trees:
+        is_leaf = tree["is_leaf"]
+        n = len(is_leaf)
+        roots.append(base)
+        parts["feature"].append(np.where(is_leaf, 0, tree["feature"]).astype(np.int32))
+        parts["threshold"].append(_floor_float32(np.where(is_leaf, 0.0, tree["threshold"])))
+        parts["left"].append(np.where(is_leaf, -1, tree["left"].astype(np.int64) + base).astype(np.int32))
+        parts["right"].append(np.where(is_leaf, -1, tree["right"].astype(np.int64) + base).astype(np.int32))
+        parts["missing_left"].append(tree["missing_left"])
+        value = np.zeros((n, n_outputs))
+        value[:, cols] = tree["value"] * scale_arr[cols] * weight
+        parts["value"].append(value)
+        base += n
+    arrays = {k: np.concatenate(v) for k, v in parts.items()}
+    arrays["value"] = arrays["value"].astype(VALUE_DTYPES[values_dtype])
+    arrays["roots"] = np.asarray(roots, dtype=np.int32)
+    arrays["offset"] = baseline * scale_arr + (0.0 if offset is None else np.asarray(offset, dtype=np.float64))
+    return arrays
+
+
+class FlatForest:
+    """Pure-NumPy predictor over flattened node arrays (drop-in for `model.predict`)."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], n_features: int):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.missing_left = arrays["missing_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.offset = arrays["offset"]
+        self.n_features_in_ = n_features
+        self.n_outputs_ = len(self.offset)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """(n, trees) index of the leaf each row reaches in every tree, all trees advanced together."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected X with {self.n_features_in_} features, got shape {X.shape}")
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        active = self.left[node] >= 0
+        while active.any():
+            r, t = np.nonzero(active)
+            current = node[r, t]
+            x = X[rows[r, 0], self.feature[current]]
+            go_left = (x <= self.threshold[current]) | (np.isnan(x) & self.missing_left[current])
+            nxt = np.where(go_left, self.left[current], self.right[current])
+            node[r, t] = nxt
+            active[r, t] = self.left[nxt] >= 0
+        return node
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        leaves = self.apply(X)
+        out = self.value[leaves].sum(axis=1, dtype=np.float64) + self.offset
+        return out[:, 0] if self.n_outputs_ == 1 else out
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, k).nbytes for k in ARRAYS)
+
+
+def save(
+    arrays: Dict[str, np.ndarray],
+    directory: os.PathLike | str,
+    meta: Dict[str, Any],
+    extras: Optional[Dict[str, Dict[str, np.ndarray]]] = None,
+) -> Path:
+    """
+    Write the arrays, any `extras` (file name -> arrays for one .npz) and
+    meta.json into a new versioned sibling `<directory>.<ns>`, then point the
+    `directory` symlink at it in one rename, so a complete export is always
+    visible under `directory`. The previous version is kept for readers that
+    resolved the link just before the swap; older ones are removed.
+    """
+    directory = Path(directory)
+    version = directory.with_name(f"{directory.name}.{time.time_ns()}")
+    version.mkdir(parents=True)
+    for name in ARRAYS:
+        np.save(version / f"{name}.npy", np.ascontiguousarray(arrays[name]))
+    for name, content in (extras or {}).items():
+        np.savez(version / name, **content)
+    meta = dict(meta, format_version=FORMAT_VERSION, n_nodes=int(len(arrays["feature"])), n_trees=int(len(arrays["roots"])),
+                value_dtype=str(arrays["value"].dtype))
+    (version / "meta.json").write_text(json.dumps(meta, indent=2))
+    previous = Path(os.readlink(directory)).name if directory.is_symlink() else None
+    if directory.exists() and not directory.is_symlink():
+        # Export written before versioning: move it aside (the only time the path is briefly missing)
+        os.replace(directory, directory.with_name(f"{directory.name}.0"))
+        previous = f"{directory.name}.0"
+    link = directory.with_name(directory.name + ".link")
+    link.unlink(missing_ok=True)
+    os.symlink(version.name, link)
+    os.replace(link, directory)
+    # Processes still mapping the old files keep them alive until they reload
+    keep = {version.name, previous}
+    for old in directory.parent.glob(f"{glob.escape(directory.name)}.*"):
+        if old.name not in keep and old.name[len(directory.name) + 1:].isdigit():
+            shutil.rmtree(old, ignore_errors=True)
+    return directory
+
+
+def load(directory: os.PathLike | str, mmap: bool = True) -> Tuple[FlatForest, Dict[str, Any]]:
+    # Resolve the link once so every file comes from the same version
+    directory = Path(directory).resolve()
+    meta = json.loads((directory / "meta.json").read_text())
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported flat forest format {meta.get('format_version')} in {directory}")
+    mode = "r" if mmap else None
+    arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mode) for name in ARRAYS}
+    return FlatForest(arrays, meta["n_features"]), meta
+
+
+def export_model(
+    model,
+    directory: os.PathLike | str,
+    n_features: int,
+    values_dtype: str = "float32",
+    scale: Optional[Sequence[float]] = None,
+    offset: Optional[Sequence[float]] = None,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Path:
+    arrays = flatten(model, values_dtype=values_dtype, scale=scale, offset=offset)
+    return save(arrays, directory, dict(meta or {}, n_features=n_features))
+
+
+def save_bundle(
+    directory: os.PathLike | str,
+    model,
+    feature_columns: Sequence[str],
+    transformer: FeatureTransformer,
+    values_dtype: str = "float32",
+    spatial: Optional[SpatialFeatures] = None,
+) -> Path:
+    """Export a train.py bundle (model + feature definition, regional tables) as a flat directory."""
+    extras = None
+    if spatial is not None:
+        extras = {"spatial.npz": {"points": spatial.points, "climatology": spatial.climatology,
+                                  "annual": spatial.annual, "neighbors": np.array(spatial.neighbors)}}
+    return save(
+        flatten(model, values_dtype=values_dtype),
+        directory,
+        {
+            "n_features": len(feature_columns),
+            "feature_columns": list(feature_columns),
+            "feature_version": transformer.version,
+            "base_columns": transformer.base_columns,
+            "windows": list(transformer.windows),
+            "regional": spatial is not None,
+        },
+        extras=extras,
+    )
+
+
+def load_bundle(directory: os.PathLike | str) -> Dict[str, Any]:
+    """Memory-map a flat bundle into the same dict shape as a pickled train.py bundle."""
+    directory = Path(directory).resolve()
+    model, meta = load(directory)
+    transformer = FeatureTransformer(meta["base_columns"], meta["windows"])
+    if transformer.version != meta["feature_version"]:
+        raise ValueError(f"Bundle uses feature version {meta['feature_version']}, code has {transformer.version}")
+    bundle = {
+        "model": model,
+        "feature_columns": meta["feature_columns"],
+        "transformer": transformer,
+        "feature_version": meta["feature_version"],
+    }
+    if meta.get("regional"):
+        with np.load(directory / "spatial.npz") as data:
+            bundle["spatial"] = SpatialFeatures(data["points"], data["climatology"], data["annual"], int(data["neighbors"]))
+    return bundle
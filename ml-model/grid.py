@@ -0,0 +1,135 @@
+"""
+Rasters of forecasts over a bounding box.
+
+`grid_axes` lays a bbox out as square cells of `resolution` degrees, north-up:
+row 0 is the northernmost row and column 0 the westernmost; predictions are
+made at cell centres. `predict_raster` aligns the per-cell POWER histories on
+the most recent day any cell has observed (cells whose history stops earlier,
+such as cache entries not refreshed yet, get no prediction rather than
+holding every other cell back), builds one (cells, days, variables) tensor, turns it into features with `transform_last_many` and runs a single
+model.predict over all cells for the next day. Later target dates are reached
+by rolling every cell forward with a `RolloutEngine`, still one model.predict
+over all cells per day. The result is a float32 (bands, rows, cols)
+raster with NaN where there is no prediction (no data, or outside the region
+of a regional model), encoded as .npy bytes or base64 of the raw buffer.
+"""
+import base64
+import datetime as dt
+import io
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from features import predict, transformer_for
+from regional import fill_spatial_at
+from rollout import MAX_HORIZON, RolloutEngine
+from telemetry import span
+
+BANDS = ["temperature", "humidity", "rain_probability"]
+
+
+def grid_axes(min_lat: float, min_lon: float, max_lat: float, max_lon: float, resolution: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Cell-centre latitudes (north to south) and longitudes (west to east); the last row/column may overhang the bbox."""
+    rows = max(1, int(np.ceil((max_lat - min_lat) / resolution - 1e-9)))
+    cols = max(1, int(np.ceil((max_lon - min_lon) / resolution - 1e-9)))
+    lats = max_lat - (np.arange(rows) + 0.5) * resolution
+    lons = min_lon + (np.arange(cols) + 0.5) * resolution
+    return np.round(lats, 6), np.round(lons, 6)
+
+
+def covered_cells(bundle: Dict[str, Any], lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """(rows, cols) mask of cells the model can answer: a regional model only covers its region."""
+    spatial = bundle.get("spatial")
+    if spatial is None:
+        return np.ones((len(lats), len(lons)), dtype=bool)
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing="ij")
+    return spatial.coverage(lat_grid.ravel(), lon_grid.ravel()).reshape(len(lats), len(lons))
+
+
+def _stack(frames: Sequence[Optional[pd.DataFrame]], columns: List[str], days: int) -> Tuple[np.ndarray, np.ndarray, Optional[dt.date]]:
+    """(cells, days, columns) histories ending on the latest observed day, the mask of cells observed on it, and that day."""
+    usable = [f for f in frames if isinstance(f, pd.DataFrame) and not f.empty]
+    values = np.full((len(frames), days, len(columns)), np.nan)
+    ok = np.zeros(len(frames), dtype=bool)
+    if not usable:
+        return values, ok, None
+    as_of = max(f.index[-1] for f in usable).to_datetime64().astype("datetime64[D]")
+    first = as_of - np.timedelta64(days - 1, "D")
+    for i, frame in enumerate(frames):
+        if not isinstance(frame, pd.DataFrame) or frame.empty:
+            continue
+        pos = (frame.index.to_numpy().astype("datetime64[D]") - first).astype(np.int64)
+        keep = (pos >= 0) & (pos < days)
+        cols = [frame.columns.get_loc(c) for c in columns]  # cheaper than frame[columns]
+        values[i, pos[keep]] = frame.to_numpy(dtype=np.float64)[keep][:, cols]
+        ok[i] = keep.any() and pos[keep].max() == days - 1
+    return values, ok, as_of.astype(object)
+
+
+def predict_raster(
+    bundle: Dict[str, Any],
+    lats: np.ndarray,
+    lons: np.ndarray,
+    frames: Sequence[Optional[pd.DataFrame]],
+    target: Optional[dt.date] = None,
+) -> Tuple[np.ndarray, Optional[dt.date]]:
+    """
+    frames: POWER history per cell in row-major order (None or empty when unavailable).
+    Returns the (len(BANDS), rows, cols) float32 raster valid on `target` (default:
+    the day after the last observation) and the observation day the predictions
+    start from. Raises ValueError when `target` is not 1 to MAX_HORIZON days
+    after that day.
+    """
+    transformer = transformer_for(bundle)
+    feature_columns = bundle["feature_columns"]
+    raster = np.full((len(BANDS), len(lats) * len(lons)), np.nan, dtype=np.float32)
+    with span("grid.features"):
+        values, ok, as_of = _stack(frames, transformer.base_columns, transformer.history_days)
+        if as_of is None or not ok.any():
+            return raster.reshape(len(BANDS), len(lats), len(lons)), as_of
+        steps = (target - as_of).days if target is not None else 1
+        if not 1 <= steps <= MAX_HORIZON:
+            raise ValueError(f"{target} is {steps} days after the latest observation ({as_of}); the grid forecasts 1 to {MAX_HORIZON} days ahead")
+        cells = np.flatnonzero(ok)
+        day = pd.Timestamp(as_of)
+        X = transformer.transform_last_many(values[cells], np.full(len(cells), day.dayofyear), feature_columns)
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing="ij")
+        cell_lats, cell_lons = lat_grid.ravel()[cells], lon_grid.ravel()[cells]
+        X = fill_spatial_at(bundle, X, cell_lats, cell_lons, np.full(len(cells), np.datetime64(as_of, "D")))
+    preds = predict(bundle["model"], X, feature_columns)
+    if steps > 1:
+        with span("grid.rollout"):
+            engines = [RolloutEngine(transformer, values[c], as_of, feature_columns) for c in cells]
+            for _ in range(steps - 1):
+                for engine, pred in zip(engines, preds):
+                    engine.push(engine.next_observation(pred))
+                X = np.vstack([engine.features() for engine in engines])
+                dates = np.full(len(cells), np.datetime64(engines[0].date, "D"))
+                preds = predict(bundle["model"], fill_spatial_at(bundle, X, cell_lats, cell_lons, dates), feature_columns)
+    raster[0, cells] = preds[:, 0]
+    raster[1, cells] = np.clip(preds[:, 1], 0.0, 100.0)
+    raster[2, cells] = np.clip(preds[:, 2], 0.0, 1.0)
+    return raster.reshape(len(BANDS), len(lats), len(lons)), as_of
+
+
+def band_stats(raster: np.ndarray) -> Dict[str, Dict[str, Optional[float]]]:
+    stats = {}
+    for name, band in zip(BANDS, raster):
+        valid = band[~np.isnan(band)]
+        stats[name] = (
+            {"min": round(float(valid.min()), 3), "mean": round(float(valid.mean()), 3), "max": round(float(valid.max()), 3)}
+            if valid.size else {"min": None, "mean": None, "max": None}
+        )
+    return stats
+
+
+def to_npy(raster: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, np.ascontiguousarray(raster, dtype="<f4"))
+    return buf.getvalue()
+
+
+def to_base64(raster: np.ndarray) -> str:
+    """Raw little-endian float32 buffer in C order, base64-encoded."""
+    return base64.b64encode(np.ascontiguousarray(raster, dtype="<f4").tobytes()).decode("ascii")
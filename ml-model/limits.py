@@ -0,0 +1,9 @@
+"""
+Forecast limits shared by the model code and the API schemas.
+
+Kept free of NumPy and pandas so the server can validate requests without
+loading the ML stack.
+"""
+
+# Days a next-day model is rolled forward at most (rollout.RolloutEngine)
+MAX_HORIZON = 14
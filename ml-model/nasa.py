@@ -1,8 +1,16 @@
 import datetime as dt
-from typing import Dict, List, Tuple
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 
+from power_cache import PowerCache, cache_from_env
+from power_parse import parse_daily
+from power_upstream import Upstream
+from telemetry import UPSTREAM_ERRORS, UPSTREAM_REQUESTS, span
+
 POWER_PARAMS = [
     "T2M",  # 2m air temperature (C)
     "T2M_MAX",
@@ -13,40 +21,120 @@ POWER_PARAMS = [
     "ALLSKY_SFC_UV_INDEX",  # UV Index
 ]
 
-MISSING_SENTINEL = -999
+# Daily point endpoint; point POWER_API_URL at a stand-in (bench/fake_power.py) to run offline
+POWER_DAILY_URL = os.getenv("POWER_API_URL", "https://power.larc.nasa.gov/api/temporal/daily/point")
+
+# One pooled session shared by every thread; pool size bounds concurrent
+# connections to the POWER host.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
 
 def _date_str(d: dt.date) -> str:
     return d.strftime("%Y%m%d")
 
 
-def fetch_power_daily(lat: float, lon: float, start: dt.date, end: dt.date, params: List[str] | None = None) -> pd.DataFrame:
+def fetch_power_daily_remote(lat: float, lon: float, start: dt.date, end: dt.date, params: List[str] | None = None) -> pd.DataFrame:
     """
-    Fetch NASA POWER daily data for a point between start and end (inclusive).
-    Returns a DataFrame indexed by date with one column per parameter.
+    Request NASA POWER daily data for a point between start and end (inclusive).
+    Returns a DataFrame indexed by date with one float32 column per parameter;
+    missing or implausible values are kept as NaN.
     """
-    parameters = ",".join(params or POWER_PARAMS)
+    params = list(params or POWER_PARAMS)
     url = (
-        "https://power.larc.nasa.gov/api/temporal/daily/point"
-        f"?parameters={parameters}&community=RE&longitude={lon}&latitude={lat}"
+        f"{POWER_DAILY_URL}?parameters={','.join(params)}&community=RE&longitude={lon}&latitude={lat}"
         f"&start={_date_str(start)}&end={_date_str(end)}&format=JSON"
     )
-    resp = requests.get(url, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
-    props = data.get("properties", {}).get("parameter", {})
-    # Build a DataFrame with date index
-    dates = sorted(next(iter(props.values())).keys()) if props else []
-    if not dates:
-        return pd.DataFrame()
-    df_dict: Dict[str, List[float]] = {}
-    for p in (params or POWER_PARAMS):
-        series = props.get(p, {})
-        df_dict[p] = [series.get(d) for d in dates]
-    df = pd.DataFrame(df_dict)
-    # Parse date index
-    df.index = pd.to_datetime(dates, format="%Y%m%d")
-    df.index.name = "date"
-    # Replace missing sentinel with NaN and drop rows with no temp
-    df = df.replace(MISSING_SENTINEL, pd.NA).dropna(subset=["T2M"]).astype(float)
-    return df
+    UPSTREAM_REQUESTS.inc(client="sync")
+    with span("power.remote"):
+        try:
+            resp = _session.get(url, timeout=60)
+            resp.raise_for_status()
+        except requests.HTTPError as e:
+            UPSTREAM_ERRORS.inc(client="sync", kind=f"http_{e.response.status_code}")
+            raise
+        except requests.RequestException:
+            UPSTREAM_ERRORS.inc(client="sync", kind="transport")
+            raise
+    with span("power.parse"):
+        return parse_daily(resp.content, params)
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code in RETRY_STATUS
+    return isinstance(e, (requests.ConnectionError, requests.Timeout))
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    response = getattr(e, "response", None)
+    try:
+        return float(response.headers["Retry-After"]) if response is not None else None
+    except (KeyError, ValueError):
+        return None
+
+
+# Every POWER request of the process goes through this gate (single-flight,
+# rate limit, retries); tune with POWER_RATE_LIMIT (requests/s, 0 disables),
+# POWER_RATE_BURST, POWER_RETRIES and POWER_RETRY_BACKOFF (seconds).
+upstream = Upstream(
+    fetch_power_daily_remote,
+    rate=float(os.getenv("POWER_RATE_LIMIT", "5")),
+    burst=int(os.getenv("POWER_RATE_BURST", "10")),
+    retries=int(os.getenv("POWER_RETRIES", "3")),
+    backoff=float(os.getenv("POWER_RETRY_BACKOFF", "0.5")),
+    retryable=_retryable,
+    retry_after=_retry_after,
+)
+fetch_power_daily_upstream = upstream.fetch
+
+_cache: PowerCache | None = cache_from_env(Path(__file__).resolve().parent / "power_cache")
+
+
+def get_power_cache() -> PowerCache | None:
+    return _cache
+
+
+def set_power_cache(cache: PowerCache | None) -> None:
+    """Replace the process-wide cache (None disables caching)."""
+    global _cache
+    _cache = cache
+
+
+def fetch_power_daily(
+    lat: float,
+    lon: float,
+    start: dt.date,
+    end: dt.date,
+    params: List[str] | None = None,
+    cached_only: bool = False,
+) -> pd.DataFrame:
+    """
+    Fetch NASA POWER daily data for a point between start and end (inclusive).
+    Returns a DataFrame indexed by date with one float32 column per parameter.
+    Served from the on-disk cache when enabled; only missing days hit the API,
+    through the shared `upstream` gate. If the API fails, cached days are
+    returned with `df.attrs["stale"]` set. With `cached_only` the API is never
+    called: whatever is cached is returned, with `df.attrs["missing"]` set when
+    some day would have needed a request.
+    """
+    params = list(params or POWER_PARAMS)
+    with span("power.fetch"):
+        if _cache is None:
+            if cached_only:
+                df = pd.DataFrame()
+                df.attrs["missing"] = True
+                return df
+            df = fetch_power_daily_upstream(lat, lon, start, end, params)
+        else:
+            df = _cache.get(lat, lon, start, end, params, fetch_power_daily_upstream, cached_only=cached_only)
+        if df.empty:
+            return df
+        # Drop rows with no temp
+        if "T2M" in df.columns:
+            df = df.dropna(subset=["T2M"])
+        return df
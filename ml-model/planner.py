@@ -0,0 +1,172 @@
+"""
+Best-date search for event planning.
+
+`best_dates` scores every day of a window (up to a year) in one vectorized
+pass. Days within MAX_HORIZON of the last POWER observation use the model's
+recursive rollout; every other day uses the location's day-of-year
+climatology (the precomputed index when the cell is indexed, otherwise a
+table computed from `years` of history fetched in one request).
+
+Per day, each variable gets a 0-1 component:
+- temperature: 1 inside [temp_min, temp_max], falling linearly to 0 at
+  TEMP_TOLERANCE_C degrees outside;
+- rain: 1 - rain probability, halved above `max_rain_probability`;
+- humidity: 1 up to `max_humidity`, falling to 0 at HUMIDITY_TOLERANCE
+  points above.
+The score is 100 * (0.5 temperature + 0.3 rain + 0.2 humidity), scaled by
+0.8 + 0.2 * the day's confidence. Days meeting every threshold rank first,
+then by score, then by date.
+"""
+import datetime as dt
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from climatology import VARIABLES, calendar_indices, compute_cell, get_index
+from features import predict, transformer_for
+from nasa import fetch_power_daily
+from regional import fill_spatial
+from rollout import MAX_HORIZON, RAIN_MM_PER_PROBABILITY, RolloutEngine
+from telemetry import span, timed
+
+MAX_WINDOW_DAYS = 366
+TEMP_TOLERANCE_C = 8.0
+HUMIDITY_TOLERANCE = 30.0
+WEIGHTS = (0.5, 0.3, 0.2)  # temperature, rain, humidity
+CLIMATOLOGY_CONFIDENCE = 0.6
+
+
+@dataclass
+class Thresholds:
+    temp_min: float = 18.0
+    temp_max: float = 30.0
+    max_rain_probability: float = 0.3
+    max_humidity: float = 70.0
+
+
+def climatology_means(lat: float, lon: float, years: int = 10) -> Optional[np.ndarray]:
+    """(366, [T2M, RH2M, PRECTOTCORR]) day-of-year means, from the index or `years` of fetched history."""
+    table = get_index().lookup(lat, lon)
+    if table is None:
+        end = dt.date.today() - dt.timedelta(days=1)
+        # Whole days rather than replace(year=...), which fails when `end` is Feb 29
+        history = fetch_power_daily(lat, lon, end - dt.timedelta(days=365 * years), end)
+        if history.empty:
+            return None
+        table = compute_cell(history)
+    means = np.asarray(table[:, :, 0], dtype=np.float64)
+    if not np.isfinite(means).any():
+        return None
+    # Calendar days no year observed (Feb 29 in short histories) take the nearest day's value
+    return pd.DataFrame(means, columns=VARIABLES).ffill().bfill().to_numpy()
+
+
+def rollout(bundle: Dict[str, Any], history: pd.DataFrame, lat: float, lon: float, horizon: int) -> Tuple[dt.date, np.ndarray]:
+    """First forecast day and the (horizon, [temp, humidity, rain probability]) rollout from `history`."""
+    transformer = transformer_for(bundle)
+    feature_columns = bundle["feature_columns"]
+    engine = RolloutEngine(
+        transformer,
+        history[transformer.base_columns].to_numpy(dtype=np.float64),
+        history.index[-1].date(),
+        feature_columns,
+    )
+    first = engine.date + dt.timedelta(days=1)
+    preds = engine.run(
+        lambda x: predict(bundle["model"], fill_spatial(bundle, x, lat, lon, [np.datetime64(engine.date)]), feature_columns),
+        horizon,
+    )
+    return first, preds
+
+
+def score_days(
+    temps: np.ndarray, humids: np.ndarray, rain: np.ndarray, confidence: np.ndarray, thresholds: Thresholds
+) -> Tuple[np.ndarray, np.ndarray]:
+    """0-100 scores and the mask of days meeting every threshold."""
+    t_out = np.maximum(thresholds.temp_min - temps, 0.0) + np.maximum(temps - thresholds.temp_max, 0.0)
+    h_out = np.maximum(humids - thresholds.max_humidity, 0.0)
+    rain_ok = rain <= thresholds.max_rain_probability
+    temp_score = np.clip(1.0 - t_out / TEMP_TOLERANCE_C, 0.0, 1.0)
+    rain_score = np.clip(1.0 - rain, 0.0, 1.0) * np.where(rain_ok, 1.0, 0.5)
+    humid_score = np.clip(1.0 - h_out / HUMIDITY_TOLERANCE, 0.0, 1.0)
+    w_t, w_r, w_h = WEIGHTS
+    score = 100.0 * (w_t * temp_score + w_r * rain_score + w_h * humid_score) * (0.8 + 0.2 * confidence)
+    return score, (t_out == 0) & rain_ok & (h_out == 0)
+
+
+@timed("plan.best_dates")
+def best_dates(
+    lat: float,
+    lon: float,
+    start: dt.date,
+    end: dt.date,
+    thresholds: Thresholds,
+    top_k: int = 5,
+    bundle: Optional[Dict[str, Any]] = None,
+    years: int = 10,
+) -> Dict[str, Any]:
+    """
+    The `top_k` best days in [start, end]. `bundle` is the short-term model
+    used near today (None: climatology only). Raises ValueError when no
+    climatology is available for the location.
+    """
+    dates = pd.date_range(start, end, freq="D")
+    n = len(dates)
+    temps, humids, rain = np.empty(n), np.empty(n), np.empty(n)
+    confidence = np.full(n, CLIMATOLOGY_CONFIDENCE)
+    source = np.full(n, "climatology", dtype=object)
+
+    with span("plan.climatology"):
+        means = climatology_means(lat, lon, years)
+    if means is None:
+        raise ValueError("No climatology available for this location")
+    slots = calendar_indices(dates.to_numpy())
+    temps[:] = means[slots, 0]
+    humids[:] = means[slots, 1]
+    rain[:] = np.clip(means[slots, 2] / RAIN_MM_PER_PROBABILITY, 0.0, 1.0)
+
+    # Days the rollout reaches from the latest observation replace climatology
+    today = dt.date.today()
+    if bundle is not None and start <= today + dt.timedelta(days=MAX_HORIZON):
+        last = today - dt.timedelta(days=1)
+        history = fetch_power_daily(lat, lon, last - dt.timedelta(days=14), last)
+        if not history.empty:
+            first_day = history.index[-1].date() + dt.timedelta(days=1)
+            horizon = min(MAX_HORIZON, (end - first_day).days + 1)
+            if horizon >= 1 and start < first_day + dt.timedelta(days=horizon):
+                with span("plan.rollout"):
+                    first, preds = rollout(bundle, history, lat, lon, horizon)
+                lead = np.arange(1, horizon + 1)
+                pos = (first - start).days + lead - 1
+                keep = (pos >= 0) & (pos < n)
+                temps[pos[keep]] = preds[keep, 0]
+                humids[pos[keep]] = np.clip(preds[keep, 1], 0.0, 100.0)
+                rain[pos[keep]] = np.clip(preds[keep, 2], 0.0, 1.0)
+                confidence[pos[keep]] = np.maximum(0.5, 0.9 - 0.03 * lead[keep])
+                source[pos[keep]] = "forecast"
+
+    scores, meets = score_days(temps, humids, rain, confidence, thresholds)
+    order = np.lexsort((np.arange(n), -scores, ~meets))[:top_k]
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "thresholds": asdict(thresholds),
+        "evaluated": n,
+        "meeting_thresholds": int(meets.sum()),
+        "forecast_days": int((source == "forecast").sum()),
+        "days": [
+            {
+                "date": dates[i].date().isoformat(),
+                "score": round(float(scores[i]), 1),
+                "meets_thresholds": bool(meets[i]),
+                "temperature": round(float(temps[i]), 1),
+                "humidity": round(float(humids[i]), 1),
+                "rain_probability": round(float(rain[i]), 3),
+                "confidence": round(float(confidence[i]), 2),
+                "source": source[i],
+            }
+            for i in order
+        ],
+    }
@@ -0,0 +1,319 @@
+"""
+Persistent on-disk cache for NASA POWER daily values.
+
+Values are stored per grid cell (lat/lon rounded to `resolution` degrees), per
+parameter and per year as a 366-row structured NumPy array (`TILE_DTYPE`):
+`value` holds the daily value as float32, the precision the parser
+produces (NaN when POWER reported the missing sentinel), and `fetched` the
+unix time it was fetched as float64 (0 when the day was never fetched).
+Tiles written by older versions as (366, 2) float64 arrays are converted
+when read. Past days are
+kept forever; days within `recent_days` of today expire after `recent_ttl`
+seconds because POWER keeps revising them for a while.
+
+Only the date ranges that are missing (or expired) are requested upstream,
+widened to blocks of `block_days` days aligned from 1981-01-01, so a
+following request for a shifted window (tomorrow's last 7 days, the next
+seasonal year) is already cached and concurrent requests ask for identical
+ranges. When the upstream fails, whatever is cached for the range (expired
+or partial) is served instead, flagged with `attrs["stale"]`; the error is
+raised only when nothing is cached. With `offline=True` nothing is fetched
+and whatever is cached is returned, which allows running against a seeded
+cache directory.
+"""
+import datetime as dt
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from telemetry import counter
+
+DAYS_PER_YEAR_SLOT = 366
+TILE_DTYPE = np.dtype([("value", "<f4"), ("fetched", "<f8")])
+BLOCK_EPOCH = dt.date(1981, 1, 1)
+CACHE_DAYS = counter("eventcast_power_cache_days_total", "Requested POWER days served from the disk cache (hit) or fetched (miss)", ["result"])
+STALE_SERVED = counter("eventcast_power_cache_stale_served_total", "Requests answered from cached data after an upstream failure")
+
+# fetch(lat, lon, start, end, params) -> DataFrame indexed by date, NaN for missing values
+RemoteFetch = Callable[[float, float, dt.date, dt.date, List[str]], pd.DataFrame]
+
+
+def missing_ranges(dates: List[dt.date], missing: np.ndarray) -> List[Tuple[dt.date, dt.date]]:
+    """Collapse a boolean mask over consecutive dates into inclusive (start, end) runs."""
+    if not missing.any():
+        return []
+    padded = np.concatenate(([False], missing, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return [(dates[s], dates[e]) for s, e in zip(starts, ends)]
+
+
+def _widen(ranges: List[Tuple[dt.date, dt.date]], block_days: int, today: dt.date) -> List[Tuple[dt.date, dt.date]]:
+    """Grow each range to whole `block_days` blocks (not past today) and merge the overlaps."""
+    if block_days <= 1:
+        return ranges
+    out: List[Tuple[dt.date, dt.date]] = []
+    for s, e in ranges:
+        first = BLOCK_EPOCH + dt.timedelta(days=(s - BLOCK_EPOCH).days // block_days * block_days)
+        last = BLOCK_EPOCH + dt.timedelta(days=((e - BLOCK_EPOCH).days // block_days + 1) * block_days - 1)
+        s, e = min(s, first), max(e, min(last, today))
+        if out and s <= out[-1][1] + dt.timedelta(days=1):
+            out[-1] = (out[-1][0], max(out[-1][1], e))
+        else:
+            out.append((s, e))
+    return out
+
+
+class PowerCache:
+    def __init__(
+        self,
+        root: os.PathLike | str,
+        resolution: float = 0.1,
+        recent_days: int = 7,
+        recent_ttl: float = 6 * 3600,
+        max_bytes: int = 512 * 1024 * 1024,
+        offline: bool = False,
+        block_days: int = 32,
+    ):
+        self.root = Path(root)
+        self.resolution = resolution
+        self.recent_days = recent_days
+        self.recent_ttl = recent_ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.block_days = block_days
+        self._locks: Dict[str, threading.RLock] = {}
+        self._guard = threading.Lock()
+        self._evicting = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+
+    def cell(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Snap a point to the centre of its cache cell."""
+        r = self.resolution
+        return round(round(lat / r) * r, 4), round(round(lon / r) * r, 4)
+
+    def _cell_dir(self, cell: Tuple[float, float]) -> Path:
+        return self.root / f"{cell[0]:+.4f}_{cell[1]:+.4f}"
+
+    def _lock_for(self, key: str) -> threading.RLock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.RLock())
+
+    def _load_year(self, cell_dir: Path, param: str, year: int) -> np.ndarray:
+        path = cell_dir / f"{param}_{year}.npy"
+        if path.exists():
+            try:
+                arr = np.load(path)
+                if arr.dtype == TILE_DTYPE and arr.shape == (DAYS_PER_YEAR_SLOT,):
+                    return arr.copy()
+                if arr.shape == (DAYS_PER_YEAR_SLOT, 2):  # pre-float32 layout
+                    tile = np.empty(DAYS_PER_YEAR_SLOT, dtype=TILE_DTYPE)
+                    tile["value"], tile["fetched"] = arr[:, 0], arr[:, 1]
+                    return tile
+            except (OSError, ValueError):
+                pass  # corrupt/partial file: refetch
+        arr = np.zeros(DAYS_PER_YEAR_SLOT, dtype=TILE_DTYPE)
+        arr["value"] = np.nan
+        return arr
+
+    def _save_year(self, cell_dir: Path, param: str, year: int, arr: np.ndarray) -> None:
+        cell_dir.mkdir(parents=True, exist_ok=True)
+        path = cell_dir / f"{param}_{year}.npy"
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, path)
+
+    def get(
+        self,
+        lat: float,
+        lon: float,
+        start: dt.date,
+        end: dt.date,
+        params: List[str],
+        fetch: RemoteFetch,
+        cached_only: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Return POWER daily values for the cell containing (lat, lon) between start
+        and end (inclusive), fetching only missing or expired days via `fetch`.
+        The frame keeps every requested day; missing values are NaN. With
+        `cached_only`, nothing is fetched and `df.attrs["missing"]` is set when
+        some day would have been.
+        """
+        cell = self.cell(lat, lon)
+        cell_dir = self._cell_dir(cell)
+        if end < start:
+            return pd.DataFrame()
+        index = pd.date_range(start, end, freq="D", name="date")
+        rows = index.dayofyear.to_numpy() - 1
+        yrs = index.year.to_numpy()
+
+        year_range = range(start.year, end.year + 1)
+        with self._lock_for(cell_dir.name):
+            years = {p: {y: self._load_year(cell_dir, p, y) for y in year_range} for p in params}
+        failure: Optional[Exception] = None
+        missing = False
+        if cached_only and not self.offline:
+            missing = bool(self._stale_mask(index, rows, yrs, params, years).any())
+        elif not self.offline:
+            stale = self._stale_mask(index, rows, yrs, params, years)
+            CACHE_DAYS.inc(int(stale.sum()), result="miss")
+            CACHE_DAYS.inc(int(len(stale) - stale.sum()), result="hit")
+            ranges = _widen(missing_ranges([ts.date() for ts in index], stale), self.block_days, dt.date.today())
+            if ranges:
+                # Upstream calls run without holding the cell lock so that
+                # concurrent requests for other ranges of this cell proceed.
+                fetched = []
+                for s, e in ranges:
+                    try:
+                        fetched.append((s, e, fetch(cell[0], cell[1], s, e, params), time.time()))
+                    except Exception as exc:
+                        failure = exc
+                stored_years = range(min(start.year, ranges[0][0].year), max(end.year, ranges[-1][1].year) + 1)
+                with self._lock_for(cell_dir.name):
+                    # Re-read so writes made by other threads meanwhile are kept.
+                    years = {p: {y: self._load_year(cell_dir, p, y) for y in stored_years} for p in params}
+                    written = self._store(cell_dir, fetched, params, years)
+                self._account(written)
+        if cell_dir.exists():
+            os.utime(cell_dir)  # LRU marker for eviction
+
+        cols: Dict[str, np.ndarray] = {}
+        for p in params:
+            out = np.full(len(index), np.nan, dtype=np.float32)
+            for y, arr in years[p].items():
+                sel = yrs == y
+                out[sel] = arr["value"][rows[sel]]
+            cols[p] = out
+        df = pd.DataFrame(cols, index=index)
+        if failure is not None:
+            if df.isna().all().all():
+                raise failure
+            STALE_SERVED.inc()
+            print(f"POWER fetch for cell {cell} failed ({failure}); serving cached data")
+            df.attrs["stale"] = True
+        if missing:
+            df.attrs["missing"] = True
+        return df
+
+    def _stale_mask(
+        self,
+        index: pd.DatetimeIndex,
+        rows: np.ndarray,
+        yrs: np.ndarray,
+        params: List[str],
+        years: Dict[str, Dict[int, np.ndarray]],
+    ) -> np.ndarray:
+        now = time.time()
+        recent = index >= pd.Timestamp(dt.date.today() - dt.timedelta(days=self.recent_days))
+        stale = np.zeros(len(index), dtype=bool)
+        for p in params:
+            for y, arr in years[p].items():
+                sel = yrs == y
+                fetched_at = arr["fetched"][rows[sel]]
+                stale[sel] |= (fetched_at == 0) | (recent[sel] & (now - fetched_at > self.recent_ttl))
+        return stale
+
+    def _store(
+        self,
+        cell_dir: Path,
+        fetched: List[Tuple[dt.date, dt.date, pd.DataFrame, float]],
+        params: List[str],
+        years: Dict[str, Dict[int, np.ndarray]],
+    ) -> int:
+        """Write fetched ranges into the year arrays and persist them. Returns approximate bytes written."""
+        touched: set[Tuple[str, int]] = set()
+        for s, e, df, fetched_at in fetched:
+            index = pd.date_range(s, e, freq="D")
+            frame = df.reindex(index) if not df.empty else pd.DataFrame(index=index)
+            rows = index.dayofyear.to_numpy() - 1
+            yrs = index.year.to_numpy()
+            for p in params:
+                if p in frame.columns:
+                    values = frame[p].to_numpy(dtype=np.float32, na_value=np.nan)
+                else:
+                    values = np.full(len(index), np.nan, dtype=np.float32)
+                for y in np.unique(yrs):
+                    sel = yrs == y
+                    arr = years[p][int(y)]
+                    arr["value"][rows[sel]] = values[sel]
+                    arr["fetched"][rows[sel]] = fetched_at
+                    touched.add((p, int(y)))
+        for p, y in touched:
+            self._save_year(cell_dir, p, y, years[p][y])
+        return len(touched) * (DAYS_PER_YEAR_SLOT * TILE_DTYPE.itemsize + 128)
+
+    def _dir_bytes(self, path: Path) -> int:
+        total = 0
+        for f in path.glob("*.npy"):
+            try:
+                total += f.stat().st_size
+            except FileNotFoundError:
+                pass  # cell evicted meanwhile
+        return total
+
+    def _account(self, added: int) -> None:
+        with self._guard:
+            if self._approx_bytes is None:
+                self._approx_bytes = self.size_bytes()
+            else:
+                self._approx_bytes += added
+            over = self._approx_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def size_bytes(self) -> int:
+        if not self.root.exists():
+            return 0
+        return sum(self._dir_bytes(d) for d in self.root.iterdir() if d.is_dir())
+
+    def evict(self) -> int:
+        """Drop least recently used cells until the cache fits in `max_bytes`. Returns cells removed."""
+        with self._evicting:
+            return self._evict()
+
+    def _evict(self) -> int:
+        if not self.root.exists():
+            return 0
+        cells = sorted((d for d in self.root.iterdir() if d.is_dir()), key=lambda d: d.stat().st_mtime)
+        sizes = {d: self._dir_bytes(d) for d in cells}
+        total = sum(sizes.values())
+        removed = 0
+        for d in cells:
+            if total <= self.max_bytes:
+                break
+            with self._lock_for(d.name):
+                shutil.rmtree(d, ignore_errors=True)
+            total -= sizes[d]
+            removed += 1
+        with self._guard:
+            self._approx_bytes = total
+        return removed
+
+
+def cache_from_env(default_root: os.PathLike | str) -> Optional[PowerCache]:
+    """
+    Build the cache from environment variables:
+    POWER_CACHE (set to 0 to disable), POWER_CACHE_DIR, POWER_CACHE_MAX_MB,
+    POWER_CACHE_RESOLUTION, POWER_CACHE_RECENT_DAYS, POWER_CACHE_RECENT_TTL,
+    POWER_BLOCK_DAYS and POWER_OFFLINE.
+    """
+    if os.getenv("POWER_CACHE", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    return PowerCache(
+        root=os.getenv("POWER_CACHE_DIR", str(default_root)),
+        resolution=float(os.getenv("POWER_CACHE_RESOLUTION", "0.1")),
+        recent_days=int(os.getenv("POWER_CACHE_RECENT_DAYS", "7")),
+        recent_ttl=float(os.getenv("POWER_CACHE_RECENT_TTL", str(6 * 3600))),
+        max_bytes=int(float(os.getenv("POWER_CACHE_MAX_MB", "512")) * 1024 * 1024),
+        offline=os.getenv("POWER_OFFLINE", "0").lower() in ("1", "true", "yes", "on"),
+        block_days=int(os.getenv("POWER_BLOCK_DAYS", "32")),
+    )
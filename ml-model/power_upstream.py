@@ -0,0 +1,160 @@
+"""
+Shared gate in front of the NASA POWER API.
+
+Every upstream request of the process goes through one `Upstream`:
+- single-flight: a request for a point and date range waits for in-flight
+  requests of the same point that cover part of its range (with at least its
+  parameters) and only fetches the days nobody is fetching yet, so a burst of
+  requests for one cell costs one upstream call;
+- a token bucket caps the request rate (POWER throttles clients that burst);
+- transport errors, 429 and 5xx are retried with full-jitter exponential
+  backoff, honouring Retry-After.
+
+The PowerCache calls it with cell coordinates and block-aligned ranges, which
+is what makes requests from nearby points and overlapping windows coincide.
+"""
+import datetime as dt
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from telemetry import counter, span
+
+RemoteFetch = Callable[[float, float, dt.date, dt.date, List[str]], pd.DataFrame]
+
+COALESCED = counter("eventcast_upstream_coalesced_total", "Upstream fetches avoided by joining an in-flight request")
+RETRIES = counter("eventcast_upstream_retries_total", "Upstream requests retried after a retryable failure")
+
+
+class TokenBucket:
+    """`rate` requests per second on average, bursts of up to `burst`; rate <= 0 disables the limit."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _subtract(start: dt.date, end: dt.date, covered: Sequence[Tuple[dt.date, dt.date]]) -> List[Tuple[dt.date, dt.date]]:
+    """Parts of [start, end] outside every covered range."""
+    gaps = []
+    cur = start
+    for s, e in sorted(covered):
+        if e < cur:
+            continue
+        if s > end:
+            break
+        if s > cur:
+            gaps.append((cur, s - dt.timedelta(days=1)))
+        cur = max(cur, e + dt.timedelta(days=1))
+    if cur <= end:
+        gaps.append((cur, end))
+    return gaps
+
+
+class _Flight:
+    def __init__(self, start: dt.date, end: dt.date, params: frozenset):
+        self.start = start
+        self.end = end
+        self.params = params
+        self.future: Future = Future()
+
+
+class Upstream:
+    def __init__(
+        self,
+        fetch: RemoteFetch,
+        rate: float = 5.0,
+        burst: int = 10,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        retryable: Callable[[Exception], bool] = lambda e: False,
+        retry_after: Callable[[Exception], Optional[float]] = lambda e: None,
+    ):
+        self._fetch = fetch
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._retryable = retryable
+        self._retry_after = retry_after
+        self._inflight: Dict[Tuple[float, float], List[_Flight]] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, lat: float, lon: float, start: dt.date, end: dt.date, params: List[str]) -> pd.DataFrame:
+        """One rate-limited upstream request with jittered retries."""
+        attempt = 0
+        while True:
+            with span("power.rate_limit"):
+                self.bucket.acquire()
+            try:
+                return self._fetch(lat, lon, start, end, params)
+            except Exception as e:
+                if attempt >= self.retries or not self._retryable(e):
+                    raise
+                # Full jitter keeps many clients that failed together from retrying together
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                delay = max(delay, self._retry_after(e) or 0.0)
+                RETRIES.inc()
+                print(f"POWER request failed ({e}); retry {attempt + 1}/{self.retries} in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def fetch(self, lat: float, lon: float, start: dt.date, end: dt.date, params: List[str]) -> pd.DataFrame:
+        """POWER daily values for [start, end], sharing in-flight requests for the same point."""
+        key = (round(lat, 4), round(lon, 4))
+        need = frozenset(params)
+        with self._lock:
+            joined = [
+                f for f in self._inflight.get(key, [])
+                if need <= f.params and f.start <= end and f.end >= start
+            ]
+            mine = [_Flight(s, e, need) for s, e in _subtract(start, end, [(f.start, f.end) for f in joined])]
+            self._inflight.setdefault(key, []).extend(mine)
+        if joined:
+            COALESCED.inc(len(joined))
+        try:
+            for flight in mine:
+                try:
+                    flight.future.set_result(self._call(lat, lon, flight.start, flight.end, list(params)))
+                except BaseException as e:
+                    flight.future.set_exception(e)
+        finally:
+            with self._lock:
+                flights = self._inflight.get(key, [])
+                for flight in mine:
+                    flights.remove(flight)
+                if not flights:
+                    self._inflight.pop(key, None)
+
+        frames = [f.future.result() for f in joined + mine]
+        frames = [df[[p for p in params if p in df.columns]] for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames)
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+        return df.loc[(df.index >= pd.Timestamp(start)) & (df.index <= pd.Timestamp(end))]
@@ -0,0 +1,176 @@
+"""
+Spatial features for a single regional model.
+
+A regional model is trained on data pooled from a grid of points. Next to the
+usual lag/rolling/calendar features, every row gets:
+- `lat`, `lon` of the location;
+- `annual_*`: the location's long-term mean T2M / RH2M / PRECTOTCORR, which
+  stand in for elevation, continentality and other static effects;
+- `clim_*`: the location's smoothed day-of-year climatology for the target
+  (next) day.
+
+The per-point tables are stored with the model (`SpatialFeatures`); any other
+location inside the region gets them by inverse-distance weighting of the
+nearest grid points, so one warm model serves every location in the region.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from climatology import calendar_indices
+
+CLIMATE_VARIABLES = ["T2M", "RH2M", "PRECTOTCORR"]
+SPATIAL_COLUMNS = (
+    ["lat", "lon"]
+    + [f"annual_{v}" for v in CLIMATE_VARIABLES]
+    + [f"clim_{v}" for v in CLIMATE_VARIABLES]
+)
+DAYS = 366
+
+
+def grid_points(min_lat: float, min_lon: float, max_lat: float, max_lon: float, step: float) -> List[Tuple[float, float]]:
+    lats = np.arange(min_lat, max_lat + step / 2, step)
+    lons = np.arange(min_lon, max_lon + step / 2, step)
+    return [(round(float(a), 4), round(float(o), 4)) for a in lats for o in lons]
+
+
+def smoothed_climatology(history: pd.DataFrame, window: int = 15) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (366, 3) day-of-year means smoothed with a circular `window`-day moving
+    average (a few years of data are too noisy per single day), and the (3,)
+    overall means, from a date-indexed frame.
+    """
+    values = history[CLIMATE_VARIABLES].to_numpy(dtype=np.float64)
+    slots = calendar_indices(history.index.to_numpy())
+    sums = np.zeros((DAYS, len(CLIMATE_VARIABLES)))
+    counts = np.zeros((DAYS, len(CLIMATE_VARIABLES)))
+    valid = ~np.isnan(values)
+    np.add.at(sums, slots, np.where(valid, values, 0.0))
+    np.add.at(counts, slots, valid)
+    half = window // 2
+    kernel = np.ones(window)
+    wrap = lambda a: np.concatenate([a[-half:], a, a[:half]])  # noqa: E731
+    smooth_sums = np.column_stack([np.convolve(wrap(sums[:, j]), kernel, "valid") for j in range(sums.shape[1])])
+    smooth_counts = np.column_stack([np.convolve(wrap(counts[:, j]), kernel, "valid") for j in range(counts.shape[1])])
+    annual = np.nanmean(np.where(valid, values, np.nan), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        clim = np.where(smooth_counts > 0, smooth_sums / np.maximum(smooth_counts, 1), annual)
+    return clim.astype(np.float32), annual.astype(np.float32)
+
+
+class SpatialFeatures:
+    def __init__(self, points: np.ndarray, climatology: np.ndarray, annual: np.ndarray, neighbors: int = 4):
+        self.points = np.asarray(points, dtype=np.float64)  # (P, 2) lat, lon
+        self.climatology = np.asarray(climatology, dtype=np.float32)  # (P, 366, 3)
+        self.annual = np.asarray(annual, dtype=np.float32)  # (P, 3)
+        self.neighbors = neighbors
+        if len(self.points) > 1:
+            d = self._distances(self.points[:, 0:1], self.points[:, 1:2])
+            np.fill_diagonal(d, np.inf)
+            spacing = float(np.median(d.min(axis=1)))
+        else:
+            spacing = 50.0
+        # Locations farther than this from every grid point are outside the region
+        self.max_distance_km = 1.5 * spacing
+
+    @classmethod
+    def from_histories(cls, histories: Dict[Tuple[float, float], pd.DataFrame], neighbors: int = 4) -> "SpatialFeatures":
+        points = list(histories)
+        tables = [smoothed_climatology(histories[p]) for p in points]
+        return cls(
+            np.array(points),
+            np.stack([t[0] for t in tables]),
+            np.stack([t[1] for t in tables]),
+            neighbors=neighbors,
+        )
+
+    def _distances(self, lat, lon) -> np.ndarray:
+        """Great-circle km from (lat, lon) (broadcastable) to every grid point."""
+        p1, p2 = np.radians(lat), np.radians(self.points[:, 0])
+        dl = np.radians(self.points[:, 1] - lon)
+        a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+        return 6371.0 * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def covers(self, lat: float, lon: float) -> bool:
+        return float(self._distances(lat, lon).min()) <= self.max_distance_km
+
+    def interpolate(self, lat: float, lon: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(366, 3) climatology and (3,) annual means at a location by inverse-distance weighting."""
+        d = self._distances(lat, lon)
+        nearest = np.argsort(d)[: self.neighbors]
+        if d[nearest[0]] < 1e-6:
+            weights = np.zeros(len(nearest))
+            weights[0] = 1.0
+        else:
+            weights = 1.0 / d[nearest] ** 2
+            weights /= weights.sum()
+        clim = np.tensordot(weights, self.climatology[nearest], axes=1)
+        annual = weights @ self.annual[nearest]
+        return clim, annual
+
+    def features(self, lat: float, lon: float, dates: np.ndarray) -> np.ndarray:
+        """(n, len(SPATIAL_COLUMNS)) spatial features for rows observed on `dates` (target = next day)."""
+        clim, annual = self.interpolate(lat, lon)
+        targets = np.asarray(dates, dtype="datetime64[D]").reshape(-1) + np.timedelta64(1, "D")
+        out = np.empty((len(targets), len(SPATIAL_COLUMNS)), dtype=np.float32)
+        out[:, 0] = lat
+        out[:, 1] = lon
+        out[:, 2:5] = annual
+        out[:, 5:8] = clim[calendar_indices(targets)]
+        return out
+
+    def coverage(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """`covers` for many locations at once (boolean array)."""
+        lats, lons = np.asarray(lats, dtype=np.float64).reshape(-1, 1), np.asarray(lons, dtype=np.float64).reshape(-1, 1)
+        return self._distances(lats, lons).min(axis=1) <= self.max_distance_km
+
+    def features_at(self, lats: np.ndarray, lons: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """
+        (k, len(SPATIAL_COLUMNS)) spatial features for one row per location: row i
+        is observed at (lats[i], lons[i]) on dates[i]. Same values as `features`,
+        with the inverse-distance weights computed for all locations at once.
+        """
+        lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+        lons = np.asarray(lons, dtype=np.float64).reshape(-1)
+        d = self._distances(lats[:, None], lons[:, None])  # (k, P)
+        nearest = np.argsort(d, axis=1)[:, : self.neighbors]
+        dn = np.take_along_axis(d, nearest, axis=1)
+        exact = dn[:, 0] < 1e-6
+        with np.errstate(divide="ignore"):
+            weights = np.where(exact[:, None], 0.0, 1.0 / dn ** 2)
+        weights[exact, 0] = 1.0
+        weights /= weights.sum(axis=1, keepdims=True)
+        targets = np.asarray(dates, dtype="datetime64[D]").reshape(-1) + np.timedelta64(1, "D")
+        clim = self.climatology[nearest, calendar_indices(targets)[:, None]]  # (k, neighbors, 3)
+        out = np.empty((len(lats), len(SPATIAL_COLUMNS)), dtype=np.float32)
+        out[:, 0] = lats
+        out[:, 1] = lons
+        out[:, 2:5] = np.einsum("kn,knv->kv", weights, self.annual[nearest])
+        out[:, 5:8] = np.einsum("kn,knv->kv", weights, clim)
+        return out
+
+    def fill(self, X: np.ndarray, columns: Sequence[str], lat: float, lon: float, dates: np.ndarray) -> np.ndarray:
+        """Write the spatial features into their columns of X (in place) and return X."""
+        index = {c: i for i, c in enumerate(columns)}
+        positions = [index[c] for c in SPATIAL_COLUMNS]
+        X[:, positions] = self.features(lat, lon, dates)
+        return X
+
+
+def fill_spatial(bundle: dict, X: np.ndarray, lat: float, lon: float, dates) -> np.ndarray:
+    """Spatial features for regional bundles; other bundles get X back unchanged."""
+    spatial: Optional[SpatialFeatures] = bundle.get("spatial")
+    if spatial is None:
+        return X
+    return spatial.fill(X, bundle["feature_columns"], lat, lon, dates)
+
+
+def fill_spatial_at(bundle: dict, X: np.ndarray, lats: np.ndarray, lons: np.ndarray, dates) -> np.ndarray:
+    """`fill_spatial` for one row per location (row i at lats[i], lons[i], dates[i])."""
+    spatial: Optional[SpatialFeatures] = bundle.get("spatial")
+    if spatial is None:
+        return X
+    index = {c: i for i, c in enumerate(bundle["feature_columns"])}
+    X[:, [index[c] for c in SPATIAL_COLUMNS]] = spatial.features_at(lats, lons, dates)
+    return X
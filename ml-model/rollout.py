@@ -0,0 +1,118 @@
+"""
+Recursive multi-day rollout for next-day models.
+
+The engine keeps the last `history_days` observations of every base column in
+a ring buffer together with running sums/counts for each rolling window, so
+after each predicted day the lag and rolling features are updated exactly in
+O(1) instead of being rebuilt (or left stale) on a DataFrame. Every step runs
+on raw NumPy arrays.
+"""
+import datetime as dt
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from features import FeatureTransformer
+from limits import MAX_HORIZON
+
+# Same mm <-> probability mapping the API uses for rain (20 mm ~ certain rain)
+RAIN_MM_PER_PROBABILITY = 20.0
+
+
+class RolloutEngine:
+    def __init__(
+        self,
+        transformer: FeatureTransformer,
+        history: np.ndarray,
+        last_date: dt.date,
+        columns: Optional[Sequence[str]] = None,
+    ):
+        """
+        history: (days, len(transformer.base_columns)) observations in date order,
+        ending on `last_date`. `columns` is the model's feature order.
+        """
+        self.transformer = transformer
+        self.columns = list(columns) if columns is not None else transformer.feature_columns
+        self.date = last_date
+        history = np.asarray(history, dtype=np.float64)
+        self.size = transformer.history_days
+        self.n_base = history.shape[1]
+        self._col = {c: i for i, c in enumerate(transformer.base_columns)}
+
+        self._buf = np.full((self.size, self.n_base), np.nan)
+        tail = history[-self.size:]
+        self._buf[-len(tail):] = tail
+        self._pos = self.size - 1  # index of the most recent observation
+
+        self._sums = {}
+        self._counts = {}
+        for w in transformer.windows:
+            window = self._buf[self.size - w:]
+            valid = ~np.isnan(window)
+            self._sums[w] = np.where(valid, window, 0.0).sum(axis=0)
+            self._counts[w] = valid.sum(axis=0)
+
+    def _back(self, k: int) -> np.ndarray:
+        """Observation k days before the most recent one."""
+        return self._buf[(self._pos - k) % self.size]
+
+    def features(self) -> np.ndarray:
+        """Float32 (1, features) row for the current day in the model's column order."""
+        n_lags = len(self.transformer.lags)
+        lag_block = np.empty((self.n_base, n_lags))
+        lag_block[:, 0] = self._back(0)
+        lag_block[:, 1] = self._back(1)
+        for k, w in enumerate(self.transformer.windows, start=2):
+            counts = self._counts[w]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                lag_block[:, k] = np.where(counts > 0, self._sums[w] / np.maximum(counts, 1), np.nan)
+        out = np.empty((1, len(self.transformer.feature_columns)), dtype=np.float32)
+        out[0, : self.n_base * n_lags] = lag_block.reshape(-1)
+        doy = self.date.timetuple().tm_yday
+        angle = 2 * np.pi * doy / 365.25
+        out[0, self.n_base * n_lags:] = (doy, np.sin(angle), np.cos(angle))
+        return self.transformer.reorder(out, self.columns)
+
+    def push(self, observation: np.ndarray) -> None:
+        """Append the next day's observation, sliding every rolling window by one."""
+        observation = np.asarray(observation, dtype=np.float64)
+        incoming = ~np.isnan(observation)
+        for w in self.transformer.windows:
+            outgoing = self._back(w - 1)
+            leaving = ~np.isnan(outgoing)
+            self._sums[w] += np.where(incoming, observation, 0.0) - np.where(leaving, outgoing, 0.0)
+            self._counts[w] += incoming.astype(int) - leaving.astype(int)
+        self._pos = (self._pos + 1) % self.size
+        self._buf[self._pos] = observation
+        self.date = self.date + dt.timedelta(days=1)
+
+    def next_observation(self, prediction: np.ndarray) -> np.ndarray:
+        """
+        Turn a (temp, humidity, rain probability) prediction into the next day's
+        base observation. Max/min temperature keep a +-2 C spread and wind
+        speed persists from the last observed day.
+        """
+        temp, humid, rain_prob = float(prediction[0]), float(prediction[1]), min(max(float(prediction[2]), 0.0), 1.0)
+        obs = self._back(0).copy()
+        values = {
+            "T2M": temp,
+            "T2M_MAX": temp + 2,
+            "T2M_MIN": temp - 2,
+            "RH2M": humid,
+            "PRECTOTCORR": rain_prob * RAIN_MM_PER_PROBABILITY,
+        }
+        for name, value in values.items():
+            if name in self._col:
+                obs[self._col[name]] = value
+        return obs
+
+    def run(self, predict_fn: Callable[[np.ndarray], np.ndarray], horizon: int) -> np.ndarray:
+        """Roll forward `horizon` days; returns the (horizon, outputs) raw predictions."""
+        if not 1 <= horizon <= MAX_HORIZON:
+            raise ValueError(f"horizon must be between 1 and {MAX_HORIZON}")
+        preds = []
+        for _ in range(horizon):
+            y = np.asarray(predict_fn(self.features()))[0]
+            preds.append(y)
+            self.push(self.next_observation(y))
+        return np.vstack(preds)
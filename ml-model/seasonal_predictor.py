@@ -1,11 +1,23 @@
 import datetime as dt
-from typing import Literal, Tuple, List
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Literal, Optional, Tuple, List
 import pandas as pd
 import numpy as np
 from nasa import fetch_power_daily
+from climatology import calendar_index, get_index
+from telemetry import bind, span, timed
 
 RangeMode = Literal["date", "month"]
 
+# Bounded pool shared by all requests so a burst of seasonal calls cannot
+# open an unbounded number of upstream connections.
+_fetch_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEASONAL_FETCH_WORKERS", "8")),
+    thread_name_prefix="seasonal-fetch",
+)
+
 
 def _days_in_month(year: int, month: int) -> int:
     next_month = month % 12 + 1
@@ -13,22 +25,76 @@ def _days_in_month(year: int, month: int) -> int:
     return (dt.date(next_year, next_month, 1) - dt.date(year, month, 1)).days
 
 
+def _fetch_year(lat: float, lon: float, start: dt.date, end: dt.date, back: int) -> Tuple[pd.DataFrame, float]:
+    t0 = time.perf_counter()
+    s = start.replace(year=start.year - back)
+    e = end.replace(year=end.year - back)
+    with span("seasonal.fetch_year"):
+        df = fetch_power_daily(lat, lon, s, e)
+    return df, time.perf_counter() - t0
+
+
 def _collect_multi_year(lat: float, lon: float, start: dt.date, end: dt.date, years: int = 5) -> pd.DataFrame:
+    """
+    Fetch the [start, end] window for each of the previous `years` years
+    concurrently. Years that fail are skipped; per-year fetch seconds and the
+    failed years are reported in `attrs["year_timings"]` / `attrs["failed_years"]`.
+    """
+    # bind: the pool threads record their spans into the calling request's profile
+    futures = {i: _fetch_pool.submit(bind(_fetch_year), lat, lon, start, end, i) for i in range(1, years + 1)}
     frames: List[pd.DataFrame] = []
-    for i in range(1, years + 1):
-        s = start.replace(year=start.year - i)
-        e = end.replace(year=end.year - i)
+    timings: Dict[int, float] = {}
+    failed: List[int] = []
+    for i, fut in futures.items():
+        year = start.year - i
         try:
-            df = fetch_power_daily(lat, lon, s, e)
-            df["year"] = df.index.year
-            frames.append(df)
+            df, elapsed = fut.result()
         except Exception:
+            failed.append(year)
             continue
+        timings[year] = round(elapsed, 4)
+        df["year"] = df.index.year
+        frames.append(df)
     if not frames:
-        return pd.DataFrame()
-    return pd.concat(frames).sort_index()
+        out = pd.DataFrame()
+    else:
+        out = pd.concat(frames).sort_index()
+    out.attrs["year_timings"] = timings
+    out.attrs["failed_years"] = failed
+    return out
+
 
+@timed("seasonal.index")
+def _from_index(
+    lat: float, lon: float, target: dt.date, mode: RangeMode
+) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, float]]:
+    """Answer from the precomputed climatology index; None when the cell is not indexed."""
+    table = get_index().lookup(lat, lon)
+    if table is None:
+        return None
+    means = np.asarray(table[:, :, 0], dtype=np.float64)  # (366, [T2M, RH2M, PRECTOTCORR])
+    if mode == "date":
+        row = means[calendar_index(target)]
+        if not np.isfinite(row).all():
+            return None
+        # Same confidence the fetch path reaches with a full 7-day window
+        return row[0:1], row[1:2], row[2:3], 0.95
+
+    next_month = target.month % 12 + 1
+    next_year = target.year + (1 if target.month == 12 else 0)
+    first_day = dt.date(next_year, next_month, 1)
+    days = _days_in_month(next_year, next_month)
+    start = calendar_index(first_day)
+    block = means[start:start + days]
+    present = np.isfinite(block).all(axis=1)
+    if not present.any():
+        return None
+    block = np.where(np.isfinite(block), block, np.nanmean(block, axis=0))
+    confidence = min(0.95, 0.6 + 0.01 * int(present.sum()))
+    return block[:, 0], block[:, 1], block[:, 2], confidence
 
+
+@timed("seasonal.predict")
 def seasonal_predict(
     lat: float,
     lon: float,
@@ -41,7 +107,12 @@ def seasonal_predict(
     - If mode == 'date': returns arrays of length 1 for the specific date (±3-day window typical).
     - If mode == 'month': returns arrays for each day of the next month starting from the first day of next month.
     Returns: (temp_array, humidity_array, precip_mm_array, confidence)
+    Cells present in the climatology index are answered without any upstream call.
     """
+    indexed = _from_index(lat, lon, target, mode)
+    if indexed is not None:
+        return indexed
+
     if mode == "date":
         # +- 3 day window around day-of-year across years
         doy = target.timetuple().tm_yday
@@ -51,11 +122,12 @@ def seasonal_predict(
         hist = _collect_multi_year(lat, lon, start_ref, end_ref, years=years)
         if hist.empty:
             return np.array([]), np.array([]), np.array([]), 0.5
-        agg = hist.groupby(hist.index.dayofyear).agg({
-            "T2M": "mean",
-            "RH2M": "mean",
-            "PRECTOTCORR": "mean",
-        })
+        with span("seasonal.aggregate"):
+            agg = hist.groupby(hist.index.dayofyear).agg({
+                "T2M": "mean",
+                "RH2M": "mean",
+                "PRECTOTCORR": "mean",
+            })
         # Use the central day (closest to target doy) if available, else average all
         if doy in agg.index:
             t = float(agg.loc[doy, "T2M"])
@@ -80,16 +152,19 @@ def seasonal_predict(
         return np.array([]), np.array([]), np.array([]), 0.5
 
     # Build typical values per day-of-month
-    hist["day"] = hist.index.day
-    agg = hist.groupby("day").agg({
-        "T2M": "mean",
-        "RH2M": "mean",
-        "PRECTOTCORR": "mean",
-    })
-
-    temps = np.array([float(agg.loc[d, "T2M"]) if d in agg.index else float(agg["T2M"].mean()) for d in range(1, days + 1)])
-    humids = np.array([float(agg.loc[d, "RH2M"]) if d in agg.index else float(agg["RH2M"].mean()) for d in range(1, days + 1)])
-    precs = np.array([float(agg.loc[d, "PRECTOTCORR"]) if d in agg.index else float(agg["PRECTOTCORR"].mean()) for d in range(1, days + 1)])
+    with span("seasonal.aggregate"):
+        hist["day"] = hist.index.day
+        agg = hist.groupby("day").agg({
+            "T2M": "mean",
+            "RH2M": "mean",
+            "PRECTOTCORR": "mean",
+        })
+
+        # Days missing from every year fall back to the month mean
+        typical = agg.reindex(range(1, days + 1)).fillna(agg.mean())
+    temps = typical["T2M"].to_numpy(dtype=float)
+    humids = typical["RH2M"].to_numpy(dtype=float)
+    precs = typical["PRECTOTCORR"].to_numpy(dtype=float)
 
     confidence = min(0.95, 0.6 + 0.01 * len(agg))
     return temps, humids, precs, confidence
@@ -0,0 +1,296 @@
+"""
+In-process timing spans, metrics and per-request profiles.
+
+`span(name)` times a block: every span feeds the `eventcast_span_seconds`
+histogram (label `span`), and when a profile is active for the current
+request its (stack path, start, duration) is recorded too. The span stack and
+the active profile live in context variables, so they follow the request into
+`asyncio.to_thread` / Starlette's threadpool; work handed to other pools must
+be wrapped with `bind` to stay attached.
+
+Metrics are plain counters, gauges and histograms in one process-wide
+registry, rendered in the Prometheus text format by `render()`. Objects that
+already count things (caches, queues) contribute through `collector`
+callbacks evaluated at scrape time.
+
+A profile renders as folded stacks (`request;power.fetch;power.remote 1234`,
+self time in microseconds), the input format of flamegraph.pl and speedscope.
+"""
+import contextvars
+import functools
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, type, help, [(labels, value)]) as produced by collectors
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, Any]) -> Labels:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {list(labelnames)}, got {sorted(labels)}")
+    return tuple((name, str(labels[name])) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        for key, value in list(self._values.items()):
+            yield self.name, key, value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[Labels, List[float]] = {}  # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def count(self, **labels) -> int:
+        row = self._values.get(_label_key(self.labelnames, labels))
+        return int(row[-1]) if row else 0
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        for key, row in list(self._values.items()):
+            for bound, n in zip(self.buckets, row):
+                yield f"{self.name}_bucket", key + (("le", _format_value(bound)),), n
+            yield f"{self.name}_sum", key, row[-2]
+            yield f"{self.name}_count", key, row[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: "OrderedDict[str, Any]" = OrderedDict()
+        self._collectors: List[Callable[[], List[Family]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def collector(self, fn: Callable[[], List[Family]]) -> Callable[[], List[Family]]:
+        """Register `fn` (usable as a decorator); it returns metric families computed at scrape time."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.type}"]
+            lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in metric.samples()]
+        for fn in self._collectors:
+            try:
+                families = fn()
+            except Exception as e:  # a broken collector must not break the scrape
+                print(f"Metrics collector {getattr(fn, '__name__', fn)} failed: {e}")
+                continue
+            for name, kind, help, samples in families:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_format_labels(tuple((k, str(v)) for k, v in labels.items()))} {_format_value(value)}"
+                          for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+collector = REGISTRY.collector
+render = REGISTRY.render
+
+SPAN_SECONDS = histogram("eventcast_span_seconds", "Duration of instrumented code paths", ["span"])
+UPSTREAM_REQUESTS = counter("eventcast_upstream_requests_total", "Requests sent to NASA POWER", ["client"])
+UPSTREAM_ERRORS = counter("eventcast_upstream_errors_total", "Failed NASA POWER requests (including retried ones)", ["client", "kind"])
+
+
+class Profile:
+    """Spans recorded for one request."""
+
+    def __init__(self, root: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.root = root
+        self.created_at = time.time()
+        self.started = time.perf_counter()
+        self.seconds: Optional[float] = None
+        self.spans: List[Tuple[Tuple[str, ...], float, float]] = []  # (path, start offset, seconds)
+        self._lock = threading.Lock()
+
+    def add(self, path: Tuple[str, ...], start: float, seconds: float) -> None:
+        with self._lock:
+            self.spans.append((path, start - self.started, seconds))
+
+    def folded(self) -> str:
+        """Folded stacks with self time in microseconds (children run in parallel threads may exceed their parent)."""
+        totals: Dict[Tuple[str, ...], float] = {}
+        for path, _, seconds in self.spans:
+            totals[path] = totals.get(path, 0.0) + seconds
+        root = (self.root,)
+        totals[root] = self.seconds if self.seconds is not None else time.perf_counter() - self.started
+        children: Dict[Tuple[str, ...], float] = {}
+        for path, seconds in totals.items():
+            if len(path) > 1:
+                children[path[:-1]] = children.get(path[:-1], 0.0) + seconds
+        lines = []
+        for path in sorted(totals):
+            self_us = int(round(max(0.0, totals[path] - children.get(path, 0.0)) * 1e6))
+            if self_us:
+                lines.append(f"{';'.join(path)} {self_us}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "root": self.root,
+            "created_at": self.created_at,
+            "seconds": self.seconds,
+            "spans": [
+                {"stack": list(path), "start_ms": round(start * 1000, 3), "ms": round(seconds * 1000, 3)}
+                for path, start, seconds in sorted(self.spans, key=lambda s: s[1])
+            ],
+        }
+
+
+_stack: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("telemetry_stack", default=())
+_profile: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar("telemetry_profile", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    path = _stack.get() + (name,)
+    token = _stack.set(path)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        _stack.reset(token)
+        SPAN_SECONDS.observe(elapsed, span=name)
+        profile = _profile.get()
+        if profile is not None:
+            profile.add(path, t0, elapsed)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of `span`."""
+
+    def wrap(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+
+def bind(fn: Callable) -> Callable:
+    """`fn` bound to a copy of the current context, for submitting to thread pools."""
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, fn)
+
+
+@contextmanager
+def profiled(root: str) -> Iterator[Profile]:
+    """Record every span of the enclosed block (and what it awaits or binds) into a new Profile."""
+    profile = Profile(root)
+    token = _profile.set(profile)
+    stack_token = _stack.set((root,))
+    try:
+        yield profile
+    finally:
+        profile.seconds = time.perf_counter() - profile.started
+        _stack.reset(stack_token)
+        _profile.reset(token)
+
+
+class ProfileStore:
+    """The most recent profiles, by id."""
+
+    def __init__(self, max_entries: int = 100):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
@@ -1,17 +1,22 @@
 import os
+import json
 import pickle
+import time
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Tuple
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.multioutput import MultiOutputRegressor
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, mean_absolute_error
 
 from nasa import fetch_power_daily
+from estimators import BACKENDS, DEFAULT_BACKEND, compare_backends as _compare_backends, fit, make_estimator
+from features import FeatureTransformer
+from forest_export import save_bundle
+from regional import SPATIAL_COLUMNS, SpatialFeatures, grid_points
 
 
 @dataclass
@@ -20,7 +25,15 @@ class TrainConfig:
     lon: float
     days: int = 1200  # ~3.3 years
     random_state: int = 42
+    n_jobs: int = -1  # forest threads; keep jobs * n_jobs within the CPUs when training in parallel
+    backend: str = DEFAULT_BACKEND  # see estimators.BACKENDS
     model_path: str = "weather_predictor.pkl"
+    # Flat memory-mappable export served by the API (None to skip)
+    export_dir: Optional[str] = "weather_predictor.forest"
+    export_dtype: str = "float32"  # leaf values: float64, float32 or float16
+    # Chunked backfill store to train from (memory-mapped) instead of one in-memory fetch
+    backfill_dir: Optional[str] = None
+    dataset_dir: Optional[str] = None  # default: <backfill_dir>/dataset
 
 
 def build_features(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -44,18 +57,9 @@ def build_features(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
         index=tmp.index,
     )
 
-    # Feature engineering
-    X = pd.DataFrame(index=tmp.index)
-    for col in ["T2M", "T2M_MAX", "T2M_MIN", "RH2M", "WS2M", "PRECTOTCORR"]:
-        X[f"{col}_lag0"] = tmp[col]
-        X[f"{col}_lag1"] = tmp[col].shift(1)
-        X[f"{col}_lag3"] = tmp[col].rolling(3, min_periods=1).mean()
-        X[f"{col}_lag7"] = tmp[col].rolling(7, min_periods=1).mean()
-
-    # Calendar features
-    X["dayofyear"] = tmp.index.dayofyear
-    X["sin_doy"] = np.sin(2 * np.pi * X["dayofyear"] / 365.25)
-    X["cos_doy"] = np.cos(2 * np.pi * X["dayofyear"] / 365.25)
+    # Lag/rolling and calendar features (shared with serving)
+    transformer = FeatureTransformer()
+    X = pd.DataFrame(transformer.transform(tmp), index=tmp.index, columns=transformer.feature_columns)
 
     # Drop last row where y is NaN due to shift(-1)
     valid = y.dropna().index
@@ -64,44 +68,292 @@ def build_features(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     return X, y
 
 
-def train_model(cfg: TrainConfig) -> None:
-    end = dt.date.today() - dt.timedelta(days=1)
-    start = end - dt.timedelta(days=cfg.days)
-    print(f"Fetching POWER data for ({cfg.lat}, {cfg.lon}) from {start} to {end}...")
-    df = fetch_power_daily(cfg.lat, cfg.lon, start, end)
+def _load_training_set(
+    cfg: TrainConfig, start: dt.date, end: dt.date, history: Optional[pd.DataFrame] = None
+) -> Tuple[np.ndarray, np.ndarray, list, list]:
+    """
+    (X, y, feature_columns, target_columns) either in memory (from `history`
+    when given, else fetched) or memory-mapped from the backfill store.
+    """
+    if cfg.backfill_dir:
+        from backfill import backfill, build_dataset
+
+        backfill(cfg.lat, cfg.lon, start, end, root=cfg.backfill_dir)
+        ds = build_dataset([(cfg.lat, cfg.lon)], start, end, cfg.dataset_dir or Path(cfg.backfill_dir) / "dataset", root=cfg.backfill_dir)
+        return ds.X, ds.y, ds.feature_columns, ds.target_columns
+
+    df = history
+    if df is None:
+        print(f"Fetching POWER data for ({cfg.lat}, {cfg.lon}) from {start} to {end}...")
+        df = fetch_power_daily(cfg.lat, cfg.lon, start, end)
     if df.empty:
         raise RuntimeError("No data fetched from NASA POWER")
-
     X, y = build_features(df)
+    return X.to_numpy(dtype=np.float32), y.to_numpy(dtype=np.float64), X.columns.tolist(), y.columns.tolist()
+
+
+def _make_model(random_state: int, n_jobs: int, n_estimators: Optional[int] = None, backend: str = DEFAULT_BACKEND):
+    return make_estimator(backend, random_state=random_state, n_jobs=n_jobs, n_estimators=n_estimators)
+
+
+def _metrics(y_val: np.ndarray, pred: np.ndarray, target_columns: list) -> Dict[str, Dict[str, float]]:
+    return {
+        "r2": {c: float(r2_score(y_val[:, i], pred[:, i])) for i, c in enumerate(target_columns)},
+        "mae": {c: float(mean_absolute_error(y_val[:, i], pred[:, i])) for i, c in enumerate(target_columns)},
+    }
+
+
+def _save(
+    model_path: str,
+    export_dir: Optional[str],
+    export_dtype: str,
+    model,
+    feature_columns: list,
+    spatial: Optional[SpatialFeatures] = None,
+) -> None:
+    transformer = FeatureTransformer()
+    bundle = {
+        "model": model,
+        "feature_columns": feature_columns,
+        "transformer": transformer,
+        "feature_version": transformer.version,
+    }
+    if spatial is not None:
+        bundle["spatial"] = spatial
+    # Write next to the target and rename so the server never loads a partial file.
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(bundle, f)
+    os.replace(tmp_path, model_path)
+    print(f"Saved model to {model_path}")
+
+    if export_dir:
+        save_bundle(export_dir, model, feature_columns, transformer, values_dtype=export_dtype, spatial=spatial)
+        print(f"Exported flat model to {export_dir}")
+
 
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=0.2, random_state=cfg.random_state, shuffle=False
+def training_window(cfg: TrainConfig) -> Tuple[dt.date, dt.date]:
+    end = dt.date.today() - dt.timedelta(days=1)
+    return end - dt.timedelta(days=cfg.days), end
+
+
+def train_model(cfg: TrainConfig, history: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    """
+    Train, save and export one model. `history` (as returned by
+    fetch_power_daily for the training window) skips the fetch.
+    Returns validation metrics, row counts and timings.
+    """
+    start, end = training_window(cfg)
+    t0 = time.perf_counter()
+    X, y, feature_columns, target_columns = _load_training_set(cfg, start, end, history)
+    load_seconds = time.perf_counter() - t0
+
+    # Chronological 80/20 split (as train_test_split(shuffle=False)); slices keep memmaps out-of-core
+    n_val = int(np.ceil(0.2 * len(X)))
+    X_train, X_val = X[:-n_val], X[-n_val:]
+    y_train, y_val = y[:-n_val], y[-n_val:]
+
+    model = _make_model(cfg.random_state, cfg.n_jobs, backend=cfg.backend)
+    # Fit on the raw float32 matrix: serving passes the transformer's arrays straight to predict
+    t0 = time.perf_counter()
+    fit(model, X_train, y_train, cfg.n_jobs)
+    fit_seconds = time.perf_counter() - t0
+
+    metrics = _metrics(y_val, model.predict(X_val), target_columns)
+    print(metrics)
+    _save(cfg.model_path, cfg.export_dir, cfg.export_dtype, model, feature_columns)
+
+    return dict(
+        metrics,
+        rows={"train": int(len(X_train)), "val": int(n_val)},
+        load_seconds=round(load_seconds, 3),
+        fit_seconds=round(fit_seconds, 3),
     )
 
-    base = RandomForestRegressor(
-        n_estimators=300,
-        max_depth=12,
-        min_samples_leaf=2,
-        random_state=cfg.random_state,
-        n_jobs=-1,
+
+def compare_backends(
+    cfg: TrainConfig,
+    backends: Optional[List[str]] = None,
+    history: Optional[pd.DataFrame] = None,
+    report_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Fit every estimator backend on the same chronological split as
+    train_model and report fit time, size, latency and accuracy (nothing is
+    saved except the optional JSON report).
+    """
+    start, end = training_window(cfg)
+    X, y, _, target_columns = _load_training_set(cfg, start, end, history)
+    n_val = int(np.ceil(0.2 * len(X)))
+    report = _compare_backends(
+        X[:-n_val], y[:-n_val], X[-n_val:], y[-n_val:], target_columns,
+        backends=backends or BACKENDS, random_state=cfg.random_state, n_jobs=cfg.n_jobs,
     )
-    model = MultiOutputRegressor(base)
-    model.fit(X_train, y_train)
+    report["location"] = {"lat": cfg.lat, "lon": cfg.lon, "days": cfg.days}
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, indent=2))
+        print(f"Wrote backend report to {report_path}")
+    return report
 
-    pred = pd.DataFrame(model.predict(X_val), index=y_val.index, columns=y_val.columns)
-    print(
-        {
-            "r2": {c: float(r2_score(y_val[c], pred[c])) for c in y_val.columns},
-            "mae": {c: float(mean_absolute_error(y_val[c], pred[c])) for c in y_val.columns},
+
+@dataclass
+class RegionalConfig:
+    points: List[Tuple[float, float]]
+    days: int = 1200
+    random_state: int = 42
+    n_jobs: int = -1
+    n_estimators: Optional[int] = None  # backend default
+    backend: str = DEFAULT_BACKEND
+    fetch_workers: int = 8
+    model_path: str = "weather_predictor.pkl"
+    export_dir: Optional[str] = "weather_predictor.forest"
+    export_dtype: str = "float32"
+
+
+def fetch_histories(points: List[Tuple[float, float]], start: dt.date, end: dt.date, workers: int = 8) -> Dict[Tuple[float, float], pd.DataFrame]:
+    """History of every point (fetched concurrently); points without data are left out."""
+    with ThreadPoolExecutor(workers, thread_name_prefix="regional-fetch") as pool:
+        frames = dict(zip(points, pool.map(lambda p: fetch_power_daily(p[0], p[1], start, end), points)))
+    return {p: df for p, df in frames.items() if not df.empty}
+
+
+def _split(histories: Dict[Tuple[float, float], pd.DataFrame], spatial: Optional[SpatialFeatures]) -> Dict[Tuple[float, float], dict]:
+    """
+    Per point: chronological 80/20 split of local (+ spatial) features and targets.
+    Spatial features are left out when `spatial` is None (per-point models).
+    """
+    out = {}
+    for (lat, lon), df in histories.items():
+        X, y = build_features(df)
+        Xa = X.to_numpy(dtype=np.float32)
+        if spatial is not None:
+            Xa = np.hstack([Xa, spatial.features(lat, lon, X.index.to_numpy())])
+        ya = y.to_numpy(dtype=np.float64)
+        n_val = int(np.ceil(0.2 * len(Xa)))
+        out[(lat, lon)] = {
+            "X_train": Xa[:-n_val], "y_train": ya[:-n_val], "X_val": Xa[-n_val:], "y_val": ya[-n_val:],
+            "columns": X.columns.tolist() + (SPATIAL_COLUMNS if spatial is not None else []),
+            "targets": y.columns.tolist(),
         }
-    )
+    return out
+
+
+def _train_histories(histories: Dict[Tuple[float, float], pd.DataFrame]) -> Dict[Tuple[float, float], pd.DataFrame]:
+    """The part of each history before its validation window (climatology must not see it)."""
+    return {p: df.iloc[: int(len(df) * 0.8)] for p, df in histories.items()}
+
+
+def _fit_regional(cfg: RegionalConfig, histories: Dict[Tuple[float, float], pd.DataFrame]):
+    spatial = SpatialFeatures.from_histories(_train_histories(histories))
+    parts = _split(histories, spatial)
+    first = next(iter(parts.values()))
+    X_train = np.vstack([p["X_train"] for p in parts.values()])
+    y_train = np.vstack([p["y_train"] for p in parts.values()])
+    model = _make_model(cfg.random_state, cfg.n_jobs, cfg.n_estimators, cfg.backend)
+    t0 = time.perf_counter()
+    fit(model, X_train, y_train, cfg.n_jobs)
+    return model, spatial, parts, first["columns"], first["targets"], time.perf_counter() - t0
+
+
+def train_regional(cfg: RegionalConfig) -> Dict[str, Any]:
+    """
+    One model for every location of a region: rows of all grid points pooled,
+    with lat/lon, annual-mean and climatology features added.
+    """
+    start, end = training_window(cfg)
+    print(f"Fetching POWER data for {len(cfg.points)} points from {start} to {end}...")
+    histories = fetch_histories(cfg.points, start, end, cfg.fetch_workers)
+    if not histories:
+        raise RuntimeError("No data fetched from NASA POWER")
+    model, spatial, parts, columns, targets, fit_seconds = _fit_regional(cfg, histories)
+
+    X_val = np.vstack([p["X_val"] for p in parts.values()])
+    y_val = np.vstack([p["y_val"] for p in parts.values()])
+    metrics = _metrics(y_val, model.predict(X_val), targets)
+    print(metrics)
+    _save(cfg.model_path, cfg.export_dir, cfg.export_dtype, model, columns, spatial=spatial)
+    return dict(metrics, points=len(histories), rows=int(sum(len(p["X_train"]) for p in parts.values())), fit_seconds=round(fit_seconds, 3))
+
+
+def compare_regional(cfg: RegionalConfig, holdout_every: int = 5) -> Dict[str, Any]:
+    """
+    Validation MAE of per-point models vs one regional model on the same
+    chronological splits. Every `holdout_every`-th point is kept out of the
+    regional training set to measure locations the region has never seen;
+    for those the per-point baseline is the nearest trained point's model
+    (what the API falls back to for untrained locations).
+    """
+    start, end = training_window(cfg)
+    histories = fetch_histories(cfg.points, start, end, cfg.fetch_workers)
+    points = list(histories)
+    unseen = set(points[holdout_every - 1::holdout_every]) if holdout_every else set()
+    seen = [p for p in points if p not in unseen]
 
-    with open(cfg.model_path, "wb") as f:
-        pickle.dump({"model": model, "feature_columns": X.columns.tolist()}, f)
-    print(f"Saved model to {cfg.model_path}")
+    local = _split(histories, None)
+    per_point = {}
+    t0 = time.perf_counter()
+    for p in points:
+        model = _make_model(cfg.random_state, cfg.n_jobs, cfg.n_estimators, cfg.backend)
+        per_point[p] = fit(model, local[p]["X_train"], local[p]["y_train"], cfg.n_jobs)
+    per_point_seconds = time.perf_counter() - t0
+
+    model, spatial, _, _, targets, regional_seconds = _fit_regional(cfg, {p: histories[p] for p in seen})
+    regional_parts = _split(histories, spatial)
+
+    def mae(pairs):
+        y = np.vstack([a for a, _ in pairs])
+        pred = np.vstack([b for _, b in pairs])
+        return {c: round(float(mean_absolute_error(y[:, i], pred[:, i])), 4) for i, c in enumerate(targets)}
+
+    def nearest_seen(p):
+        return min(seen, key=lambda q: (q[0] - p[0]) ** 2 + (q[1] - p[1]) ** 2)
+
+    report = {
+        "points": {"seen": len(seen), "unseen": len(unseen)},
+        "fit_seconds": {"per_point_total": round(per_point_seconds, 3), "regional": round(regional_seconds, 3)},
+        "mae": {
+            "per_point_seen": mae([(local[p]["y_val"], per_point[p].predict(local[p]["X_val"])) for p in seen]),
+            "regional_seen": mae([(regional_parts[p]["y_val"], model.predict(regional_parts[p]["X_val"])) for p in seen]),
+        },
+    }
+    if unseen:
+        report["mae"]["own_point_model_unseen"] = mae([(local[p]["y_val"], per_point[p].predict(local[p]["X_val"])) for p in unseen])
+        report["mae"]["nearest_point_model_unseen"] = mae(
+            [(local[p]["y_val"], per_point[nearest_seen(p)].predict(local[p]["X_val"])) for p in unseen]
+        )
+        report["mae"]["regional_unseen"] = mae([(regional_parts[p]["y_val"], model.predict(regional_parts[p]["X_val"])) for p in unseen])
+    return report
 
 
 if __name__ == "__main__":
+    bbox = os.getenv("REGION_BBOX")  # "min_lat,min_lon,max_lat,max_lon"
+    if bbox:
+        regional_cfg = RegionalConfig(
+            points=grid_points(*[float(v) for v in bbox.split(",")], float(os.getenv("REGION_STEP", "0.5"))),
+            days=int(os.getenv("DAYS", "1200")),
+            backend=os.getenv("BACKEND", DEFAULT_BACKEND),
+            export_dtype=os.getenv("EXPORT_DTYPE", "float32"),
+        )
+        if os.getenv("REGION_COMPARE"):
+            print(json.dumps(compare_regional(regional_cfg), indent=2))
+        else:
+            train_regional(regional_cfg)
+        raise SystemExit(0)
+
     lat = float(os.getenv("LAT", "24.7136"))
     lon = float(os.getenv("LON", "46.6753"))
-    train_model(TrainConfig(lat=lat, lon=lon))
+    train_cfg = TrainConfig(
+        lat=lat,
+        lon=lon,
+        days=int(os.getenv("DAYS", "1200")),
+        backend=os.getenv("BACKEND", DEFAULT_BACKEND),
+        export_dtype=os.getenv("EXPORT_DTYPE", "float32"),
+        backfill_dir=os.getenv("BACKFILL_DIR") or None,
+    )
+    compare = os.getenv("COMPARE_BACKENDS")  # "1" for all backends, or a comma-separated list
+    if compare:
+        chosen = None if compare == "1" else [b.strip() for b in compare.split(",")]
+        result = compare_backends(train_cfg, chosen, report_path=os.getenv("BACKEND_REPORT", "backend_report.json"))
+        print(json.dumps({b: {k: v[k] for k in ("fit_seconds", "flat_bytes", "mae")} for b, v in result["backends"].items()}, indent=2))
+    else:
+        train_model(train_cfg)
@@ -0,0 +1,171 @@
+"""
+Train models for many locations in one run.
+
+Locations come from a CSV file (lat,lon per line) or a bounding box walked at
+a fixed grid spacing. Histories are fetched concurrently on a small thread
+pool (network bound) and every fetched location is handed to a process pool
+for fitting (CPU bound). The CPU budget is split between the fit processes:
+with `--cpus 8 --jobs 4` four forests train at once with two threads each,
+instead of every forest grabbing all cores (`n_jobs=-1`).
+
+Each model is written to `<out>/<lat>_<lon>/` (pickled bundle and flat
+export, as train.py does) and `<out>/manifest.json` lists every location with
+its status, timings and validation metrics. The manifest is rewritten after
+each finished location, so it doubles as a progress report.
+
+Usage:
+    python train_many.py --locations locations.csv --out models_many
+    python train_many.py --bbox 24 46 26 48 --step 0.5 --cpus 8 --jobs 4
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from climatology import read_locations
+from nasa import fetch_power_daily
+from regional import grid_points
+from estimators import BACKENDS, DEFAULT_BACKEND
+from train import TrainConfig, train_model, training_window
+
+
+def location_dir(out: Path, lat: float, lon: float) -> Path:
+    return out / f"{lat:.4f}_{lon:.4f}"
+
+
+def _fit(cfg: TrainConfig, history) -> Dict[str, Any]:
+    """Runs in a worker process."""
+    Path(cfg.model_path).parent.mkdir(parents=True, exist_ok=True)
+    return train_model(cfg, history=history)
+
+
+def _write_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, path)
+
+
+def train_many(
+    points: List[Tuple[float, float]],
+    out: Path,
+    days: int = 1200,
+    cpus: int | None = None,
+    jobs: int | None = None,
+    fetch_workers: int = 4,
+    skip_existing: bool = False,
+    backend: str = DEFAULT_BACKEND,
+) -> Dict[str, Any]:
+    cpus = cpus or os.cpu_count() or 1
+    jobs = max(1, min(jobs or cpus, cpus, len(points) or 1))
+    threads = max(1, cpus // jobs)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest_path = out / "manifest.json"
+    manifest: Dict[str, Any] = {
+        "created_at": dt.datetime.now().isoformat(),
+        "days": days,
+        "cpus": cpus,
+        "jobs": jobs,
+        "threads_per_job": threads,
+        "backend": backend,
+        "models": {},
+    }
+
+    configs = {}
+    for lat, lon in points:
+        d = location_dir(out, lat, lon)
+        cfg = TrainConfig(
+            lat=lat,
+            lon=lon,
+            days=days,
+            n_jobs=threads,
+            backend=backend,
+            model_path=str(d / "weather_predictor.pkl"),
+            export_dir=str(d / "weather_predictor.forest"),
+        )
+        entry = {"lat": lat, "lon": lon, "model_path": cfg.model_path, "export_dir": cfg.export_dir}
+        if skip_existing and Path(cfg.model_path).exists():
+            entry["status"] = "skipped"
+        else:
+            entry["status"] = "queued"
+            configs[d.name] = cfg
+        manifest["models"][d.name] = entry
+    _write_manifest(manifest_path, manifest)
+
+    def fetch(cfg: TrainConfig):
+        start, end = training_window(cfg)
+        t0 = time.perf_counter()
+        df = fetch_power_daily(cfg.lat, cfg.lon, start, end)
+        return df, time.perf_counter() - t0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(fetch_workers, thread_name_prefix="train-fetch") as fetchers, ProcessPoolExecutor(jobs) as fitters:
+        pending: Dict[Future, Tuple[str, str]] = {fetchers.submit(fetch, cfg): ("fetch", key) for key, cfg in configs.items()}
+        fit_started: Dict[str, float] = {}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage, key = pending.pop(fut)
+                entry = manifest["models"][key]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    entry.update(status="failed", stage=stage, error=str(e))
+                    print(f"{key}: {stage} failed: {e}")
+                    continue
+                if stage == "fetch":
+                    df, seconds = result
+                    entry.update(status="fitting", fetch_seconds=round(seconds, 3), days_fetched=int(len(df)))
+                    if df.empty:
+                        entry.update(status="failed", stage=stage, error="No data fetched from NASA POWER")
+                        continue
+                    fit_started[key] = time.perf_counter()
+                    pending[fitters.submit(_fit, configs[key], df)] = ("fit", key)
+                else:
+                    entry.update(
+                        status="done",
+                        queue_and_fit_seconds=round(time.perf_counter() - fit_started[key], 3),
+                        fit_seconds=result["fit_seconds"],
+                        rows=result["rows"],
+                        metrics={"r2": result["r2"], "mae": result["mae"]},
+                    )
+                    print(f"{key}: trained in {entry['fit_seconds']}s")
+            _write_manifest(manifest_path, manifest)
+
+    statuses = [m["status"] for m in manifest["models"].values()]
+    manifest["total_seconds"] = round(time.perf_counter() - started, 3)
+    manifest["summary"] = {s: statuses.count(s) for s in sorted(set(statuses))}
+    _write_manifest(manifest_path, manifest)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train models for many locations under a CPU budget")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--locations", help="CSV file with lat,lon per line")
+    source.add_argument("--bbox", nargs=4, type=float, metavar=("MIN_LAT", "MIN_LON", "MAX_LAT", "MAX_LON"))
+    parser.add_argument("--step", type=float, default=0.5, help="grid spacing in degrees for --bbox")
+    parser.add_argument("--out", default=os.getenv("MODELS_OUT", "models_many"))
+    parser.add_argument("--days", type=int, default=1200)
+    parser.add_argument("--cpus", type=int, default=None, help="total CPU budget (default: all cores)")
+    parser.add_argument("--jobs", type=int, default=None, help="locations fitted at once (default: one per CPU)")
+    parser.add_argument("--fetch-workers", type=int, default=4)
+    parser.add_argument("--skip-existing", action="store_true")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    args = parser.parse_args()
+
+    pts = read_locations(args.locations) if args.locations else grid_points(*args.bbox, args.step)
+    result = train_many(
+        pts,
+        Path(args.out),
+        days=args.days,
+        cpus=args.cpus,
+        jobs=args.jobs,
+        fetch_workers=args.fetch_workers,
+        skip_existing=args.skip_existing,
+        backend=args.backend,
+    )
+    print(json.dumps(result["summary"]))
@@ -3,7 +3,6 @@ Weather Prediction ML Model
 Trains a Random Forest model on NASA weather data to predict future weather conditions.
 """
 
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -14,83 +13,63 @@ import pickle
 import json
 import os
 
+from nasa import POWER_PARAMS, fetch_power_daily
+from telemetry import span
+
+
+# Raw observation columns accepted by predict_batch, in array column order
+INPUT_COLUMNS = ['temperature', 'temp_max', 'temp_min', 'humidity', 'wind_speed', 'precipitation', 'uv_index']
+TARGETS = ['temperature', 'humidity', 'rain_probability']
+
 
 class WeatherPredictor:
     def __init__(self):
+        # One multi-output forest predicting (temperature, humidity, rain) together
+        self.model = None
+        self.target_mean = None
+        self.target_scale = None
+        # Separate per-target forests of models saved before version 2.0
         self.temp_model = None
         self.humidity_model = None
         self.rain_model = None
         self.feature_cols = None
+
+    @property
+    def is_trained(self):
+        return self.model is not None or all([self.temp_model, self.humidity_model, self.rain_model])
         
     def fetch_nasa_data(self, lat, lon, days_back=365):
-        """Fetch historical weather data from NASA POWER API"""
+        """Fetch historical weather data from NASA POWER (through the shared cache and upstream gate)"""
         print(f"Fetching NASA data for {lat}, {lon} for {days_back} days...")
         
-        end_date = datetime.now()
+        end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days_back)
         
-        # Format dates for NASA API
-        start_str = start_date.strftime("%Y%m%d")
-        end_str = end_date.strftime("%Y%m%d")
-        
-        # NASA POWER API parameters
-        params = "T2M,T2M_MAX,T2M_MIN,RH2M,WS2M,PRECTOTCORR,ALLSKY_SFC_UV_INDEX"
-        url = f"https://power.larc.nasa.gov/api/temporal/daily/point?parameters={params}&community=RE&longitude={lon}&latitude={lat}&start={start_str}&end={end_str}&format=JSON"
-        
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            properties = data.get('properties', {}).get('parameter', {})
-            if not properties:
+            # Sentinel and out-of-range values come back as NaN
+            power = fetch_power_daily(lat, lon, start_date, end_date, POWER_PARAMS)
+            if power.empty:
                 raise ValueError("No data returned from NASA API")
-                
-            # Convert to DataFrame
-            dates = []
-            temps = []
-            temp_max = []
-            temp_min = []
-            humidity = []
-            wind_speed = []
-            precipitation = []
-            uv_index = []
-            
-            for date_str in properties.get('T2M', {}):
-                # Skip invalid data points
-                temp = properties['T2M'][date_str]
-                if temp == -999 or temp is None:
-                    continue
-                    
-                dates.append(pd.to_datetime(date_str, format='%Y%m%d'))
-                temps.append(temp)
-                temp_max.append(properties.get('T2M_MAX', {}).get(date_str, temp))
-                temp_min.append(properties.get('T2M_MIN', {}).get(date_str, temp))
-                humidity.append(properties.get('RH2M', {}).get(date_str, 50))
-                wind_speed.append(properties.get('WS2M', {}).get(date_str, 5))
-                precipitation.append(properties.get('PRECTOTCORR', {}).get(date_str, 0))
-                uv_index.append(properties.get('ALLSKY_SFC_UV_INDEX', {}).get(date_str, 5))
-            
+
+            # Days without a valid temperature, humidity or precipitation are dropped
+            power = power.dropna(subset=['T2M', 'RH2M', 'PRECTOTCORR'])
+            temp = power['T2M']
             df = pd.DataFrame({
-                'date': dates,
-                'temperature': temps,
-                'temp_max': temp_max,
-                'temp_min': temp_min,
-                'humidity': humidity,
-                'wind_speed': wind_speed,
-                'precipitation': precipitation,
-                'uv_index': uv_index
-            })
-            
-            # Remove outliers and invalid data
-            df = df[df['temperature'] > -50]  # Remove extreme values
-            df = df[df['temperature'] < 60]
-            df = df[df['humidity'] >= 0]
-            df = df[df['humidity'] <= 100]
-            df = df[df['precipitation'] >= 0]
+                'date': power.index,
+                'temperature': temp,
+                'temp_max': power['T2M_MAX'].fillna(temp),
+                'temp_min': power['T2M_MIN'].fillna(temp),
+                'humidity': power['RH2M'],
+                'wind_speed': power['WS2M'].fillna(5),
+                'precipitation': power['PRECTOTCORR'],
+                'uv_index': power['ALLSKY_SFC_UV_INDEX'].fillna(5)
+            }).astype({c: float for c in INPUT_COLUMNS})
+
+            # Remove extreme values
+            df = df[(df['temperature'] > -50) & (df['temperature'] < 60)]
             
             print(f"Successfully fetched {len(df)} days of data")
-            return df.sort_values('date').reset_index(drop=True)
+            return df.reset_index(drop=True)  # parse_daily returns dates in order
             
         except Exception as e:
             print(f"Error fetching NASA data: {e}")
@@ -146,9 +125,12 @@ class WeatherPredictor:
         # Remove rows with NaN values
         df_features = df_features.dropna()
         
-        # Select feature columns (exclude date and target columns)
+        # Select numeric feature columns (exclude date, target and label columns like 'season')
         exclude_cols = ['date', 'next_temp', 'next_humidity', 'next_rain_prob']
-        feature_cols = [col for col in df_features.columns if col not in exclude_cols]
+        feature_cols = [
+            col for col in df_features.columns
+            if col not in exclude_cols and pd.api.types.is_numeric_dtype(df_features[col])
+        ]
         
         self.feature_cols = feature_cols
         
@@ -159,8 +141,8 @@ class WeatherPredictor:
         
         return X, y_temp, y_humidity, y_rain
     
-    def train_models(self, lat, lon, days_back=365):
-        """Train Random Forest models for temperature, humidity, and rain prediction"""
+    def train_models(self, lat, lon, days_back=365, n_jobs=-1):
+        """Train Random Forest models for temperature, humidity, and rain prediction (n_jobs: forest threads)"""
         print("Training weather prediction models...")
         
         # Fetch and prepare data
@@ -174,39 +156,28 @@ class WeatherPredictor:
             raise ValueError("Insufficient training samples after preprocessing")
         
         # Split data for training and testing
-        X_train, X_test, y_temp_train, y_temp_test = train_test_split(
-            X, y_temp, test_size=0.2, random_state=42
-        )
-        _, _, y_humidity_train, y_humidity_test = train_test_split(
-            X, y_humidity, test_size=0.2, random_state=42
-        )
-        _, _, y_rain_train, y_rain_test = train_test_split(
-            X, y_rain, test_size=0.2, random_state=42
+        Y = np.column_stack([y_temp, y_humidity, y_rain])
+        X_train, X_test, Y_train, Y_test = train_test_split(
+            X.to_numpy(dtype=np.float32), Y, test_size=0.2, random_state=42
         )
         
-        # Train Random Forest models
-        print("Training temperature model...")
-        self.temp_model = RandomForestRegressor(
-            n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
-        )
-        self.temp_model.fit(X_train, y_temp_train)
-        
-        print("Training humidity model...")
-        self.humidity_model = RandomForestRegressor(
-            n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
-        )
-        self.humidity_model.fit(X_train, y_humidity_train)
+        # Targets are standardized so humidity's larger scale does not dominate the shared splits
+        self.target_mean = Y_train.mean(axis=0)
+        self.target_scale = Y_train.std(axis=0)
+        self.target_scale[self.target_scale == 0] = 1.0
         
-        print("Training rain probability model...")
-        self.rain_model = RandomForestRegressor(
-            n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
+        # Train one Random Forest for all three targets
+        print("Training multi-output weather model...")
+        self.model = RandomForestRegressor(
+            n_estimators=100, max_depth=10, random_state=42, n_jobs=n_jobs
         )
-        self.rain_model.fit(X_train, y_rain_train)
+        self.model.fit(X_train, (Y_train - self.target_mean) / self.target_scale)
+        self.temp_model = self.humidity_model = self.rain_model = None
         
         # Evaluate models
-        temp_pred = self.temp_model.predict(X_test)
-        humidity_pred = self.humidity_model.predict(X_test)
-        rain_pred = self.rain_model.predict(X_test)
+        pred = self._predict_raw(X_test)
+        temp_pred, humidity_pred, rain_pred = pred[:, 0], pred[:, 1], pred[:, 2]
+        y_temp_test, y_humidity_test, y_rain_test = Y_test[:, 0], Y_test[:, 1], Y_test[:, 2]
         
         print(f"Temperature Model - R²: {r2_score(y_temp_test, temp_pred):.3f}, RMSE: {np.sqrt(mean_squared_error(y_temp_test, temp_pred)):.2f}")
         print(f"Humidity Model - R²: {r2_score(y_humidity_test, humidity_pred):.3f}, RMSE: {np.sqrt(mean_squared_error(y_humidity_test, humidity_pred)):.2f}")
@@ -214,22 +185,78 @@ class WeatherPredictor:
         
         return df
     
+    def build_features(self, observations, dates):
+        """
+        Feature matrix for independent single-day observations, without pandas.
+        observations: (n, len(INPUT_COLUMNS)) array, NaN for missing values.
+        dates: (n,) dates of the observations.
+        Matches engineer_features on a one-row frame followed by fillna(0):
+        7-day means equal the day's value and lag features are 0.
+        """
+        obs = np.atleast_2d(np.asarray(observations, dtype=np.float64))
+        n = len(obs)
+        days = np.asarray(dates, dtype='datetime64[D]').reshape(-1)
+        month = (days.astype('datetime64[M]').astype(np.int64) % 12) + 1
+        day_of_year = (days - days.astype('datetime64[Y]')).astype(np.int64) + 1
+        day_of_month = (days - days.astype('datetime64[M]')).astype(np.int64) + 1
+        season = (month % 12 + 3) // 3  # 1 winter, 2 spring, 3 summer, 4 fall
+        
+        raw = {name: obs[:, i] for i, name in enumerate(INPUT_COLUMNS)}
+        columns = dict(raw)
+        columns.update({
+            'month': month,
+            'day_of_year': day_of_year,
+            'day_of_month': day_of_month,
+            'is_summer': season == 3,
+            'is_winter': season == 1,
+            'month_sin': np.sin(2 * np.pi * month / 12),
+            'month_cos': np.cos(2 * np.pi * month / 12),
+            'day_sin': np.sin(2 * np.pi * day_of_year / 365),
+            'day_cos': np.cos(2 * np.pi * day_of_year / 365),
+            'temp_ma_7': raw['temperature'],
+            'humidity_ma_7': raw['humidity'],
+            'precipitation_ma_7': raw['precipitation'],
+            'temp_range': raw['temp_max'] - raw['temp_min'],
+            'rain_probability': raw['precipitation'] > 0,
+        })
+        
+        X = np.zeros((n, len(self.feature_cols)), dtype=np.float32)
+        for j, col in enumerate(self.feature_cols):
+            if col in columns:  # lag features and unknown columns stay 0
+                X[:, j] = columns[col]
+        return np.nan_to_num(X, nan=0.0)
+    
+    def _predict_raw(self, X):
+        """(n, 3) unclamped predictions for a feature matrix"""
+        if self.model is not None:
+            return self.model.predict(X) * self.target_scale + self.target_mean
+        if hasattr(self.temp_model, 'feature_names_in_'):
+            X = pd.DataFrame(X, columns=self.feature_cols)
+        return np.column_stack([m.predict(X) for m in (self.temp_model, self.humidity_model, self.rain_model)])
+    
+    def predict_batch(self, observations, dates):
+        """
+        Next-day (temperature, humidity, rain probability 0-1) for many
+        observations in one forest pass. Returns an (n, 3) array.
+        """
+        if not self.is_trained:
+            raise ValueError("Models not trained. Call train_models() first.")
+        with span("features.build"):
+            X = self.build_features(observations, dates)
+        with span("model.predict"):
+            pred = self._predict_raw(X)
+        pred[:, 1] = np.clip(pred[:, 1], 0, 100)
+        pred[:, 2] = np.clip(pred[:, 2], 0, 1)
+        return pred
+    
     def predict_weather(self, current_data):
         """Predict next day weather based on current conditions"""
-        if not all([self.temp_model, self.humidity_model, self.rain_model]):
+        if not self.is_trained:
             raise ValueError("Models not trained. Call train_models() first.")
         
-        # Prepare features similar to training
-        df_input = pd.DataFrame([current_data])
-        df_features = self.engineer_features(df_input)
-        
-        # Use only the feature columns from training
-        X = df_features[self.feature_cols].fillna(0)  # Fill any NaN with 0
-        
-        # Make predictions
-        temp_pred = self.temp_model.predict(X)[0]
-        humidity_pred = self.humidity_model.predict(X)[0]
-        rain_prob_pred = max(0, min(1, self.rain_model.predict(X)[0]))  # Clamp between 0 and 1
+        row = [[float(current_data[col]) if current_data.get(col) is not None else np.nan for col in INPUT_COLUMNS]]
+        date = pd.Timestamp(current_data.get('date', datetime.now())).to_datetime64()
+        temp_pred, humidity_pred, rain_prob_pred = (float(v) for v in self.predict_batch(row, [date])[0])
         
         # Calculate confidence based on feature importance and prediction variance
         temp_confidence = min(0.95, max(0.6, 1 - (abs(temp_pred - current_data['temperature']) / 20)))
@@ -238,7 +265,7 @@ class WeatherPredictor:
         
         return {
             'temperature': round(temp_pred, 1),
-            'humidity': round(max(0, min(100, humidity_pred)), 1),
+            'humidity': round(humidity_pred, 1),
             'rain_probability': round(rain_prob_pred * 100, 1),  # Convert to percentage
             'confidence': {
                 'temperature': round(temp_confidence, 2),
@@ -250,15 +277,16 @@ class WeatherPredictor:
     
     def save_model(self, filepath):
         """Save trained models to pickle file"""
-        if not all([self.temp_model, self.humidity_model, self.rain_model]):
+        if self.model is None:
             raise ValueError("Models not trained. Cannot save.")
         
         model_data = {
-            'temp_model': self.temp_model,
-            'humidity_model': self.humidity_model,
-            'rain_model': self.rain_model,
+            'model': self.model,
+            'target_mean': self.target_mean,
+            'target_scale': self.target_scale,
+            'targets': TARGETS,
             'feature_cols': self.feature_cols,
-            'version': '1.0',
+            'version': '2.0',
             'created_at': datetime.now().isoformat()
         }
         
@@ -266,17 +294,45 @@ class WeatherPredictor:
             pickle.dump(model_data, f)
         print(f"Models saved to {filepath}")
     
+    def export_flat(self, directory, values_dtype='float32'):
+        """Export the forest as memory-mappable node arrays (see forest_export)"""
+        from forest_export import export_model
+        
+        if self.model is None:
+            raise ValueError("Models not trained. Cannot export.")
+        # Target scaling is folded into the leaf values
+        export_model(
+            self.model, directory, n_features=len(self.feature_cols), values_dtype=values_dtype,
+            scale=self.target_scale, offset=self.target_mean,
+            meta={'feature_cols': self.feature_cols, 'targets': TARGETS, 'created_at': datetime.now().isoformat()},
+        )
+        print(f"Models exported to {directory}")
+    
     def load_model(self, filepath):
-        """Load trained models from pickle file"""
+        """Load trained models from a pickle file (2.0 or 1.0 format) or a flat export directory"""
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Model file not found: {filepath}")
         
+        if os.path.isdir(filepath):
+            from forest_export import load
+            
+            self.model, meta = load(filepath)
+            self.target_mean = np.zeros(self.model.n_outputs_)
+            self.target_scale = np.ones(self.model.n_outputs_)
+            self.temp_model = self.humidity_model = self.rain_model = None
+            self.feature_cols = meta['feature_cols']
+            print(f"Models loaded from {filepath}")
+            return
+        
         with open(filepath, 'rb') as f:
             model_data = pickle.load(f)
         
-        self.temp_model = model_data['temp_model']
-        self.humidity_model = model_data['humidity_model']
-        self.rain_model = model_data['rain_model']
+        self.model = model_data.get('model')
+        self.target_mean = model_data.get('target_mean')
+        self.target_scale = model_data.get('target_scale')
+        self.temp_model = model_data.get('temp_model')
+        self.humidity_model = model_data.get('humidity_model')
+        self.rain_model = model_data.get('rain_model')
         self.feature_cols = model_data['feature_cols']
         
         print(f"Models loaded from {filepath}")
@@ -0,0 +1,191 @@
+"""
+Precomputes forecast responses for the most requested locations.
+
+`HotRequests` counts requests per (endpoint, signature), where the signature
+holds the fields the response depends on, with lat/lon already quantized to
+the response cache cell. Scores decay at every warm-up run so the ranking
+follows recent traffic; the table can be persisted so a restart keeps it.
+
+`CacheWarmer` wakes `delay` seconds after every daily NASA POWER refresh
+boundary (when cached responses expire), ranks cells by their summed score
+and replays the signatures of the top `top_n` cells through each endpoint's
+warm function, which fills the response cache (or, for responses that depend
+on per-user input, prefetches POWER data and loads the model) and returns
+False when the signature is no longer worth warming. Signatures run
+one at a time in the warmer's thread. Between signatures, a run stops once
+the process has used `cpu_seconds` of CPU or sent `upstream_requests` POWER
+requests since it began; serving traffic counts against the CPU budget, so warming yields under
+load. Whatever is left waits for the next run.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from telemetry import UPSTREAM_REQUESTS, counter
+
+Signature = Dict[str, Any]
+WarmFn = Callable[[Signature], bool]
+
+WARMED = counter("eventcast_warmer_items_total", "Request signatures replayed by the cache warmer", ["endpoint", "result"])
+RUNS = counter("eventcast_warmer_runs_total", "Cache warm-up runs by how they ended", ["stopped_by"])
+
+
+def _key(endpoint: str, signature: Signature) -> Tuple[str, str]:
+    return endpoint, json.dumps(signature, sort_keys=True, default=str)
+
+
+class HotRequests:
+    def __init__(self, max_entries: int = 10000, state_path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.state_path = state_path
+        self._scores: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        if state_path is not None and state_path.exists():
+            try:
+                for endpoint, signature, score in json.loads(state_path.read_text()):
+                    self._scores[(endpoint, signature)] = float(score)
+            except (ValueError, TypeError) as e:
+                print(f"Ignoring unreadable warmer state {state_path}: {e}")
+
+    def record(self, endpoint: str, signature: Signature) -> None:
+        """Count one request; `signature` must hold "lat" and "lon"."""
+        key = _key(endpoint, signature)
+        with self._lock:
+            self._scores[key] = self._scores.get(key, 0.0) + 1.0
+            if len(self._scores) > 2 * self.max_entries:
+                self._prune(self.max_entries)
+
+    def _prune(self, keep: int) -> None:
+        for key in sorted(self._scores, key=self._scores.get)[: len(self._scores) - keep]:
+            del self._scores[key]
+
+    def decay(self, factor: float, floor: float = 0.05) -> None:
+        with self._lock:
+            self._scores = {k: s * factor for k, s in self._scores.items() if s * factor >= floor}
+
+    def top_cells(self, n: int) -> List[List[Tuple[str, Signature]]]:
+        """Signatures of the `n` highest-scoring cells, hottest first (signatures by score within a cell)."""
+        with self._lock:
+            items = sorted(self._scores.items(), key=lambda kv: -kv[1])
+        cells: Dict[Tuple[float, float], List[Tuple[str, Signature]]] = {}
+        totals: Dict[Tuple[float, float], float] = {}
+        for (endpoint, raw), score in items:
+            signature = json.loads(raw)
+            cell = (signature["lat"], signature["lon"])
+            cells.setdefault(cell, []).append((endpoint, signature))
+            totals[cell] = totals.get(cell, 0.0) + score
+        ranked = sorted(cells, key=lambda c: -totals[c])[:n]
+        return [cells[c] for c in ranked]
+
+    def save(self) -> None:
+        if self.state_path is None:
+            return
+        with self._lock:
+            rows = [[endpoint, signature, round(score, 4)] for (endpoint, signature), score in self._scores.items()]
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(rows))
+        os.replace(tmp, self.state_path)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+class CacheWarmer:
+    def __init__(
+        self,
+        hot: HotRequests,
+        next_refresh: Callable[[], float],
+        top_n: int = 50,
+        delay: float = 1800.0,
+        cpu_seconds: float = 120.0,
+        upstream_requests: int = 200,
+        decay: float = 0.5,
+    ):
+        self.hot = hot
+        self.next_refresh = next_refresh
+        self.top_n = top_n
+        self.delay = delay
+        self.cpu_seconds = cpu_seconds
+        self.upstream_requests = upstream_requests
+        self.decay_factor = decay
+        self._warmers: Dict[str, WarmFn] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._run_lock = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def register(self, endpoint: str, warm: WarmFn) -> None:
+        self._warmers[endpoint] = warm
+
+    def run_once(self) -> Dict[str, Any]:
+        """Replay the hottest cells within the budgets; returns a summary of the run."""
+        with self._run_lock:
+            started = time.time()
+            cpu0 = time.process_time()
+            upstream0 = UPSTREAM_REQUESTS.value(client="sync")
+            done = {"warmed": 0, "skipped": 0, "failed": 0}
+            stopped_by = "done"
+            cells = self.hot.top_cells(self.top_n)
+            for signatures in cells:
+                for endpoint, signature in signatures:
+                    if time.process_time() - cpu0 >= self.cpu_seconds:
+                        stopped_by = "cpu"
+                    elif UPSTREAM_REQUESTS.value(client="sync") - upstream0 >= self.upstream_requests:
+                        stopped_by = "upstream"
+                    if stopped_by != "done" or self._stop.is_set():
+                        break
+                    warm = self._warmers.get(endpoint)
+                    if warm is None:
+                        continue
+                    try:
+                        result = "warmed" if warm(signature) else "skipped"
+                    except Exception as e:
+                        result = "failed"
+                        print(f"Warming {endpoint} {signature} failed: {e}")
+                    done[result] += 1
+                    WARMED.inc(endpoint=endpoint, result=result)
+                if stopped_by != "done" or self._stop.is_set():
+                    break
+            self.hot.decay(self.decay_factor)
+            self.hot.save()
+            RUNS.inc(stopped_by=stopped_by)
+            self.last_run = {
+                "started_at": started,
+                "seconds": round(time.time() - started, 3),
+                "cells": len(cells),
+                **done,
+                "cpu_seconds": round(time.process_time() - cpu0, 3),
+                "upstream_requests": int(UPSTREAM_REQUESTS.value(client="sync") - upstream0),
+                "stopped_by": stopped_by,
+            }
+            print(f"Cache warm-up: {self.last_run}")
+            return self.last_run
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            wake = self.next_refresh() + self.delay
+            if self._stop.wait(max(0.0, wake - time.time())):
+                return
+            self.run_once()
+
+    def start(self) -> None:
+        if self.top_n <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self.hot.save()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tracked": len(self.hot),
+            "top_n": self.top_n,
+            "next_run_at": self.next_refresh() + self.delay,
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,627 @@
+"""
+Forecast computations behind the routers.
+
+This is the module that brings in pandas, NumPy and the ml-model code, so
+routers import it inside their handlers: the app starts listening
+without it and the startup warm-up (or the first request) loads it. Importing
+it also registers the per-endpoint warm functions with the cache warmer.
+"""
+import asyncio
+import datetime as dt
+import importlib.util
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+import grid
+import planner
+from climatology import get_index as climatology_index
+from features import predict as _predict, transformer_for
+from nasa import fetch_power_daily
+from regional import fill_spatial
+from rollout import MAX_HORIZON, RAIN_MM_PER_PROBABILITY, RolloutEngine
+from schemas import (
+    BestDatesRequest,
+    GridRequest,
+    PredictRequest,
+    SeasonalRequest,
+    ShortTermRequest,
+    UnifiedForecastResponse,
+    WeatherPredictionRequest,
+    WeatherPredictionResponse,
+)
+from seasonal_predictor import seasonal_predict
+from state import AUTO_TRAIN, cache_warmer, load_model, model_store, model_version, response_cache, training_queue
+from telemetry import bind
+from training_queue import location_key
+
+if TYPE_CHECKING:
+    from weather_predictor import WeatherPredictor
+
+# Per-location models need sklearn, which is only imported when the first one loads
+PREDICTOR_AVAILABLE = importlib.util.find_spec("weather_predictor") is not None
+if not PREDICTOR_AVAILABLE:
+    print("Warning: weather_predictor module not found. Make sure to install dependencies.")
+
+
+def _history_confidence(start: dt.date, end: dt.date) -> float:
+    # Very simple confidence heuristic: more recent data and length of history
+    days_covered = (end - start).days
+    recency_days = (dt.date.today() - end).days
+    return max(0.4, min(0.95, 0.6 + 0.002 * days_covered - 0.02 * recency_days))
+
+
+def short_term_cached(req: ShortTermRequest):
+    """(entry, hit) for a request already quantized to its cell"""
+    key = response_cache.key("predict", req.lat, req.lon, req.date, model_version(), extra={"horizon": req.horizon})
+    return response_cache.get_or_compute(key, lambda: short_term_forecast(req))
+
+
+def short_term_forecast(req: ShortTermRequest) -> UnifiedForecastResponse:
+    try:
+        bundle = load_model()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    model = bundle["model"]
+    feature_columns = bundle["feature_columns"]
+
+    try:
+        anchor_date = dt.date.fromisoformat(req.date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    end = min(anchor_date - dt.timedelta(days=1), dt.date.today())
+    start = end - dt.timedelta(days=14)
+
+    df = fetch_power_daily(req.lat, req.lon, start, end)
+    if df.empty:
+        raise HTTPException(status_code=400, detail="No historical data available from NASA POWER")
+
+    # Roll forward from the last observed day with exact lag/rolling updates
+    transformer = transformer_for(bundle)
+    engine = RolloutEngine(
+        transformer,
+        df[transformer.base_columns].to_numpy(dtype=np.float64),
+        df.index[-1].date(),
+        feature_columns,
+    )
+    preds = engine.run(
+        lambda x: _predict(model, fill_spatial(bundle, x, req.lat, req.lon, [np.datetime64(engine.date)]), feature_columns),
+        req.horizon,
+    )
+
+    rain_probs = np.clip(preds[:, 2], 0.0, 1.0)
+    temps = [round(float(v), 1) for v in preds[:, 0]]
+    humids = [round(float(v), 1) for v in preds[:, 1]]
+    precs = [round(float(v), 2) for v in rain_probs * RAIN_MM_PER_PROBABILITY]
+
+    confidence = _history_confidence(start, end)
+
+    return UnifiedForecastResponse(
+        mode="short_term",
+        predicted_temperature=temps,
+        predicted_humidity=humids,
+        predicted_precipitation=precs,
+        confidence=round(confidence, 3),
+    )
+
+
+def seasonal_cached(req: SeasonalRequest):
+    """(entry, hit) for a request already quantized to its cell"""
+    key = response_cache.key("predict-seasonal", req.lat, req.lon, req.date, f"climatology:{climatology_index().version}", extra={"range": req.range})
+    return response_cache.get_or_compute(key, lambda: seasonal_forecast(req))
+
+
+def seasonal_forecast(req: SeasonalRequest) -> UnifiedForecastResponse:
+    try:
+        target = dt.date.fromisoformat(req.date)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    mode = "month" if req.range not in ("date", "month") else req.range
+    temps, humids, precs, conf = seasonal_predict(req.lat, req.lon, target, mode=mode)  # type: ignore[arg-type]
+    if temps.size == 0:
+        raise HTTPException(status_code=400, detail="Insufficient historical data for seasonal prediction")
+    return UnifiedForecastResponse(
+        mode="seasonal",
+        predicted_temperature=[round(float(x), 1) for x in temps.tolist()],
+        predicted_humidity=[round(float(x), 1) for x in humids.tolist()],
+        predicted_precipitation=[round(float(x), 2) for x in precs.tolist()],
+        confidence=round(float(conf), 3),
+    )
+
+
+def get_weather_condition(temp: float, rain_prob: float):
+    """Determine weather condition based on temperature and rain probability"""
+    conditions = {
+        'Clear': 'صافي',
+        'Partly Cloudy': 'غائم جزئياً', 
+        'Cloudy': 'غائم',
+        'Rainy': 'ممطر',
+        'Hot': 'حار',
+        'Very Hot': 'حار جداً',
+        'Warm': 'دافئ',
+        'Mild': 'معتدل',
+        'Cool': 'بارد'
+    }
+    
+    if rain_prob > 50:
+        return 'Rainy', conditions['Rainy']
+    elif temp > 38:
+        return 'Very Hot', conditions['Very Hot']
+    elif temp > 30:
+        return 'Hot', conditions['Hot']
+    elif temp > 25:
+        return 'Warm', conditions['Warm']
+    elif temp > 15:
+        return 'Mild', conditions['Mild']
+    else:
+        return 'Cool', conditions['Cool']
+
+
+async def fetch_nasa_current_data(lat: float, lon: float):
+    """Fetch recent NASA data to use as input for prediction"""
+    try:
+        # Get data from the last 7 days, through the shared cache and upstream gate
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=7)
+
+        df = await asyncio.to_thread(fetch_power_daily, lat, lon, start_date, end_date)
+        if df.empty:
+            return None
+
+        # Most recent day with a temperature (fetch_power_daily drops the others)
+        day = df.index[-1]
+        row = df.iloc[-1]
+        # POWER reports two decimals; rounding drops float32 parsing noise
+        temp = round(float(row['T2M']), 2)
+
+        def value(param: str, default: float) -> float:
+            v = row.get(param)
+            return default if v is None or np.isnan(v) else round(float(v), 2)
+
+        return {
+            'date': day.to_pydatetime(),
+            'temperature': temp,
+            'temp_max': value('T2M_MAX', temp),
+            'temp_min': value('T2M_MIN', temp),
+            'humidity': value('RH2M', 50),
+            'wind_speed': value('WS2M', 5),
+            'precipitation': value('PRECTOTCORR', 0),
+            'uv_index': value('ALLSKY_SFC_UV_INDEX', 5)
+        }
+
+    except Exception as e:
+        print(f"Error fetching NASA data: {e}")
+        return None
+
+
+def resolve_predictor(lat: float, lon: float) -> Tuple[Optional["WeatherPredictor"], str]:
+    """
+    Return the model to answer with and where it came from. Locations without a
+    trained model are answered by the regional model when one covers them
+    ("regional"); otherwise they get a background training job (with AUTO_TRAIN,
+    while the training queue has room) and are answered by the nearest trained
+    location ("nearest:<key>") or by climatology.
+    """
+    key = location_key(lat, lon)
+    if model_store.has(key):
+        return model_store.get(key), "location"
+
+    # A regional model answers every location it covers without any training
+    if regional_bundle(lat, lon) is not None:
+        return None, "regional"
+
+    if AUTO_TRAIN:
+        training_queue.submit(lat, lon)
+    nearest_key = training_queue.nearest_model(lat, lon)
+    if nearest_key is not None:
+        return model_store.get(nearest_key), f"nearest:{nearest_key}"
+    return None, "climatology"
+
+
+def regional_bundle(lat: float, lon: float) -> Optional[Dict[str, Any]]:
+    """The served short-term bundle when it is a regional model covering (lat, lon)."""
+    try:
+        bundle = load_model()
+    except Exception:
+        return None
+    spatial = bundle.get("spatial")
+    return bundle if spatial is not None and spatial.covers(lat, lon) else None
+
+
+def regional_prediction(lat: float, lon: float, current_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Next-day prediction from the regional model, shaped like WeatherPredictor output"""
+    bundle = regional_bundle(lat, lon)
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Regional model no longer available")
+    end = dt.date.today() - dt.timedelta(days=1)
+    df = fetch_power_daily(lat, lon, end - dt.timedelta(days=14), end)
+    if df.empty:
+        raise HTTPException(status_code=400, detail="No historical data available from NASA POWER")
+    feature_columns = bundle["feature_columns"]
+    x_last = transformer_for(bundle).transform_frame_last(df, feature_columns)
+    x_last = fill_spatial(bundle, x_last, lat, lon, df.index[-1:].to_numpy())
+    pred = _predict(bundle["model"], x_last, feature_columns)[0]
+    temp, humid, rain_prob = float(pred[0]), float(pred[1]), min(max(float(pred[2]), 0.0), 1.0)
+    # Same confidence heuristic as WeatherPredictor.predict_weather
+    temp_confidence = min(0.95, max(0.6, 1 - (abs(temp - float(current_data['temperature'])) / 20)))
+    humidity_confidence = min(0.95, max(0.6, 1 - (abs(humid - float(current_data['humidity'])) / 50)))
+    rain_confidence = 0.8
+    return {
+        'temperature': round(temp, 1),
+        'humidity': round(max(0, min(100, humid)), 1),
+        'rain_probability': round(rain_prob * 100, 1),
+        'confidence': {
+            'temperature': round(temp_confidence, 2),
+            'humidity': round(humidity_confidence, 2),
+            'rain': round(rain_confidence, 2),
+            'overall': round((temp_confidence + humidity_confidence + rain_confidence) / 3, 2),
+        }
+    }
+
+
+def climatology_prediction(lat: float, lon: float, current_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Typical conditions for tomorrow from multi-year NASA data, shaped like WeatherPredictor output"""
+    tomorrow = (datetime.now() + timedelta(days=1)).date()
+    temps, humids, precs, conf = seasonal_predict(lat, lon, tomorrow, mode="date")
+    if temps.size == 0:
+        raise HTTPException(status_code=503, detail="Model is training and no climatology is available yet")
+    # Same mm <-> probability mapping as the short-term rollout (20 mm ~ certain rain)
+    rain_prob = min(max(float(precs[0]) / 20.0, 0.0), 1.0)
+    confidence = round(min(float(conf), 0.7), 2)
+    return {
+        'temperature': round(float(temps[0]), 1),
+        'humidity': round(max(0, min(100, float(humids[0]))), 1),
+        'rain_probability': round(rain_prob * 100, 1),
+        'confidence': {
+            'temperature': confidence,
+            'humidity': confidence,
+            'rain': confidence,
+            'overall': confidence,
+        }
+    }
+
+
+async def weather_prediction(request: WeatherPredictionRequest) -> WeatherPredictionResponse:
+    if not PREDICTOR_AVAILABLE:
+        raise HTTPException(status_code=500, detail="Weather prediction model not available")
+    
+    try:
+        # Pick the model for this location; unknown locations queue training in the background
+        predictor, model_source = await asyncio.to_thread(resolve_predictor, request.lat, request.lon)
+        
+        # Get current weather data from NASA if not provided in sufficient detail
+        current_data = request.current_weather.copy()
+        
+        # Fetch recent NASA data if we don't have all required fields
+        if not all(key in current_data for key in ['temperature', 'humidity', 'precipitation']):
+            nasa_data = await fetch_nasa_current_data(request.lat, request.lon)
+            if nasa_data:
+                # Merge NASA data with provided data
+                for key, value in nasa_data.items():
+                    if key not in current_data or current_data.get(key) is None:
+                        current_data[key] = value
+        
+        # Ensure we have minimum required data
+        required_fields = ['temperature', 'humidity']
+        for field in required_fields:
+            if field not in current_data:
+                raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
+        
+        # Set defaults for missing optional fields
+        current_data.setdefault('precipitation', 0)
+        current_data.setdefault('wind_speed', 5)
+        current_data.setdefault('uv_index', 5)
+        current_data.setdefault('temp_max', current_data['temperature'] + 5)
+        current_data.setdefault('temp_min', current_data['temperature'] - 5)
+        current_data.setdefault('date', datetime.now())
+        
+        # Make prediction
+        if predictor is not None:
+            prediction = await asyncio.to_thread(predictor.predict_weather, current_data)
+        elif model_source == "regional":
+            prediction = await asyncio.to_thread(regional_prediction, request.lat, request.lon, current_data)
+        else:
+            prediction = await asyncio.to_thread(climatology_prediction, request.lat, request.lon, current_data)
+        
+        # Determine weather condition
+        condition, condition_ar = get_weather_condition(
+            prediction['temperature'], 
+            prediction['rain_probability']
+        )
+        
+        # Calculate derived values
+        feels_like = prediction['temperature']
+        if prediction['humidity'] > 70:
+            feels_like += 2
+        elif prediction['humidity'] < 30:
+            feels_like -= 1
+            
+        # Estimate other weather parameters based on predicted values
+        wind_speed = current_data.get('wind_speed', 10) + (0.5 - 0.5) * 5  # Random-like variation
+        wind_speed = max(0, min(50, wind_speed))
+        
+        uv_index = max(1, min(11, prediction['temperature'] / 3.5))
+        precipitation = prediction['rain_probability'] / 10 if prediction['rain_probability'] > 30 else 0
+        
+        return WeatherPredictionResponse(
+            temperature=prediction['temperature'],
+            humidity=prediction['humidity'],
+            rain_probability=prediction['rain_probability'],
+            confidence=prediction['confidence'],
+            condition=condition,
+            condition_ar=condition_ar,
+            feels_like=round(feels_like, 1),
+            wind_speed=round(wind_speed, 1),
+            uv_index=round(uv_index, 1),
+            precipitation=round(precipitation, 1),
+            is_ai_prediction=model_source != "climatology",
+            model_source=model_source,
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in weather prediction: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+BATCH_HISTORY_DAYS = 60
+
+
+def _batch_windows(items: list[PredictRequest]) -> Dict[Tuple[float, float], Tuple[dt.date, dt.date]]:
+    """One fetch window per location covering the history needed by all of its items"""
+    windows: Dict[Tuple[float, float], Tuple[dt.date, dt.date]] = {}
+    today = dt.date.today()
+    for item in items:
+        end = min(dt.date.fromisoformat(item.date) - dt.timedelta(days=1), today)
+        start = end - dt.timedelta(days=BATCH_HISTORY_DAYS)
+        loc = (item.lat, item.lon)
+        if loc in windows:
+            s, e = windows[loc]
+            windows[loc] = (min(s, start), max(e, end))
+        else:
+            windows[loc] = (start, end)
+    return windows
+
+
+def _batch_predict(items: list[PredictRequest], histories: Dict[Tuple[float, float], Any]) -> list[Dict[str, Any]]:
+    """Build one feature matrix for every item and run a single model.predict over it"""
+    bundle = load_model()
+    model = bundle["model"]
+    feature_columns = bundle["feature_columns"]
+
+    transformer = transformer_for(bundle)
+
+    # One transformer pass per location over its whole shared history
+    features = {}
+    for loc, df in histories.items():
+        if isinstance(df, pd.DataFrame) and not df.empty:
+            X = fill_spatial(bundle, transformer.transform(df, feature_columns), loc[0], loc[1], df.index.to_numpy())
+            features[loc] = (df.index, X)
+
+    results: list[Dict[str, Any]] = [{} for _ in items]
+    rows = []
+    row_items = []
+    today = dt.date.today()
+    for i, item in enumerate(items):
+        base = {"index": i, "lat": item.lat, "lon": item.lon, "date": item.date}
+        end = min(dt.date.fromisoformat(item.date) - dt.timedelta(days=1), today)
+        start = end - dt.timedelta(days=BATCH_HISTORY_DAYS)
+        pos = -1
+        if (item.lat, item.lon) in features:
+            index, X = features[(item.lat, item.lon)]
+            pos = index.searchsorted(pd.Timestamp(end), side="right") - 1
+            if pos >= 0 and index[pos] < pd.Timestamp(start):
+                pos = -1
+        if pos < 0:
+            err = histories.get((item.lat, item.lon))
+            detail = str(err) if isinstance(err, Exception) else "No historical data available from NASA POWER"
+            results[i] = {**base, "error": detail}
+            continue
+        rows.append(X[pos])
+        row_items.append((i, base, start, end))
+
+    if rows:
+        preds = _predict(model, np.vstack(rows), feature_columns)
+        for (i, base, start, end), pred in zip(row_items, preds):
+            results[i] = {
+                **base,
+                "temperature": round(float(pred[0]), 1),
+                "humidity": round(float(pred[1]), 1),
+                "rain_probability": round(float(min(max(pred[2], 0.0), 1.0)), 3),
+                "confidence": round(_history_confidence(start, end), 3),
+            }
+    return results
+
+
+def _safe_fetch(lat: float, lon: float, start: dt.date, end: dt.date, cached_only: bool = False):
+    try:
+        return fetch_power_daily(lat, lon, start, end, cached_only=cached_only)
+    except Exception as e:
+        return e
+
+
+async def batch_results(items: list[PredictRequest]) -> list[Dict[str, Any]]:
+    """Items sharing a location share one NASA fetch; all rows go through a single model.predict"""
+    try:
+        windows = _batch_windows(items)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    try:
+        load_model()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    locations = list(windows)
+    fetched = await asyncio.gather(
+        *(asyncio.to_thread(_safe_fetch, lat, lon, *windows[(lat, lon)]) for lat, lon in locations)
+    )
+    histories = dict(zip(locations, fetched))
+    return await asyncio.to_thread(_batch_predict, items, histories)
+
+
+GRID_MAX_CELLS = int(os.getenv("GRID_MAX_CELLS", "2500"))
+GRID_HISTORY_DAYS = 14
+# Cells one grid request may fetch from POWER; the others are served from the
+# cache as they are (NaN when never fetched) until a later request fills them
+GRID_MAX_UPSTREAM_CELLS = int(os.getenv("GRID_MAX_UPSTREAM_CELLS", "100"))
+# Grid fetches get their own bounded pool, so a large uncached grid cannot hold
+# the default executor that /predict-weather and /plan/best-dates run on
+_grid_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("GRID_FETCH_WORKERS", "8")),
+    thread_name_prefix="grid-fetch",
+)
+
+
+async def _grid_frames(points: list[Tuple[float, float]], start: dt.date, end: dt.date) -> Tuple[list, list[int]]:
+    """POWER histories for `points` (None when unavailable) and the positions of the cells that were not refreshed."""
+    loop = asyncio.get_running_loop()
+
+    def fetch(cached_only: bool, lat: float, lon: float):
+        return loop.run_in_executor(_grid_pool, bind(_safe_fetch), lat, lon, start, end, cached_only)
+
+    frames = list(await asyncio.gather(*(fetch(True, lat, lon) for lat, lon in points)))
+    need = [i for i, f in enumerate(frames) if not isinstance(f, pd.DataFrame) or f.attrs.get("missing")]
+    refresh = need[:GRID_MAX_UPSTREAM_CELLS]
+    fetched = await asyncio.gather(*(fetch(False, *points[i]) for i in refresh))
+    for i, frame in zip(refresh, fetched):
+        frames[i] = frame
+    return [f if isinstance(f, pd.DataFrame) else None for f in frames], need[len(refresh):]
+
+
+async def grid_forecast(request: GridRequest):
+    """Raster and summary for a non-empty bbox (see the /predict/grid route)"""
+    lats, lons = grid.grid_axes(request.min_lat, request.min_lon, request.max_lat, request.max_lon, request.resolution)
+    if len(lats) * len(lons) > GRID_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"{len(lats) * len(lons)} cells; at most {GRID_MAX_CELLS} per grid")
+    today = dt.date.today()
+    try:
+        target = dt.date.fromisoformat(request.date) if request.date else today + dt.timedelta(days=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    if target > today + dt.timedelta(days=MAX_HORIZON):
+        raise HTTPException(status_code=400, detail=f"The grid forecasts at most {MAX_HORIZON} days ahead")
+    try:
+        bundle = load_model()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # Only cells the model covers are fetched
+    covered = grid.covered_cells(bundle, lats, lons).ravel()
+    end = min(target - dt.timedelta(days=1), today)
+    start = end - dt.timedelta(days=GRID_HISTORY_DAYS)
+    points = [(float(a), float(o)) for a in lats for o in lons]
+    fetched, not_refreshed = await _grid_frames([p for p, c in zip(points, covered) if c], start, end)
+    positions = np.flatnonzero(covered)
+    frames = [None] * len(points)
+    for i, frame in zip(positions, fetched):
+        frames[i] = frame
+    try:
+        raster, as_of = await asyncio.to_thread(grid.predict_raster, bundle, lats, lons, frames, target)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Cells left out of this request's refresh, or whose history stops before
+    # the day the others are aligned on, are filled in by later requests
+    deferred = {int(positions[i]) for i in not_refreshed}
+    deferred.update(
+        i for i, f in enumerate(frames)
+        if as_of is not None and f is not None and not f.empty and f.index[-1].date() < as_of
+    )
+
+    summary = {
+        "bands": grid.BANDS,
+        "shape": list(raster.shape),
+        "dtype": "float32",
+        "bounds": {
+            "north": round(float(lats[0]) + request.resolution / 2, 6),
+            "south": round(float(lats[-1]) - request.resolution / 2, 6),
+            "west": round(float(lons[0]) - request.resolution / 2, 6),
+            "east": round(float(lons[-1]) + request.resolution / 2, 6),
+        },
+        "resolution": request.resolution,
+        "lats": lats.tolist(),
+        "lons": lons.tolist(),
+        "date": target.isoformat(),
+        "observed": as_of.isoformat() if as_of else None,
+        "valid_date": target.isoformat() if as_of else None,
+        "lead_days": (target - as_of).days if as_of else None,
+        "cells": len(points),
+        "covered": int(covered.sum()),
+        "predicted": int((~np.isnan(raster[0])).sum()),
+        "stale_cells": sum(1 for f in frames if f is not None and f.attrs.get("stale")),
+        "deferred_cells": len(deferred),
+        "stats": grid.band_stats(raster),
+        "model_version": model_version(),
+    }
+    if request.format == "npy":
+        return Response(
+            content=grid.to_npy(raster),
+            media_type="application/x-npy",
+            headers={"X-Grid-Summary": json.dumps({k: v for k, v in summary.items() if k not in ("lats", "lons")}, separators=(",", ":"))},
+        )
+    return {**summary, "data": grid.to_base64(raster)}
+
+
+def _planning_bundle(lat: float, lon: float) -> Optional[Dict[str, Any]]:
+    """The short-term bundle when it can forecast (lat, lon); regional models only inside their region."""
+    try:
+        bundle = load_model()
+    except Exception:
+        return None
+    spatial = bundle.get("spatial")
+    return bundle if spatial is None or spatial.covers(lat, lon) else None
+
+
+def best_dates_plan(request: BestDatesRequest, start: dt.date, end: dt.date) -> Dict[str, Any]:
+    thresholds = planner.Thresholds(request.temp_min, request.temp_max, request.max_rain_probability, request.max_humidity)
+    try:
+        plan = planner.best_dates(request.lat, request.lon, start, end, thresholds, request.top_k, _planning_bundle(request.lat, request.lon))
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"lat": request.lat, "lon": request.lon, **plan}
+
+
+def _warm_short_term(signature: Dict[str, Any]) -> bool:
+    if dt.date.fromisoformat(signature["date"]) < dt.date.today():
+        return False
+    short_term_cached(ShortTermRequest(**signature))
+    return True
+
+
+def _warm_seasonal(signature: Dict[str, Any]) -> bool:
+    if dt.date.fromisoformat(signature["date"]) < dt.date.today():
+        return False
+    seasonal_cached(SeasonalRequest(**signature))
+    return True
+
+
+def _warm_weather(signature: Dict[str, Any]) -> bool:
+    """
+    /predict-weather responses are keyed by the client's current weather, so
+    only what they share is warmed: the location's model and the recent POWER
+    days read by fetch_nasa_current_data and regional_prediction. Locations
+    answered by a nearest-location model or climatology are skipped: warming
+    them would only queue training jobs, which the warmer's budgets do not cover.
+    """
+    lat, lon = signature["lat"], signature["lon"]
+    key = location_key(lat, lon)
+    if model_store.has(key):
+        model_store.get(key)
+    elif regional_bundle(lat, lon) is None:
+        return False
+    today = dt.date.today()
+    fetch_power_daily(lat, lon, today - dt.timedelta(days=15), today)
+    return True
+
+
+cache_warmer.register("predict", _warm_short_term)
+cache_warmer.register("predict-seasonal", _warm_seasonal)
+cache_warmer.register("predict-weather", _warm_weather)
@@ -0,0 +1,39 @@
+"""
+HTTP instrumentation: per-route latency histogram, in-flight gauge and opt-in
+request profiling. With PROFILING=1, requests sent with `X-Profile: 1` get an
+X-Profile-Id whose folded stacks are served at /debug/profile/{id}. Off by
+default: profiles expose internal spans to whoever asks for them.
+"""
+import os
+import time
+
+from fastapi import Request
+
+import telemetry
+
+HTTP_SECONDS = telemetry.histogram("eventcast_http_request_seconds", "Request latency by route", ["method", "route", "status"])
+HTTP_IN_FLIGHT = telemetry.gauge("eventcast_http_requests_in_flight", "Requests being handled")
+PROFILING = os.getenv("PROFILING", "0").lower() in ("1", "true", "yes", "on")
+profiles = telemetry.ProfileStore(int(os.getenv("PROFILE_MAX_ENTRIES", "100")))
+
+
+async def instrument(request: Request, call_next):
+    """Per-route latency histogram, in-flight gauge and opt-in request profiling"""
+    HTTP_IN_FLIGHT.inc()
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        if PROFILING and request.headers.get("x-profile", "0") not in ("", "0"):
+            with telemetry.profiled(f"{request.method} {request.url.path}") as profile:
+                response = await call_next(request)
+            profiles.add(profile)
+            response.headers["X-Profile-Id"] = profile.id
+            response.headers["Server-Timing"] = f"total;dur={profile.seconds * 1000:.1f}"
+        else:
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.inc(-1)
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_SECONDS.observe(time.perf_counter() - t0, method=request.method, route=route, status=status)
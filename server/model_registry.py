@@ -0,0 +1,142 @@
+"""
+Process-wide registry for pickled model bundles.
+
+A bundle is unpickled once per process and shared by every request. Each
+lookup (at most once per `check_interval` seconds) stats the file; when its
+mtime or size changed the bundle is reloaded and swapped in atomically, so
+readers keep using the previous bundle until the new one is fully loaded. A
+reload that fails (e.g. a half-written file) is logged and retried after
+`check_interval`; the previous bundle is served meanwhile.
+"""
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+def pickle_loader(path: Path) -> Any:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only, None elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+@dataclass
+class ModelEntry:
+    path: Path
+    bundle: Any
+    mtime_ns: int
+    size_bytes: int
+    load_seconds: float
+    rss_delta_bytes: Optional[int]
+    loaded_at: float
+    checked_at: float
+    loads: int = 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "size_bytes": self.size_bytes,
+            "load_seconds": round(self.load_seconds, 4),
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "loaded_at": self.loaded_at,
+            "mtime_ns": self.mtime_ns,
+            "loads": self.loads,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, loader: Callable[[Path], Any] = pickle_loader, check_interval: float = 2.0):
+        self._loader = loader
+        self._check_interval = check_interval
+        self._entries: Dict[Path, ModelEntry] = {}
+        self._locks: Dict[Path, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, path: Path) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def get(self, path: os.PathLike | str) -> Any:
+        """Return the bundle stored at `path`, loading or reloading it if needed."""
+        # Not resolved: a swapped symlink (flat exports) must read as a change of the same path
+        path = Path(path).absolute()
+        entry = self._entries.get(path)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self._check_interval:
+            return entry.bundle
+
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if entry is not None:
+                # File removed while serving: keep answering from memory.
+                entry.checked_at = now
+                return entry.bundle
+            raise FileNotFoundError(f"Model not found at {path}")
+
+        if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size_bytes == st.st_size:
+            entry.checked_at = now
+            return entry.bundle
+
+        with self._lock_for(path):
+            # Another thread may have finished the reload while we waited.
+            current = self._entries.get(path)
+            if current is not None and current is not entry:
+                return current.bundle
+            try:
+                return self._load(path, st, previous=entry).bundle
+            except Exception as e:
+                if entry is None:
+                    raise
+                print(f"Reloading model bundle {path} failed, keeping the loaded one: {type(e).__name__}: {e}")
+                entry.checked_at = time.monotonic()
+                return entry.bundle
+
+    def _load(self, path: Path, st: os.stat_result, previous: Optional[ModelEntry]) -> ModelEntry:
+        rss_before = _rss_bytes()
+        t0 = time.perf_counter()
+        bundle = self._loader(path)
+        elapsed = time.perf_counter() - t0
+        rss_after = _rss_bytes()
+        entry = ModelEntry(
+            path=path,
+            bundle=bundle,
+            mtime_ns=st.st_mtime_ns,
+            size_bytes=st.st_size,
+            load_seconds=elapsed,
+            rss_delta_bytes=(rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            loaded_at=time.time(),
+            checked_at=time.monotonic(),
+            loads=(previous.loads + 1) if previous is not None else 1,
+        )
+        self._entries[path] = entry
+        print(f"Loaded model bundle {path} in {elapsed:.3f}s")
+        return entry
+
+    def preload(self, path: os.PathLike | str) -> bool:
+        """Load `path` eagerly if it exists. Returns True when a bundle is available."""
+        try:
+            self.get(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def version(self, path: os.PathLike | str) -> Optional[int]:
+        """mtime_ns of the bundle currently loaded for `path` (None if not loaded)."""
+        entry = self._entries.get(Path(path).absolute())
+        return entry.mtime_ns if entry is not None else None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [entry.stats() for entry in list(self._entries.values())]
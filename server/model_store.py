@@ -0,0 +1,181 @@
+"""
+Keyed store for per-location models.
+
+On disk every location key owns a directory of versioned files
+(`<root>/<lat>_<lon>/v<N>.pkl`); a retrain writes the next version and the
+previous ones are pruned once the new version is loaded. In memory an LRU of
+loaded models is bounded by `max_bytes` (estimated from the model file size),
+so several regions stay warm at once without unbounded growth.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_VERSION_RE = re.compile(r"^v(\d+)\.pkl$")
+
+
+def key_to_dirname(key: str) -> str:
+    return key.replace(",", "_")
+
+
+def dirname_to_location(name: str) -> Optional[Tuple[float, float]]:
+    try:
+        lat_s, lon_s = name.split("_")
+        return float(lat_s), float(lon_s)
+    except ValueError:
+        return None
+
+
+@dataclass
+class _Loaded:
+    version: int
+    model: Any
+    size_bytes: int
+    load_seconds: float
+    checked_at: float
+
+
+class ModelStore:
+    def __init__(
+        self,
+        root: os.PathLike | str,
+        loader: Callable[[Path], Any],
+        max_bytes: int = 512 * 1024 * 1024,
+        keep_versions: int = 2,
+        check_interval: float = 5.0,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.keep_versions = keep_versions
+        self.check_interval = check_interval
+        self._loader = loader
+        self._lru: "OrderedDict[str, _Loaded]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _dir(self, key: str) -> Path:
+        return self.root / key_to_dirname(key)
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def versions(self, key: str) -> List[int]:
+        d = self._dir(key)
+        if not d.is_dir():
+            return []
+        out = []
+        for f in d.iterdir():
+            m = _VERSION_RE.match(f.name)
+            if m:
+                out.append(int(m.group(1)))
+        return sorted(out)
+
+    def latest_version(self, key: str) -> Optional[int]:
+        versions = self.versions(key)
+        return versions[-1] if versions else None
+
+    def has(self, key: str) -> bool:
+        return key in self._lru or self.latest_version(key) is not None
+
+    def version_path(self, key: str, version: int) -> Path:
+        return self._dir(key) / f"v{version}.pkl"
+
+    def next_version_path(self, key: str) -> Path:
+        """Path a retrain should write to; the directory is created."""
+        self._dir(key).mkdir(parents=True, exist_ok=True)
+        return self.version_path(key, (self.latest_version(key) or 0) + 1)
+
+    def locations(self) -> List[Tuple[float, float, str]]:
+        """(lat, lon, key) of every location with at least one version on disk."""
+        out: List[Tuple[float, float, str]] = []
+        if not self.root.exists():
+            return out
+        for d in self.root.iterdir():
+            loc = dirname_to_location(d.name) if d.is_dir() else None
+            if loc is not None and any(_VERSION_RE.match(f.name) for f in d.iterdir()):
+                out.append((loc[0], loc[1], d.name.replace("_", ",")))
+        return out
+
+    def get(self, key: str) -> Any:
+        """Latest model for `key`, loading it (and evicting others) if needed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and now - entry.checked_at < self.check_interval:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return entry.model
+
+        latest = self.latest_version(key)
+        if latest is None:
+            if entry is not None:
+                return entry.model
+            raise FileNotFoundError(f"No model stored for {key}")
+        if entry is not None and entry.version == latest:
+            with self._lock:
+                entry.checked_at = now
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                self.hits += 1
+            return entry.model
+
+        with self._key_lock(key):
+            with self._lock:
+                current = self._lru.get(key)
+            if current is not None and current.version == latest:
+                return current.model
+            return self._load(key, latest)
+
+    def _load(self, key: str, version: int) -> Any:
+        path = self.version_path(key, version)
+        t0 = time.perf_counter()
+        model = self._loader(path)
+        elapsed = time.perf_counter() - t0
+        size = path.stat().st_size
+        with self._lock:
+            self.misses += 1
+            old = self._lru.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size_bytes
+            self._lru[key] = _Loaded(version, model, size, elapsed, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._lru) > 1:
+                evicted_key, evicted = self._lru.popitem(last=False)
+                self._bytes -= evicted.size_bytes
+                self.evictions += 1
+                print(f"Evicted model {evicted_key} v{evicted.version} from memory")
+        print(f"Loaded model {key} v{version} in {elapsed:.3f}s")
+        self._prune(key, version)
+        return model
+
+    def _prune(self, key: str, loaded_version: int) -> None:
+        old = [v for v in self.versions(key) if v < loaded_version]
+        for v in old[: max(0, len(old) - (self.keep_versions - 1))]:
+            try:
+                self.version_path(key, v).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "loaded": [
+                    {"key": k, "version": e.version, "size_bytes": e.size_bytes, "load_seconds": round(e.load_seconds, 4)}
+                    for k, e in self._lru.items()
+                ],
+            }
@@ -0,0 +1,169 @@
+"""
+Response cache for forecast endpoints.
+
+A forecast for one ~0.1 degree cell and one date is the same for every user
+until NASA POWER publishes the next daily update or the model changes, so
+responses are keyed by (endpoint, quantized lat/lon, date, model version,
+extra request fields) and expire at the next daily refresh boundary.
+Concurrent misses for the same key are coalesced: one caller computes, the
+others wait for its result. Entries carry an ETag and a Cache-Control max-age
+so the frontend and CDNs can reuse them too.
+"""
+import asyncio
+import datetime as dt
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from telemetry import span
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    expires_at: float
+
+    def max_age(self) -> int:
+        return max(0, int(self.expires_at - time.time()))
+
+
+def to_response(entry: CachedResponse, request: Optional[Request] = None, hit: bool = False) -> Response:
+    """JSON response with validators; answers 304 when the client already holds this ETag."""
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"public, max-age={entry.max_age()}",
+        "X-Cache": "HIT" if hit else "MISS",
+    }
+    if request is not None:
+        if_none_match = request.headers.get("if-none-match", "")
+        if entry.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    def __init__(self, resolution: float = 0.1, refresh_hour_utc: int = 6, max_entries: int = 10000):
+        self.resolution = resolution
+        self.refresh_hour_utc = refresh_hour_utc
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def quantize(self, lat: float, lon: float) -> Tuple[float, float]:
+        r = self.resolution
+        return round(round(lat / r) * r, 4), round(round(lon / r) * r, 4)
+
+    def key(self, endpoint: str, lat: float, lon: float, date: str, model_version: Any, extra: Any = None) -> str:
+        qlat, qlon = self.quantize(lat, lon)
+        key = f"{endpoint}|{qlat:.4f}|{qlon:.4f}|{date}|{model_version}"
+        if extra is not None:
+            digest = hashlib.sha1(json.dumps(extra, sort_keys=True, default=str).encode()).hexdigest()[:16]
+            key += f"|{digest}"
+        return key
+
+    def next_refresh(self, now: Optional[float] = None) -> float:
+        """Unix time of the next daily NASA POWER refresh boundary."""
+        current = dt.datetime.fromtimestamp(now if now is not None else time.time(), tz=dt.timezone.utc)
+        boundary = current.replace(hour=self.refresh_hour_utc, minute=0, second=0, microsecond=0)
+        if boundary <= current:
+            boundary += dt.timedelta(days=1)
+        return boundary.timestamp()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: str, value: Any) -> CachedResponse:
+        with span("response.serialize"):
+            body = json.dumps(jsonable_encoder(value), separators=(",", ":")).encode()
+        entry = CachedResponse(
+            body=body,
+            etag='"' + hashlib.sha1(body).hexdigest()[:20] + '"',
+            expires_at=self.next_refresh(),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Tuple[CachedResponse, bool]:
+        """Cached entry for `key` or the result of `compute()` (shared by concurrent callers). Returns (entry, hit)."""
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry, True
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+        if not leader:
+            self.coalesced += 1
+            return fut.result(), True
+        self.misses += 1
+        try:
+            entry = self._store(key, compute())
+            fut.set_result(entry)
+            return entry, False
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[CachedResponse, bool]:
+        """Async variant of get_or_compute for handlers running on the event loop."""
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry, True
+        fut = self._ainflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut), True
+        fut = asyncio.get_running_loop().create_future()
+        self._ainflight[key] = fut
+        self.misses += 1
+        try:
+            entry = self._store(key, await compute())
+            fut.set_result(entry)
+            return entry, False
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._ainflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1 @@
+"""API routers, one per feature; `main.create_app` includes them all."""
@@ -0,0 +1,109 @@
+"""
+Operations endpoints: training jobs, loaded models, the cache warmer,
+Prometheus metrics and request profiles.
+"""
+import asyncio
+import os
+import sys
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+import telemetry
+from instrumentation import profiles
+from state import cache_warmer, hot_requests, model_registry, model_store, response_cache, training_queue
+from training_queue import location_key
+
+router = APIRouter()
+
+
+@router.get("/training/jobs")
+async def training_jobs():
+    return {"jobs": training_queue.jobs()}
+
+
+@router.get("/training/jobs/{lat},{lon}")
+async def training_job(lat: float, lon: float):
+    key = location_key(lat, lon)
+    job = training_queue.job(key)
+    if job is not None:
+        return job.to_dict()
+    version = model_store.latest_version(key)
+    if version is not None:
+        return {"key": key, "status": "done", "model_path": str(model_store.version_path(key, version))}
+    raise HTTPException(status_code=404, detail=f"No training job for {key}")
+
+
+@router.get("/admin/models")
+async def admin_models():
+    """Load time, size and memory of the model bundles held by this process"""
+    return {
+        "pid": os.getpid(),
+        "models": model_registry.stats(),
+        "location_models": model_store.stats(),
+        "response_cache": response_cache.stats(),
+    }
+
+
+@router.get("/admin/warmer")
+async def admin_warmer():
+    """Tracked request signatures, next scheduled warm-up and the last run's summary"""
+    return cache_warmer.stats()
+
+
+@router.post("/admin/warmer/run")
+async def admin_warmer_run():
+    """Run a warm-up now (same budgets as the scheduled run)"""
+    import forecasting  # noqa: F401  registers the warm functions
+
+    return await asyncio.to_thread(cache_warmer.run_once)
+
+
+def _hit_ratio(hits: float, misses: float) -> float:
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+@telemetry.collector
+def _service_metrics():
+    """Cache, model and training-queue state, read at scrape time"""
+    responses = response_cache.stats()
+    models = model_store.stats()
+    statuses = [job["status"] for job in training_queue.jobs()]
+    # Not imported yet means no POWER lookups yet
+    power_cache = sys.modules.get("power_cache")
+    power_hits = power_cache.CACHE_DAYS.value(result="hit") if power_cache else 0.0
+    power_misses = power_cache.CACHE_DAYS.value(result="miss") if power_cache else 0.0
+    return [
+        ("eventcast_response_cache_requests_total", "counter", "Response cache lookups by result",
+         [({"result": r}, responses[k]) for r, k in (("hit", "hits"), ("miss", "misses"), ("coalesced", "coalesced"))]),
+        ("eventcast_response_cache_entries", "gauge", "Entries held by the response cache", [({}, responses["entries"])]),
+        ("eventcast_location_model_cache_requests_total", "counter", "Per-location model lookups by result",
+         [({"result": "hit"}, models["hits"]), ({"result": "miss"}, models["misses"])]),
+        ("eventcast_location_model_cache_bytes", "gauge", "Bytes of per-location models held in memory", [({}, models["bytes"])]),
+        ("eventcast_cache_hit_ratio", "gauge", "Hits / (hits + misses) since process start", [
+            ({"cache": "response"}, _hit_ratio(responses["hits"], responses["misses"])),
+            ({"cache": "location_models"}, _hit_ratio(models["hits"], models["misses"])),
+            ({"cache": "power_days"}, _hit_ratio(power_hits, power_misses)),
+        ]),
+        ("eventcast_training_jobs", "gauge", "Training jobs by status",
+         [({"status": s}, statuses.count(s)) for s in ("queued", "running", "done", "failed")]),
+        ("eventcast_model_bundles_loaded", "gauge", "Short-term model bundles loaded in this process", [({}, len(model_registry.stats()))]),
+        ("eventcast_warmer_tracked_requests", "gauge", "Request signatures tracked for cache warming", [({}, len(hot_requests))]),
+    ]
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of request, span, cache, upstream and training metrics"""
+    return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/debug/profile/{profile_id}")
+async def debug_profile(profile_id: str, format: str = Query("folded", pattern="^(folded|json)$")):
+    """Spans of a request sent with `X-Profile: 1`: folded stacks (flamegraph.pl, speedscope) or JSON"""
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    if format == "json":
+        return profile.to_dict()
+    return PlainTextResponse(profile.folded())
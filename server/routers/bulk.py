@@ -0,0 +1,57 @@
+"""
+Many predictions per call: /predict/batch (a list of points and dates) and
+/predict/grid (a raster over a bounding box).
+"""
+import json
+import os
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from schemas import BatchPredictRequest, GridRequest
+
+router = APIRouter()
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+
+@router.post("/predict/batch")
+async def predict_batch(request: BatchPredictRequest):
+    """
+    Next-day predictions for many (lat, lon, date) items in one call.
+    Items sharing a location share one NASA fetch; all rows go through a
+    single vectorized model.predict. Results stream back as NDJSON lines in
+    request order, each tagged with its `index`.
+    """
+    from forecasting import batch_results
+
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items")
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    results = await batch_results(request.items)
+
+    def lines():
+        for result in results:
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/predict/grid")
+async def predict_grid(request: GridRequest):
+    """
+    Temperature, humidity and rain probability over a bounding box on `date`
+    (default tomorrow, at most MAX_HORIZON days ahead), rolled forward from
+    the last observed day. Cells share the POWER cache and upstream gate; all
+    cells go through one feature tensor and one model.predict per day. The raster is float32
+    (bands, rows, cols), north-up, NaN where there is no prediction:
+    `format=json` returns the summary with the raw buffer base64-encoded in
+    `data`; `format=npy` returns a .npy file with the summary in the
+    X-Grid-Summary header.
+    """
+    from forecasting import grid_forecast
+
+    if request.min_lat >= request.max_lat or request.min_lon >= request.max_lon:
+        raise HTTPException(status_code=400, detail="Empty bounding box")
+    return await grid_forecast(request)
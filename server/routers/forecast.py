@@ -0,0 +1,97 @@
+"""
+Point forecasts: /predict (short-term rollout), /predict-seasonal
+(climatology) and /predict-weather (next day, per-location models).
+Responses are cached per ~0.1 degree cell and day, and every request that
+was answered is counted for the cache warmer (failed ones, such as invalid
+dates, are not, so the warmer never replays them).
+"""
+from datetime import datetime
+
+from fastapi import APIRouter, Query, Request
+
+from response_cache import to_response
+from schemas import (
+    SeasonalRequest,
+    ShortTermRequest,
+    UnifiedForecastResponse,
+    WeatherPredictionRequest,
+    WeatherPredictionResponse,
+)
+from state import hot_requests, model_store, model_version, response_cache
+from training_queue import location_key
+
+router = APIRouter()
+
+
+@router.post("/predict", response_model=UnifiedForecastResponse)
+def predict_short_term(req: ShortTermRequest, request: Request):
+    """Predict the next `horizon` days (default 3) using the RF model with a recursive rollout."""
+    from forecasting import short_term_cached
+
+    lat, lon = response_cache.quantize(req.lat, req.lon)
+    req = req.model_copy(update={"lat": lat, "lon": lon})
+    entry, hit = short_term_cached(req)
+    hot_requests.record("predict", {"lat": lat, "lon": lon, "date": req.date, "horizon": req.horizon})
+    return to_response(entry, request, hit)
+
+
+@router.post("/predict-seasonal", response_model=UnifiedForecastResponse)
+def predict_seasonal(req: SeasonalRequest, request: Request):
+    from forecasting import seasonal_cached
+
+    lat, lon = response_cache.quantize(req.lat, req.lon)
+    mode = "month" if req.range not in ("date", "month") else req.range
+    req = req.model_copy(update={"lat": lat, "lon": lon, "range": mode})
+    entry, hit = seasonal_cached(req)
+    hot_requests.record("predict-seasonal", {"lat": lat, "lon": lon, "date": req.date, "range": mode})
+    return to_response(entry, request, hit)
+
+
+@router.post("/predict-weather")
+async def predict_weather(request: WeatherPredictionRequest, http_request: Request):
+    """Predict weather for the next day using AI model (cached per ~0.1 degree cell and day)"""
+    from forecasting import weather_prediction
+
+    lat, lon = response_cache.quantize(request.lat, request.lon)
+    request = request.model_copy(update={"lat": lat, "lon": lon})
+    key = response_cache.key(
+        "predict-weather",
+        lat,
+        lon,
+        datetime.now().date().isoformat(),
+        model_store.latest_version(location_key(lat, lon)) or model_version(),
+        extra=request.current_weather,
+    )
+    entry, hit = await response_cache.aget_or_compute(key, lambda: weather_prediction(request))
+    hot_requests.record("predict-weather", {"lat": lat, "lon": lon})
+    return to_response(entry, http_request, hit)
+
+
+@router.get("/predict-weather")
+async def predict_weather_get(
+    http_request: Request,
+    lat: float = Query(..., description="Latitude"),
+    lon: float = Query(..., description="Longitude"), 
+    temperature: float = Query(..., description="Current temperature in Celsius"),
+    humidity: float = Query(..., description="Current humidity percentage"),
+    precipitation: float = Query(0, description="Current precipitation in mm"),
+    wind_speed: float = Query(5, description="Current wind speed in m/s"),
+    uv_index: float = Query(5, description="Current UV index")
+) -> WeatherPredictionResponse:
+    """GET endpoint for weather prediction (for easier testing)"""
+    
+    current_weather = {
+        'temperature': temperature,
+        'humidity': humidity,
+        'precipitation': precipitation,
+        'wind_speed': wind_speed,
+        'uv_index': uv_index
+    }
+    
+    request = WeatherPredictionRequest(
+        lat=lat,
+        lon=lon,
+        current_weather=current_weather
+    )
+    
+    return await predict_weather(request, http_request)
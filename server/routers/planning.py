@@ -0,0 +1,48 @@
+"""Event planning: /plan/best-dates ranks the days of a window against weather thresholds."""
+import asyncio
+import datetime as dt
+
+from fastapi import APIRouter, HTTPException, Request
+
+from response_cache import to_response
+from schemas import BestDatesRequest
+from state import model_version, response_cache
+
+router = APIRouter()
+
+
+@router.post("/plan/best-dates")
+async def plan_best_dates(request: BestDatesRequest, http_request: Request):
+    """
+    Rank every day of a window (up to a year) against temperature, rain and
+    humidity thresholds and return the top_k days with their scores: the
+    model's rollout near today, day-of-year climatology beyond it. Cached per
+    ~0.1 degree cell, day and request like the forecast endpoints.
+    """
+    import planner
+    from climatology import get_index as climatology_index
+    from forecasting import best_dates_plan
+
+    try:
+        start, end = dt.date.fromisoformat(request.start), dt.date.fromisoformat(request.end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end is before start")
+    if (end - start).days + 1 > planner.MAX_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {planner.MAX_WINDOW_DAYS} days per window")
+    if request.temp_min > request.temp_max:
+        raise HTTPException(status_code=400, detail="temp_min is above temp_max")
+
+    lat, lon = response_cache.quantize(request.lat, request.lon)
+    request = request.model_copy(update={"lat": lat, "lon": lon})
+    key = response_cache.key(
+        "plan-best-dates",
+        lat,
+        lon,
+        dt.date.today().isoformat(),
+        f"{model_version()}|climatology:{climatology_index().version}",
+        extra=request.model_dump(exclude={"lat", "lon"}),
+    )
+    entry, hit = await response_cache.aget_or_compute(key, lambda: asyncio.to_thread(best_dates_plan, request, start, end))
+    return to_response(entry, http_request, hit)
@@ -0,0 +1,83 @@
+"""
+Request and response models of the API.
+
+Kept free of the ML stack so routes can be declared without importing
+pandas, NumPy or sklearn.
+"""
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+from limits import MAX_HORIZON
+
+
+class PredictRequest(BaseModel):
+    lat: float
+    lon: float
+    date: str  # ISO date YYYY-MM-DD for the day you want prediction
+
+
+class UnifiedForecastResponse(BaseModel):
+    mode: str  # "short_term" or "seasonal"
+    predicted_temperature: list[float]
+    predicted_humidity: list[float]
+    predicted_precipitation: list[float]
+    confidence: float
+
+
+class ShortTermRequest(PredictRequest):
+    horizon: int = Field(3, ge=1, le=MAX_HORIZON)  # days to roll forward
+
+
+class SeasonalRequest(BaseModel):
+    lat: float
+    lon: float
+    date: str  # anchor date yyyy-mm-dd
+    range: str | None = "month"  # "month" or "date"
+
+
+class WeatherPredictionRequest(BaseModel):
+    lat: float
+    lon: float
+    current_weather: Dict[str, Any]
+
+
+class WeatherPredictionResponse(BaseModel):
+    temperature: float
+    humidity: float
+    rain_probability: float
+    confidence: Dict[str, float]
+    condition: str
+    condition_ar: str
+    feels_like: float
+    wind_speed: float
+    uv_index: float
+    precipitation: float
+    is_ai_prediction: bool = True
+    model_source: str = "location"  # "location", "regional", "nearest:<lat,lon>" or "climatology"
+
+
+class BatchPredictRequest(BaseModel):
+    items: list[PredictRequest]
+
+
+class GridRequest(BaseModel):
+    min_lat: float = Field(..., ge=-90, le=90)
+    min_lon: float = Field(..., ge=-180, le=180)
+    max_lat: float = Field(..., ge=-90, le=90)
+    max_lon: float = Field(..., ge=-180, le=180)
+    resolution: float = Field(0.5, gt=0, le=10, description="Cell size in degrees")
+    date: Optional[str] = Field(None, description=f"Forecast date (YYYY-MM-DD); default tomorrow, at most {MAX_HORIZON} days ahead")
+    format: str = Field("json", pattern="^(json|npy)$")
+
+
+class BestDatesRequest(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+    start: str  # yyyy-mm-dd
+    end: str  # yyyy-mm-dd, at most a year after start
+    temp_min: float = 18.0
+    temp_max: float = 30.0
+    max_rain_probability: float = Field(0.3, ge=0, le=1)
+    max_humidity: float = Field(70.0, ge=0, le=100)
+    top_k: int = Field(5, ge=1, le=50)
@@ -0,0 +1,107 @@
+"""
+Process-wide services shared by the routers.
+
+Everything here is cheap to construct: the model registry and store, the
+response cache, the training queue and the cache warmer hold no models until
+they are first asked for one. pandas, NumPy and sklearn are only imported by
+the loaders (and by `forecasting`), so the app can start listening before the
+ML stack is loaded.
+"""
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+import telemetry
+from cache_warmer import CacheWarmer, HotRequests
+from model_registry import ModelRegistry, pickle_loader
+from model_store import ModelStore
+from response_cache import ResponseCache
+from training_queue import TrainingQueue
+
+# Wherever main.create_app found the ml-model code
+ML_MODEL_DIR = Path(telemetry.__file__).resolve().parent
+MODEL_PATH = Path(os.getenv("MODEL_PATH", str(ML_MODEL_DIR / "weather_predictor.pkl")))
+# Flat export written by train.py; memory-mapped, so workers share its pages
+FLAT_MODEL_PATH = Path(os.getenv("FLAT_MODEL_DIR", str(ML_MODEL_DIR / "weather_predictor.forest"))) / "meta.json"
+# Per-location models: versioned files on disk, LRU of loaded models in memory
+MODELS_DIR = Path(os.getenv("MODELS_DIR", str(ML_MODEL_DIR / "models")))
+# Queue training for locations without a model. Off by default: every new location
+# costs a year-long POWER fetch and a forest fit (TRAINING_MAX_PENDING caps the queue)
+AUTO_TRAIN = os.getenv("AUTO_TRAIN", "0").lower() in ("1", "true", "yes", "on")
+
+
+def _bundle_loader(path: Path) -> Dict[str, Any]:
+    with telemetry.span("model.load"):
+        if path.name == "meta.json":
+            from forest_export import load_bundle
+
+            return load_bundle(path.parent)
+        return pickle_loader(path)
+
+
+def _load_predictor(path):
+    from weather_predictor import WeatherPredictor
+
+    with telemetry.span("model.load"):
+        predictor = WeatherPredictor()
+        predictor.load_model(str(path))
+        return predictor
+
+
+model_registry = ModelRegistry(loader=_bundle_loader)
+response_cache = ResponseCache(
+    refresh_hour_utc=int(os.getenv("NASA_REFRESH_UTC_HOUR", "6")),
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+)
+model_store = ModelStore(
+    MODELS_DIR,
+    loader=_load_predictor,
+    max_bytes=int(float(os.getenv("MODEL_CACHE_MB", "512")) * 1024 * 1024),
+)
+training_queue = TrainingQueue(
+    model_store,
+    max_workers=int(os.getenv("TRAINING_WORKERS", "1")),
+    cpus=int(os.getenv("TRAINING_CPUS", "0")) or None,
+    max_pending=int(os.getenv("TRAINING_MAX_PENDING", "16")),
+)
+# Request counts per cell; the cache warmer replays the hottest after each daily refresh
+hot_requests = HotRequests(
+    max_entries=int(os.getenv("WARM_MAX_TRACKED", "10000")),
+    state_path=Path(os.environ["WARM_STATE_PATH"]) if os.getenv("WARM_STATE_PATH") else None,
+)
+# WARM_TOP_N=0 turns it off; `forecasting` registers the per-endpoint warm functions
+cache_warmer = CacheWarmer(
+    hot_requests,
+    response_cache.next_refresh,
+    top_n=int(os.getenv("WARM_TOP_N", "50")),
+    delay=float(os.getenv("WARM_DELAY_MINUTES", "30")) * 60,
+    cpu_seconds=float(os.getenv("WARM_CPU_SECONDS", "120")),
+    upstream_requests=int(os.getenv("WARM_UPSTREAM_REQUESTS", "200")),
+    decay=float(os.getenv("WARM_DECAY", "0.5")),
+)
+
+
+def active_model_path() -> Path:
+    """The flat export when one exists (or is already loaded), else the pickled bundle."""
+    if FLAT_MODEL_PATH.exists() or model_registry.version(FLAT_MODEL_PATH) is not None:
+        return FLAT_MODEL_PATH
+    return MODEL_PATH
+
+
+def load_model() -> Dict[str, Any]:
+    return model_registry.get(active_model_path())
+
+
+def model_version() -> str:
+    """Identifies the loaded short-term bundle so cached responses change with it."""
+    path = active_model_path()
+    try:
+        model_registry.get(path)
+    except Exception:
+        return "none"
+    return f"{path.suffix.lstrip('.')}:{model_registry.version(path)}"
+
+
+def shutdown() -> None:
+    training_queue.shutdown()
+    cache_warmer.shutdown()
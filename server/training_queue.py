@@ -0,0 +1,162 @@
+"""
+Background training queue for per-location WeatherPredictor models.
+
+Jobs run in a process pool so fitting forests never blocks request handling.
+Submissions for a location key that already has a queued or running job
+share that job. At most `max_pending` jobs are queued or running; further
+locations get no job until one finishes. Finished and failed jobs are
+forgotten `retry_after` seconds after submission (a failed location can then
+be retried). Each finished model is written as the next version of its
+location in the ModelStore.
+"""
+import math
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from model_store import ModelStore
+
+
+def location_key(lat: float, lon: float) -> str:
+    return f"{lat:.2f},{lon:.2f}"
+
+
+def _train_location(lat: float, lon: float, days_back: int, model_path: str, n_jobs: int = -1) -> Dict[str, Any]:
+    """Runs in a worker process."""
+    from weather_predictor import WeatherPredictor
+
+    started = time.time()
+    predictor = WeatherPredictor()
+    predictor.train_models(lat, lon, days_back=days_back, n_jobs=n_jobs)
+    # Write next to the target and rename so readers never see a partial file.
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    predictor.save_model(tmp_path)
+    os.replace(tmp_path, model_path)
+    return {"started_at": started}
+
+
+@dataclass
+class TrainingJob:
+    key: str
+    lat: float
+    lon: float
+    model_path: Path
+    submitted_at: float
+    future: Future = field(repr=False)
+
+    @property
+    def status(self) -> str:
+        if self.future.done():
+            return "failed" if self.future.exception() is not None else "done"
+        return "running" if self.future.running() else "queued"
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "key": self.key,
+            "lat": self.lat,
+            "lon": self.lon,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+        }
+        if self.future.done():
+            err = self.future.exception()
+            if err is not None:
+                out["error"] = str(err)
+            else:
+                result = self.future.result()
+                out["started_at"] = result["started_at"]
+                out["model_path"] = str(self.model_path)
+        return out
+
+
+class TrainingQueue:
+    def __init__(
+        self,
+        store: ModelStore,
+        max_workers: int = 1,
+        days_back: int = 365,
+        retry_after: float = 600.0,
+        cpus: Optional[int] = None,
+        max_pending: int = 16,
+    ):
+        self.store = store
+        self.days_back = days_back
+        self.retry_after = retry_after
+        self.max_pending = max_pending
+        self._max_workers = max_workers
+        # Split the CPU budget between workers instead of every forest using all cores
+        self.threads_per_job = max(1, (cpus or os.cpu_count() or 1) // max_workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, TrainingJob] = {}
+        self._lock = Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self._max_workers)
+        return self._pool
+
+    def _prune(self, now: float) -> None:
+        for key, job in list(self._jobs.items()):
+            if job.future.done() and now - job.submitted_at >= self.retry_after:
+                del self._jobs[key]
+
+    def submit(self, lat: float, lon: float) -> Optional[TrainingJob]:
+        """
+        Queue training for the location, reusing an in-flight (or recently failed)
+        job. Returns None when `max_pending` jobs are already queued or running.
+        """
+        key = location_key(lat, lon)
+        with self._lock:
+            self._prune(time.time())
+            job = self._jobs.get(key)
+            if job is not None:
+                status = job.status
+                if status in ("queued", "running"):
+                    return job
+                if status == "failed":
+                    return job  # pruned once retry_after has passed
+            if sum(1 for j in self._jobs.values() if not j.future.done()) >= self.max_pending:
+                return None
+            path = self.store.next_version_path(key)
+            future = self._executor().submit(_train_location, lat, lon, self.days_back, str(path), self.threads_per_job)
+            job = TrainingJob(key=key, lat=lat, lon=lon, model_path=path, submitted_at=time.time(), future=future)
+            self._jobs[key] = job
+            print(f"Queued model training for location {key}")
+            return job
+
+    def job(self, key: str) -> Optional[TrainingJob]:
+        with self._lock:
+            self._prune(time.time())
+            return self._jobs.get(key)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._prune(time.time())
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in jobs]
+
+    def nearest_model(self, lat: float, lon: float) -> Optional[str]:
+        """Key of the closest trained location (great-circle distance)."""
+        best: Optional[Tuple[float, str]] = None
+        for mlat, mlon, key in self.store.locations():
+            d = _haversine_km(lat, lon, mlat, mlon)
+            if best is None or d < best[0]:
+                best = (d, key)
+        return best[1] if best is not None else None
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
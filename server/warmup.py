@@ -0,0 +1,76 @@
+"""
+Startup warm-up and readiness.
+
+The app starts listening before the ML stack is loaded; `Warmup` then runs its
+steps (heavy imports, the model bundle, the climatology index, ...) in order in
+one daemon thread and sets `ready` when they are done, which /ready reports to
+load balancers and autoscalers. A failing step is logged and recorded but does
+not hold readiness back: every endpoint loads what it needs on first use, so
+the process can still serve, only more slowly.
+"""
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from telemetry import gauge
+
+READY = gauge("eventcast_ready", "1 once the startup warm-up has finished")
+STEP_SECONDS = gauge("eventcast_warmup_step_seconds", "Duration of each startup warm-up step", ["step"])
+
+
+@dataclass
+class StepResult:
+    name: str
+    seconds: float
+    error: Optional[str] = None
+
+
+class Warmup:
+    def __init__(self, steps: List[Tuple[str, Callable[[], Any]]]):
+        self.steps = steps
+        self.results: List[StepResult] = []
+        self.started_at: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        t0 = time.perf_counter()
+        for name, step in self.steps:
+            s0 = time.perf_counter()
+            error = None
+            try:
+                step()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"Warm-up step {name} failed: {error}")
+            result = StepResult(name, round(time.perf_counter() - s0, 3), error)
+            self.results.append(result)
+            STEP_SECONDS.set(result.seconds, step=name)
+        self.seconds = round(time.perf_counter() - t0, 3)
+        READY.set(1)
+        self._done.set()
+        print(f"Ready after a {self.seconds}s warm-up")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "warmup_seconds": self.seconds,
+            "steps": [asdict(r) for r in self.results],
+        }